@@ -0,0 +1,211 @@
+"""Бенчмарк клиента календаря против локального benchmarks.fake_calendar_server.
+
+Измеряет пропускную способность и задержки p50/p99 для get_events,
+create_event и delete_event при заданной конкурентности, а также объем
+ответов на операцию (по сети и после распаковки) и время разбора JSON.
+get_events (full) запрашивает полные ресурсы событий без fields= для
+сравнения с частичными ответами:
+
+    python -m benchmarks.calendar_benchmark --requests 500 --concurrency 32 --latency 50
+
+Результаты можно сохранить (--save) и сравнить с сохраненным ранее
+прогоном (--compare): при регрессии сверх --tolerance скрипт завершается
+с кодом 1.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List
+
+from google.oauth2.credentials import Credentials
+
+from benchmarks.fake_calendar_server import FakeCalendarServer
+from services.calendar_api import GoogleCalendarAPI
+from services.credentials import CredentialManager
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    """Перцентиль методом ближайшего ранга."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(percent / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+async def measure(
+    name: str,
+    operation: Callable[[int], Awaitable[bool]],
+    total: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    """Выполняет operation total раз не более чем concurrency одновременно."""
+    latencies: List[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < total:
+            index = next_index
+            next_index += 1
+            started = time.perf_counter()
+            ok = await operation(index)
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "name": name,
+        "ops": total,
+        "errors": errors,
+        "throughput": total / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def make_api(base_url: str, max_concurrency: int, cache_ttl: float, field_projection: bool = True) -> GoogleCalendarAPI:
+    # Локальный сервер не проверяет авторизацию, поэтому токен фиктивный
+    credentials = CredentialManager(credentials=Credentials(token="benchmark"))
+    return GoogleCalendarAPI(
+        max_concurrency=max_concurrency,
+        credential_manager=credentials,
+        base_url=base_url,
+        cache_ttl=cache_ttl,
+        field_projection=field_projection,
+    )
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    server = FakeCalendarServer(latency=args.latency / 1000, jitter=args.jitter / 1000, error_rate=args.error_rate, seed=1)
+    server.populate(args.events, days=args.days)
+    runner, base_url = await server.start()
+
+    uncached_api = make_api(base_url, args.pool_size, cache_ttl=0)
+    full_api = make_api(base_url, args.pool_size, cache_ttl=0, field_projection=False)
+    cached_api = make_api(base_url, args.pool_size, cache_ttl=60)
+    created_ids: List[str] = []
+    base_time = datetime.utcnow().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+    async def get_events_uncached(index: int) -> bool:
+        return bool(await uncached_api.get_events(days=7)) or args.events == 0
+
+    async def get_events_full(index: int) -> bool:
+        return bool(await full_api.get_events(days=7)) or args.events == 0
+
+    async def get_events_cached(index: int) -> bool:
+        return bool(await cached_api.get_events(days=7)) or args.events == 0
+
+    async def create_event(index: int) -> bool:
+        start = base_time + timedelta(minutes=15 * index)
+        event = await uncached_api.create_event(f"Benchmark {index}", start, start + timedelta(hours=1), "benchmark")
+        if event:
+            created_ids.append(event["id"])
+        return event is not None
+
+    async def delete_event(index: int) -> bool:
+        if index >= len(created_ids):
+            return False
+        return await uncached_api.delete_event(created_ids[index])
+
+    results = []
+    try:
+        for name, api, operation in [
+            ("get_events (no cache)", uncached_api, get_events_uncached),
+            ("get_events (full)", full_api, get_events_full),
+            ("get_events (cached)", cached_api, get_events_cached),
+            ("create_event", uncached_api, create_event),
+            ("delete_event", uncached_api, delete_event),
+        ]:
+            api.reset_payload_stats()
+            result = await measure(name, operation, args.requests, args.concurrency)
+            payload = api.payload_stats()
+            result["wire_kb"] = payload["wire_bytes"] / 1024 / args.requests
+            result["decoded_kb"] = payload["decoded_bytes"] / 1024 / args.requests
+            result["parse_ms"] = payload["parse_ms"] / args.requests
+            results.append(result)
+            logger.info(f"Finished '{name}'")
+    finally:
+        uncached_api.close()
+        full_api.close()
+        cached_api.close()
+        await runner.cleanup()
+    return results
+
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    print(
+        f"{'operation':<24}{'ops':>8}{'errors':>8}{'ops/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+        f"{'wire KB':>10}{'json KB':>10}{'parse ms':>10}"
+    )
+    for result in results:
+        print(
+            f"{result['name']:<24}{result['ops']:>8}{result['errors']:>8}"
+            f"{result['throughput']:>10.1f}{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+            f"{result['wire_kb']:>10.2f}{result['decoded_kb']:>10.2f}{result['parse_ms']:>10.3f}"
+        )
+
+
+def find_regressions(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    """Сравнивает прогон с базовым: падение пропускной способности, рост p99 или объема ответов сверх допуска."""
+    previous = {result["name"]: result for result in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get(result["name"])
+        if old is None:
+            continue
+        if result["throughput"] < old["throughput"] * (1 - tolerance):
+            regressions.append(f"{result['name']}: throughput {old['throughput']:.1f} -> {result['throughput']:.1f} ops/s")
+        if result["p99_ms"] > old["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{result['name']}: p99 {old['p99_ms']:.1f} -> {result['p99_ms']:.1f} ms")
+        if "wire_kb" in old and result["wire_kb"] > old["wire_kb"] * (1 + tolerance):
+            regressions.append(f"{result['name']}: payload {old['wire_kb']:.2f} -> {result['wire_kb']:.2f} KB/op")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Calendar client benchmark against the local fake server")
+    arg_parser.add_argument("--requests", type=int, default=200, help="operations per scenario")
+    arg_parser.add_argument("--concurrency", type=int, default=16, help="concurrent callers")
+    arg_parser.add_argument("--pool-size", type=int, default=8, help="GoogleCalendarAPI max_concurrency")
+    arg_parser.add_argument("--latency", type=float, default=20.0, help="server latency per request, ms")
+    arg_parser.add_argument("--jitter", type=float, default=0.0, help="random extra server latency, ms")
+    arg_parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 503")
+    arg_parser.add_argument("--events", type=int, default=200, help="calendar size")
+    arg_parser.add_argument("--days", type=int, default=30, help="spread calendar events over this many days")
+    arg_parser.add_argument("--save", help="write results as JSON to this path")
+    arg_parser.add_argument("--compare", help="baseline JSON produced by --save")
+    arg_parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    results = asyncio.run(run(args))
+    print_results(results)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            regressions = find_regressions(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
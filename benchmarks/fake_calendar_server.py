@@ -0,0 +1,422 @@
+"""Локальная замена Google Calendar API для нагрузочного тестирования.
+
+Реализует events.list (с пагинацией и syncToken), events.insert,
+events.delete, events.watch/channels.stop с отправкой push-уведомлений
+на адрес канала и batch-эндпоинт, а также частичные ответы (fields=) и
+gzip-сжатие. Задержка ответа, доля ошибок и размер календаря настраиваются. Запуск отдельным процессом:
+
+    python -m benchmarks.fake_calendar_server --port 8085 --latency 50 --events 1000
+
+после чего бот направляется на него через GOOGLE_CALENDAR_BASE_URL=http://127.0.0.1:8085.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from email.parser import BytesParser
+from email.policy import HTTP
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from aiohttp import ClientSession, web
+from dateutil import parser, tz
+
+logger = logging.getLogger(__name__)
+
+API_PREFIX = "/calendar/v3/"
+BATCH_PATH = "/batch/calendar/v3"
+
+Response = Tuple[int, Optional[Dict[str, Any]]]
+
+
+def _error(code: int, message: str, reason: str) -> Response:
+    return code, {"error": {"code": code, "message": message, "errors": [{"reason": reason, "message": message}]}}
+
+
+def _to_utc(value: Dict[str, str]) -> datetime:
+    parsed = parser.isoparse(value.get("dateTime") or value["date"])
+    # Время без смещения задано в timeZone, даты событий на весь день считаем заданными в UTC
+    if parsed.tzinfo is None:
+        zone = tz.gettz(value["timeZone"]) if "dateTime" in value and value.get("timeZone") else None
+        return parsed.replace(tzinfo=zone or timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _parse_selectors(spec: str, pos: int, tree: Dict[str, Any]) -> int:
+    while True:
+        pos = _parse_selector(spec, pos, tree)
+        if pos < len(spec) and spec[pos] == ",":
+            pos += 1
+            continue
+        return pos
+
+
+def _parse_selector(spec: str, pos: int, tree: Dict[str, Any]) -> int:
+    start = pos
+    while pos < len(spec) and spec[pos] not in ",()/":
+        pos += 1
+    name = spec[start:pos].strip()
+    if not name:
+        raise ValueError(f"Invalid field selection at position {start}.")
+    if pos < len(spec) and spec[pos] in "/(":
+        # None означает, что поле уже выбрано целиком, и вложенный выбор его не сужает
+        subtree = tree.get(name, {})
+        target = {} if subtree is None else subtree
+        if spec[pos] == "/":
+            pos = _parse_selector(spec, pos + 1, target)
+        else:
+            pos = _parse_selectors(spec, pos + 1, target)
+            if pos >= len(spec) or spec[pos] != ")":
+                raise ValueError("Unbalanced parentheses in field selection.")
+            pos += 1
+        if subtree is not None:
+            tree[name] = target
+    else:
+        tree[name] = None
+    return pos
+
+
+def parse_fields(spec: str) -> Dict[str, Any]:
+    """Разбирает параметр fields (например, "nextPageToken,items(id,start/dateTime)") в дерево полей."""
+    tree: Dict[str, Any] = {}
+    if _parse_selectors(spec, 0, tree) != len(spec):
+        raise ValueError("Invalid field selection.")
+    return tree
+
+
+def project(value: Any, tree: Optional[Dict[str, Any]]) -> Any:
+    """Оставляет в ответе только выбранные поля; списки проецируются поэлементно."""
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [project(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if "*" in tree:
+        return {key: project(item, tree.get(key, tree["*"])) for key, item in value.items()}
+    return {key: project(value[key], subtree) for key, subtree in tree.items() if key in value}
+
+
+class FakeCalendarServer:
+    """Хранилище календарей в памяти и aiohttp-приложение поверх него."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        # calendar_id -> event_id -> ресурс события (удаленные хранятся как status=cancelled)
+        self.calendars: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(dict)
+        # Номер изменения, после которого событие менялось последний раз: для syncToken
+        self._event_seq: Dict[str, Dict[str, int]] = defaultdict(dict)
+        # Разобранные start/end (UTC), чтобы не разбирать даты на каждый запрос
+        self._event_times: Dict[str, Dict[str, Tuple[datetime, datetime]]] = defaultdict(dict)
+        self._seq = 0
+        # Токены синхронизации младше этого номера считаются устаревшими (410 Gone)
+        self._min_sync_seq = 0
+        self.request_count = 0
+        # channel_id -> канал push-уведомлений
+        self.channels: Dict[str, Dict[str, Any]] = {}
+        self.notifications_sent = 0
+        self._session: Optional[ClientSession] = None
+
+    # Управление данными
+
+    def _store(self, calendar_id: str, event: Dict[str, Any]) -> None:
+        self._seq += 1
+        self.calendars[calendar_id][event["id"]] = event
+        self._event_seq[calendar_id][event["id"]] = self._seq
+        if "start" in event and "end" in event:
+            self._event_times[calendar_id][event["id"]] = (_to_utc(event["start"]), _to_utc(event["end"]))
+        else:
+            self._event_times[calendar_id].pop(event["id"], None)
+        self._notify(calendar_id, "exists")
+
+    def add_event(self, calendar_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Добавляет событие так же, как это сделал бы events.insert."""
+        event = dict(body)
+        event.setdefault("id", uuid.uuid4().hex)
+        now = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+        # Служебные поля, которые Google возвращает в полном ресурсе события
+        event.update({
+            "kind": "calendar#event",
+            "status": "confirmed",
+            "etag": f'"{self._seq + 1}"',
+            "created": now,
+            "updated": now,
+            "htmlLink": f"https://calendar.example/event?eid={event['id']}",
+            "creator": {"email": "bot@calendar.example", "self": True},
+            "organizer": {"email": f"{calendar_id}@calendar.example", "self": True},
+            "iCalUID": f"{event['id']}@google.com",
+            "sequence": 0,
+            "reminders": {"useDefault": True},
+            "eventType": "default",
+        })
+        self._store(calendar_id, event)
+        return event
+
+    def remove_event(self, calendar_id: str, event_id: str) -> bool:
+        event = self.calendars[calendar_id].get(event_id)
+        if event is None or event.get("status") == "cancelled":
+            return False
+        self._store(calendar_id, {"kind": "calendar#event", "id": event_id, "status": "cancelled"})
+        return True
+
+    def populate(self, count: int, days: int = 30, calendar_id: str = "primary") -> None:
+        """Заполняет календарь занятиями, равномерно распределенными по ближайшим дням."""
+        start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        for index in range(count):
+            begin = start + timedelta(minutes=self._random.randrange(0, days * 24 * 60, 15))
+            self.add_event(calendar_id, {
+                "summary": f"Lecture {index}",
+                "description": f"Room {self._random.randint(100, 500)}",
+                "start": {"dateTime": begin.isoformat(), "timeZone": "UTC"},
+                "end": {"dateTime": (begin + timedelta(minutes=90)).isoformat(), "timeZone": "UTC"},
+            })
+
+    def expire_sync_tokens(self) -> None:
+        """Делает все выданные syncToken недействительными."""
+        self._min_sync_seq = self._seq + 1
+
+    # Push-уведомления
+
+    def _watch(self, calendar_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        ttl = int(body.get("params", {}).get("ttl", 604800))
+        channel = {
+            "kind": "api#channel",
+            "id": body["id"],
+            "resourceId": uuid.uuid4().hex,
+            "resourceUri": f"https://www.googleapis.com/calendar/v3/calendars/{calendar_id}/events?alt=json",
+            "token": body.get("token"),
+            "expiration": str(int((datetime.now(timezone.utc) + timedelta(seconds=ttl)).timestamp() * 1000)),
+        }
+        self.channels[channel["id"]] = {**channel, "address": body["address"], "calendar_id": calendar_id, "message_number": 0}
+        self._post_notification(self.channels[channel["id"]], "sync")
+        return channel
+
+    def _notify(self, calendar_id: str, state: str) -> None:
+        for channel in self.channels.values():
+            if channel["calendar_id"] == calendar_id:
+                self._post_notification(channel, state)
+
+    def _post_notification(self, channel: Dict[str, Any], state: str) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Вне цикла событий (например, при populate до запуска) уведомлять некого
+            return
+        channel["message_number"] += 1
+        headers = {
+            "X-Goog-Channel-ID": channel["id"],
+            "X-Goog-Channel-Expiration": channel["expiration"],
+            "X-Goog-Message-Number": str(channel["message_number"]),
+            "X-Goog-Resource-ID": channel["resourceId"],
+            "X-Goog-Resource-State": state,
+            "X-Goog-Resource-URI": channel["resourceUri"],
+        }
+        if channel.get("token"):
+            headers["X-Goog-Channel-Token"] = channel["token"]
+        loop.create_task(self._send_notification(channel["address"], headers))
+
+    async def _send_notification(self, address: str, headers: Dict[str, str]) -> None:
+        if self._session is None:
+            self._session = ClientSession()
+        try:
+            async with self._session.post(address, headers=headers) as response:
+                await response.read()
+            self.notifications_sent += 1
+        except Exception as e:
+            logger.warning(f"Failed to deliver notification to {address}: {e}")
+
+    async def _close_session(self, app: web.Application) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    # Обработка запросов Calendar API
+
+    def _list(self, calendar_id: str, query: Dict[str, str]) -> Response:
+        events = self.calendars[calendar_id]
+        max_results = min(int(query.get("maxResults", 250)), 2500)
+        offset = int(query.get("pageToken", 0))
+
+        if "syncToken" in query:
+            try:
+                since = int(query["syncToken"])
+            except ValueError:
+                return _error(400, "Invalid sync token value.", "invalid")
+            if since < self._min_sync_seq:
+                return _error(410, "Sync token is no longer valid, a full sync is required.", "fullSyncRequired")
+            seqs = self._event_seq[calendar_id]
+            items = [event for event_id, event in events.items() if seqs[event_id] > since]
+        else:
+            show_deleted = query.get("showDeleted") == "true"
+            times = self._event_times[calendar_id]
+            items = [event for event in events.values() if show_deleted or event.get("status") != "cancelled"]
+            if "timeMin" in query:
+                time_min = parser.isoparse(query["timeMin"])
+                items = [event for event in items if event["id"] in times and times[event["id"]][1] > time_min]
+            if "timeMax" in query:
+                time_max = parser.isoparse(query["timeMax"])
+                items = [event for event in items if event["id"] in times and times[event["id"]][0] < time_max]
+            if query.get("orderBy") == "startTime":
+                items.sort(key=lambda event: times[event["id"]][0])
+
+        page = items[offset:offset + max_results]
+        result: Dict[str, Any] = {"kind": "calendar#events", "summary": calendar_id, "items": page}
+        if offset + max_results < len(items):
+            result["nextPageToken"] = str(offset + max_results)
+        else:
+            result["nextSyncToken"] = str(self._seq)
+        return 200, result
+
+    def handle(self, method: str, path: str, query: Dict[str, str], body: bytes) -> Response:
+        """Выполняет один запрос Calendar API и возвращает (статус, JSON-ответ)."""
+        self.request_count += 1
+        try:
+            fields = parse_fields(query["fields"]) if query.get("fields") else None
+        except ValueError as e:
+            return _error(400, str(e), "invalidParameter")
+        status, payload = self._dispatch(method, path, query, body)
+        if status < 300 and payload is not None:
+            payload = project(payload, fields)
+        return status, payload
+
+    def _dispatch(self, method: str, path: str, query: Dict[str, str], body: bytes) -> Response:
+        if self.error_rate and self._random.random() < self.error_rate:
+            return _error(503, "Backend Error", "backendError")
+        if not path.startswith(API_PREFIX):
+            return _error(404, "Not Found", "notFound")
+
+        parts = [unquote(part) for part in path[len(API_PREFIX):].split("/")]
+        if parts == ["channels", "stop"] and method == "POST":
+            payload = json.loads(body or b"{}")
+            if self.channels.pop(payload.get("id"), None) is None:
+                return _error(404, "Channel not found", "notFound")
+            return 204, None
+        if len(parts) < 3 or parts[0] != "calendars" or parts[2] != "events":
+            return _error(404, "Not Found", "notFound")
+        # Дальше parts имеет вид [calendar_id, "events", event_id?]
+        parts = parts[1:]
+        calendar_id = parts[0]
+
+        if parts[2:] == ["watch"] and method == "POST":
+            payload = json.loads(body or b"{}")
+            if not payload.get("id") or not payload.get("address"):
+                return _error(400, "Channel id and address are required.", "required")
+            return 200, self._watch(calendar_id, payload)
+        if len(parts) == 2 and method == "GET":
+            return self._list(calendar_id, query)
+        if len(parts) == 2 and method == "POST":
+            try:
+                payload = json.loads(body or b"{}")
+                _to_utc(payload["start"]), _to_utc(payload["end"])
+            except (ValueError, KeyError):
+                return _error(400, "Invalid event body.", "invalid")
+            return 200, self.add_event(calendar_id, payload)
+        if len(parts) == 3 and method == "DELETE":
+            event = self.calendars[calendar_id].get(parts[2])
+            if event is None:
+                return _error(404, "Not Found", "notFound")
+            if not self.remove_event(calendar_id, parts[2]):
+                return _error(410, "Resource has been deleted", "deleted")
+            return 204, None
+        return _error(405, "Method Not Allowed", "methodNotAllowed")
+
+    # HTTP
+
+    async def _delay(self) -> None:
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _compress(request: web.Request, response: web.Response) -> web.Response:
+        # Как и Google, сжимаем ответ, только если клиент указал gzip и в User-Agent
+        if "gzip" in request.headers.get("User-Agent", "") and "gzip" in request.headers.get("Accept-Encoding", ""):
+            response.enable_compression(web.ContentCoding.gzip)
+        return response
+
+    async def _handle_http(self, request: web.Request) -> web.Response:
+        await self._delay()
+        body = await request.read()
+        status, payload = self.handle(request.method, request.path, dict(request.query), body)
+        if payload is None:
+            return web.Response(status=status)
+        return self._compress(request, web.json_response(payload, status=status))
+
+    async def _handle_batch(self, request: web.Request) -> web.Response:
+        await self._delay()
+        content = await request.read()
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {request.headers['Content-Type']}\r\n\r\n".encode() + content
+        )
+        boundary = uuid.uuid4().hex
+        chunks = []
+        for part in message.iter_parts():
+            inner = part.get_payload(decode=True) or part.get_payload().encode()
+            request_line, _, rest = inner.partition(b"\n")
+            method, target, _ = request_line.decode().strip().split(" ", 2)
+            separator = b"\r\n\r\n" if b"\r\n\r\n" in rest else b"\n\n"
+            _, _, inner_body = rest.partition(separator)
+            url = urlsplit(target)
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            status, payload = self.handle(method, url.path, query, inner_body)
+
+            response = f"HTTP/1.1 {status} {'OK' if status < 300 else 'Error'}\r\n"
+            if payload is not None:
+                response += "Content-Type: application/json; charset=UTF-8\r\n\r\n" + json.dumps(payload)
+            else:
+                response += "Content-Length: 0\r\n\r\n"
+            content_id = part["Content-ID"].strip()
+            chunks.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id[1:-1]}>\r\n\r\n{response}\r\n"
+            )
+        chunks.append(f"--{boundary}--\r\n")
+        return self._compress(request, web.Response(
+            body="".join(chunks).encode("utf-8"),
+            headers={"Content-Type": f"multipart/mixed; boundary={boundary}"},
+        ))
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(BATCH_PATH, self._handle_batch)
+        app.router.add_route("*", API_PREFIX + "{tail:.*}", self._handle_http)
+        app.on_cleanup.append(self._close_session)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> Tuple[web.AppRunner, str]:
+        """Запускает сервер в текущем цикле событий и возвращает (runner, базовый URL)."""
+        runner = web.AppRunner(self.make_app(), access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        return runner, f"http://{host}:{bound_port}"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Local fake Google Calendar API server")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8085)
+    arg_parser.add_argument("--latency", type=float, default=0.0, help="base latency per request, ms")
+    arg_parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency up to this value, ms")
+    arg_parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    arg_parser.add_argument("--events", type=int, default=0, help="number of events to pre-populate")
+    arg_parser.add_argument("--days", type=int, default=30, help="spread pre-populated events over this many days")
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = FakeCalendarServer(latency=args.latency / 1000, jitter=args.jitter / 1000, error_rate=args.error_rate)
+    server.populate(args.events, days=args.days)
+    logger.info(f"Fake Google Calendar with {args.events} events on http://{args.host}:{args.port}")
+    web.run_app(server.make_app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
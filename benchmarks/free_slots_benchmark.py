@@ -0,0 +1,124 @@
+"""Микробенчмарк поиска свободного времени (/free) на больших календарях.
+
+Сравнивает совместный проход utils.free_slots.find_free_slots с наивным
+вариантом, который для каждого рабочего дня перебирает все события, и
+проверяет, что результаты совпадают:
+
+    python -m benchmarks.free_slots_benchmark --events 5000 --days 180
+
+prepare - перевод событий в занятые интервалы местного времени, общий
+для обоих вариантов. --long-event добавляет в начало календаря одно
+событие на заданное число дней: проход не должен замедляться от
+интервала, накрывающего много рабочих дней. С --max-ms скрипт завершается с кодом 1, если p50
+подготовки и поиска вместе превышает заданное значение.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, time as day_time, timedelta, timezone
+from typing import Callable, Dict, List
+from zoneinfo import ZoneInfo
+
+from benchmarks.calendar_benchmark import percentile
+from utils.free_slots import Interval, busy_intervals, find_free_slots, working_windows
+
+WORK_START = day_time(9, 0)
+WORK_END = day_time(18, 0)
+WORKDAYS = range(6)
+ZONE = ZoneInfo("Europe/Moscow")
+
+
+def make_events(count: int, days: int, seed: int, long_event_days: int = 0) -> List[Dict]:
+    """События в формате Calendar API, упорядоченные по началу, как их возвращает get_events."""
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 5, 6, 0, tzinfo=timezone.utc)
+    events = []
+    if long_event_days:
+        events.append({
+            "id": "long",
+            "start": {"dateTime": start.isoformat()},
+            "end": {"dateTime": (start + timedelta(days=long_event_days)).isoformat()},
+        })
+    for index in range(count):
+        begin = start + timedelta(minutes=rng.randrange(0, days * 24 * 60, 5))
+        length = timedelta(minutes=rng.choice([30, 45, 90, 90, 180]))
+        events.append({
+            "id": str(index),
+            "start": {"dateTime": begin.isoformat()},
+            "end": {"dateTime": (begin + length).isoformat()},
+        })
+    events.sort(key=lambda event: event["start"]["dateTime"])
+    return events
+
+
+def naive_free_slots(busy: List[Interval], time_min: datetime, time_max: datetime, min_length: timedelta) -> List[Interval]:
+    """Базовый вариант: для каждого рабочего дня фильтрует и сортирует все события."""
+    slots = []
+    for window_start, window_end in working_windows(time_min, time_max, WORK_START, WORK_END, WORKDAYS):
+        day_busy = sorted((start, end) for start, end in busy if start < window_end and end > window_start)
+        cursor = window_start
+        for start, end in day_busy:
+            if start - cursor >= min_length:
+                slots.append((cursor, start))
+            cursor = max(cursor, end)
+        if window_end - cursor >= min_length:
+            slots.append((cursor, window_end))
+    return slots
+
+
+def timed(func: Callable[[], List[Interval]], repeat: int) -> Dict[str, float]:
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started)
+    durations.sort()
+    return {"p50_ms": percentile(durations, 50) * 1000, "p99_ms": percentile(durations, 99) * 1000}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Free-slot finder micro-benchmark")
+    arg_parser.add_argument("--events", type=int, default=5000, help="calendar size")
+    arg_parser.add_argument("--days", type=int, default=180, help="search horizon and event spread, days")
+    arg_parser.add_argument("--minutes", type=int, default=90, help="minimum slot length")
+    arg_parser.add_argument("--repeat", type=int, default=50, help="timed runs per variant")
+    arg_parser.add_argument("--long-event", type=int, default=0, help="add one event lasting this many days at the start")
+    arg_parser.add_argument("--max-ms", type=float, help="fail if prepare + sweep p50 exceeds this value")
+    args = arg_parser.parse_args()
+
+    events = make_events(args.events, args.days, seed=1, long_event_days=args.long_event)
+    time_min = datetime(2026, 1, 5, 9, 0)
+    time_max = time_min + timedelta(days=args.days)
+    min_length = timedelta(minutes=args.minutes)
+    busy = busy_intervals(events, ZONE)
+
+    def prepare() -> List[Interval]:
+        return busy_intervals(events, ZONE)
+
+    def sweep() -> List[Interval]:
+        return find_free_slots(busy, time_min, time_max, min_length, WORK_START, WORK_END, WORKDAYS)
+
+    def naive() -> List[Interval]:
+        return naive_free_slots(busy, time_min, time_max, min_length)
+
+    if sweep() != naive():
+        print("MISMATCH between sweep and naive results")
+        sys.exit(1)
+
+    results = {"prepare": timed(prepare, args.repeat), "sweep": timed(sweep, args.repeat), "naive": timed(naive, args.repeat)}
+    slots = len(sweep())
+    long_event = f", one {args.long_event}-day event" if args.long_event else ""
+    print(f"{args.events} events{long_event}, {args.days} days, {slots} free slots of at least {args.minutes} min")
+    print(f"{'variant':<10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, result in results.items():
+        print(f"{name:<10}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}")
+
+    total_ms = results["prepare"]["p50_ms"] + results["sweep"]["p50_ms"]
+    if args.max_ms is not None and total_ms > args.max_ms:
+        print(f"REGRESSION prepare + sweep p50 {total_ms:.2f} ms > {args.max_ms:.2f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
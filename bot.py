@@ -2,17 +2,51 @@ import asyncio
 import logging
 from aiogram import Bot, Dispatcher, F
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.client.default import DefaultBotProperties
 from aiogram.filters import Command
 
-from config.settings import BOT_TOKEN
+from config.settings import BOT_TOKEN, CALENDAR_WEBHOOK_URL, CALENDAR_SYNC_INTERVAL, CALENDAR_WEBHOOK_SYNC_INTERVAL
 from routers import commands, calendar
-from routers.calendar import cmd_calendar
+from routers.calendar import cmd_calendar, calendar_api
 from utils.logger import setup_logger
 from middlewares.throttling import ThrottlingMiddleware
 from middlewares.user_middleware import UserMiddleware
 from states.language_states import LanguageStates
+from services.calendar_webhook import CalendarWatcher
+from database.user_cache import user_cache
+from database.stats_aggregator import stats_aggregator
+from database.fsm_storage import fsm_storage
+from services.broadcast import broadcast_engine
+
+# Прием push-уведомлений Google Calendar включается, если задан публичный адрес
+calendar_watcher = CalendarWatcher(calendar_api) if CALENDAR_WEBHOOK_URL else None
+
+async def on_startup(bot: Bot):
+    # Загружаем учетные данные Google и запускаем фоновые задачи календаря. С push-уведомлениями
+    # изменения приходят сами, и периодическая синхронизация остается только редкой страховкой
+    await calendar_api.start(CALENDAR_WEBHOOK_SYNC_INTERVAL if calendar_watcher else CALENDAR_SYNC_INTERVAL)
+    if calendar_watcher:
+        await calendar_watcher.start()
+    # Фоновая пакетная запись новых пользователей
+    user_cache.start()
+    # Фоновая запись статистики нажатий
+    stats_aggregator.start()
+    # Фоновая запись состояний диалогов (aiogram закрывает хранилище при остановке сам)
+    fsm_storage.start()
+    # Продолжаем рассылки, прерванные остановкой бота
+    await broadcast_engine.resume(bot)
+
+async def on_shutdown():
+    # Прерываем рассылки, сохранив позицию: они продолжатся при следующем запуске
+    await broadcast_engine.stop()
+    if calendar_watcher:
+        await calendar_watcher.stop()
+    # Останавливаем фоновые задачи и пул потоков клиента Google Calendar
+    calendar_api.close()
+    # Записываем пользователей, которые еще ждут создания
+    await user_cache.stop()
+    # Записываем накопленные нажатия
+    await stats_aggregator.stop()
 
 async def main():
     # Настройка логирования
@@ -28,8 +62,10 @@ async def main():
         token=BOT_TOKEN,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
-    storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
+    # Состояния диалогов хранятся в базе и переживают перезапуск бота
+    dp = Dispatcher(storage=fsm_storage)
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
     
     # Регистрация middleware
     dp.message.outer_middleware(ThrottlingMiddleware())
@@ -8,16 +8,108 @@ ADMIN_IDS_STR = os.environ.get('ADMIN_IDS', '')
 ADMIN_IDS = set(map(int, ADMIN_IDS_STR.split(','))) if ADMIN_IDS_STR else set()
 
 # Настройки базы данных
-DATABASE_URL = "sqlite+aiosqlite:///storage/bot.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./telegram_bot.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))  # постоянные соединения пула
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))  # дополнительные соединения под нагрузкой
+DB_BUSY_TIMEOUT = 5000  # сколько ждать блокировку записи SQLite, в миллисекундах
+# Кэш пользователей в UserMiddleware
+USER_CACHE_TTL = 600  # в секундах
+USER_CACHE_MAX_SIZE = 10000
+USER_CREATE_BATCH_SIZE = 100  # новых пользователей в одном INSERT
+USER_CREATE_FLUSH_INTERVAL = 1.0  # как часто записывать новых пользователей, в секундах
+# Ограничение частоты сообщений пользователей (ThrottlingMiddleware)
+THROTTLE_RATE = 1.0  # сообщений в секунду в среднем
+THROTTLE_BURST = 5  # сколько сообщений подряд можно отправить без паузы
+THROTTLE_WARNING_WINDOW = 10  # не чаще одного предупреждения за столько секунд
+THROTTLE_EVICTION_INTERVAL = 60  # как часто удалять ведра неактивных пользователей, в секундах
+# memory - в памяти процесса, sqlite - в базе данных (общие лимиты для нескольких процессов)
+THROTTLE_BACKEND = os.getenv("THROTTLE_BACKEND", "memory")
+# Хранилище состояний диалогов (FSM) в базе данных
+# Сколько держать прочитанное состояние в памяти, в секундах. Другой процесс может за это время
+# сменить состояние чата, поэтому большие значения подходят только для одного процесса бота;
+# 0 - читать из базы каждый раз. Записать поверх более новой строки версия не даст в любом случае
+FSM_CACHE_TTL = float(os.getenv("FSM_CACHE_TTL", "1"))
+FSM_CACHE_MAX_SIZE = 10000
+FSM_FLUSH_INTERVAL = 0.5  # как часто записывать измененные состояния, в секундах
+FSM_STATE_TTL = 86400  # диалог без изменений дольше этого срока сбрасывается, в секундах
+FSM_PRUNE_INTERVAL = 3600  # как часто удалять устаревшие диалоги из базы, в секундах
+
+# Рассылки
+BROADCAST_PAGE_SIZE = 500  # пользователей в одной странице выборки
+BROADCAST_RATE = 30  # сообщений в секунду: общий лимит Telegram для бота
+BROADCAST_CONCURRENCY = 30  # одновременных запросов sendMessage
+BROADCAST_MAX_RETRIES = 3  # повторов при сетевых ошибках и ошибках сервера Telegram
+BROADCAST_RETRY_BASE_DELAY = 1.0  # первая пауза перед повтором, в секундах; дальше удваивается
+BROADCAST_PROGRESS_INTERVAL = 3.0  # как часто обновлять сообщение о ходе рассылки, в секундах
+BROADCAST_STATUS_BATCH = 200  # результатов доставки в одной записи в базу
+DELIVERY_MAX_FAILURES = 5  # после стольких ошибок доставки подряд пользователь пропускается в рассылках
+
+# Отложенная запись статистики нажатий кнопок
+STATS_FLUSH_INTERVAL = 5.0  # в секундах
+STATS_FLUSH_THRESHOLD = 500  # нажатий, после которых запись выполняется сразу
+# Сколько хранить почасовую и дневную статистику; месячная хранится всегда
+STATS_HOURLY_RETENTION_DAYS = 14
+STATS_DAILY_RETENTION_DAYS = 400
+STATS_PRUNE_INTERVAL = 60 * 60  # как часто удалять устаревшие корзины, в секундах
+STATS_MAX_RANGE_DAYS = 3650  # наибольший период /stats
 
 # Настройки Google Calendar API
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
 GOOGLE_REDIRECT_URI = os.getenv("GOOGLE_REDIRECT_URI", "http://localhost:8080/")
 SCOPES = ['https://www.googleapis.com/auth/calendar']
+GOOGLE_TOKEN_PATH = os.getenv("GOOGLE_TOKEN_PATH", "token.pickle")
+# Альтернативный адрес Calendar API, например локальный сервер из benchmarks/
+GOOGLE_CALENDAR_BASE_URL = os.getenv("GOOGLE_CALENDAR_BASE_URL")
+# За сколько до истечения access token обновлять его в фоне
+CREDENTIALS_REFRESH_MARGIN = 300  # в секундах
+# Календари, события которых показывает бот (ID через запятую), например лекции, лабораторные и экзамены
+CALENDAR_IDS = [calendar_id.strip() for calendar_id in os.getenv("CALENDAR_IDS", "primary").split(",") if calendar_id.strip()]
+# Максимальное число одновременных запросов к Google Calendar API
+CALENDAR_MAX_CONCURRENCY = int(os.getenv("CALENDAR_MAX_CONCURRENCY", "8"))
+CALENDAR_HTTP_TIMEOUT = int(os.getenv("CALENDAR_HTTP_TIMEOUT", "30"))  # в секундах
+# Период инкрементальной синхронизации локальной копии календаря (0 - отключить)
+CALENDAR_SYNC_INTERVAL = int(os.getenv("CALENDAR_SYNC_INTERVAL", "60"))  # в секундах
+# Период той же синхронизации при включенных push-уведомлениях: только страховка от
+# потерянных уведомлений и каналов, которые не удалось создать (0 - отключить)
+CALENDAR_WEBHOOK_SYNC_INTERVAL = int(os.getenv("CALENDAR_WEBHOOK_SYNC_INTERVAL", "3600"))  # в секундах
+# Размер страницы events().list (maxResults, не больше 2500)
+CALENDAR_PAGE_SIZE = int(os.getenv("CALENDAR_PAGE_SIZE", "250"))
+# Push-уведомления об изменениях календаря (events.watch).
+# Публичный HTTPS-адрес, по которому Google будет слать уведомления; без него уведомления отключены
+CALENDAR_WEBHOOK_URL = os.getenv("CALENDAR_WEBHOOK_URL")
+CALENDAR_WEBHOOK_HOST = os.getenv("CALENDAR_WEBHOOK_HOST", "0.0.0.0")
+CALENDAR_WEBHOOK_PORT = int(os.getenv("CALENDAR_WEBHOOK_PORT", "8081"))
+CALENDAR_WEBHOOK_PATH = os.getenv("CALENDAR_WEBHOOK_PATH", "/calendar/notifications")
+CALENDAR_WATCH_TTL = 7 * 24 * 60 * 60  # срок жизни канала, в секундах
+CALENDAR_WATCH_RENEW_MARGIN = 60 * 60  # за сколько до истечения продлевать канал, в секундах
+# Число запросов в одном batch-запросе (ограничение Calendar API - 50)
+CALENDAR_BATCH_SIZE = int(os.getenv("CALENDAR_BATCH_SIZE", "50"))
+# Частичные ответы (параметр fields): только поля, которые читает бот.
+# Пустое значение отключает проекцию для соответствующего вызова
+CALENDAR_LIST_FIELDS = os.getenv(
+    "CALENDAR_LIST_FIELDS",
+    "nextPageToken,items(id,summary,description,start,end)",
+)
+CALENDAR_SYNC_FIELDS = os.getenv(
+    "CALENDAR_SYNC_FIELDS",
+    "nextPageToken,nextSyncToken,"
+    "items(id,status,summary,description,start,end,updated,recurrence,recurringEventId,originalStartTime)",
+)
+CALENDAR_INSERT_FIELDS = os.getenv("CALENDAR_INSERT_FIELDS", "id,status,summary,description,start,end,updated")
+
+# Поиск свободного времени (/free)
+WORK_DAY_START = os.getenv("WORK_DAY_START", "09:00")
+WORK_DAY_END = os.getenv("WORK_DAY_END", "18:00")
+WORKDAYS = [0, 1, 2, 3, 4, 5]  # дни недели с занятиями, 0 - понедельник
+FREE_SLOT_DEFAULT_DAYS = 7
+FREE_SLOT_DEFAULT_MINUTES = 90  # одна пара
+FREE_SLOT_MAX_DAYS = 60
+FREE_SLOT_MAX_SHOWN = 50  # сколько окон показывать в одном сообщении
 
 # Настройки кэширования
-CACHE_TTL = 10  # в секундах 
+CACHE_TTL = 10  # в секундах
+CACHE_MAX_SIZE = 128  # максимальное число записей в кэше событий
 
 # Language settings
 LANGUAGES = {
@@ -1,12 +1,43 @@
+import asyncio
 import os
 import sys
 
 print("Current working directory:", os.getcwd())
 print("sys.path:", sys.path)
 
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
 from database.database import engine, Base
 from database import models # Импортируем все модели, чтобы они были известны Base.metadata
 
+
+def upgrade_schema(connection):
+    """Приводит существующие таблицы к моделям: create_all не добавляет в них
+    новые столбцы и индексы и не удаляет индексы, убранные из моделей."""
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        model_indexes = {index.name for index in table.indexes}
+        for index in inspector.get_indexes(table.name):
+            if index["name"].startswith("ix_") and index["name"] not in model_indexes:
+                print(f"Dropping index {index['name']}")
+                connection.execute(text(f"DROP INDEX {index['name']}"))
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                print(f"Adding column {table.name}.{column.name}")
+                column_ddl = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}"))
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+async def create_tables():
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.run_sync(upgrade_schema)
+    await engine.dispose()
+
+
 print("Creating database tables...")
-Base.metadata.create_all(bind=engine)
-print("Database tables created successfully.") 
\ No newline at end of file
+asyncio.run(create_tables())
+print("Database tables created successfully.")
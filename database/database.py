@@ -1,19 +1,36 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+import os
+from typing import AsyncIterator
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+from config.settings import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_BUSY_TIMEOUT
 
-DATABASE_URL = "sqlite:///./telegram_bot.db"
+# Каталог файла SQLite должен существовать до первого подключения
+_database_path = make_url(DATABASE_URL).database
+if _database_path and _database_path != ":memory:" and os.path.dirname(_database_path):
+    os.makedirs(os.path.dirname(_database_path), exist_ok=True)
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Асинхронный движок (aiosqlite): запросы к БД не блокируют цикл событий aiogram
+engine = create_async_engine(DATABASE_URL, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL позволяет читать параллельно с записью, а busy_timeout - дождаться
+    # блокировки записи вместо немедленной ошибки "database is locked"
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT}")
+    cursor.close()
+
+
+# expire_on_commit=False: объекты остаются доступными после commit без повторной загрузки
+SessionLocal = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db() -> AsyncIterator[AsyncSession]:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close() 
\ No newline at end of file
@@ -0,0 +1,286 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey, DEFAULT_DESTINY
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.dialects.sqlite import insert
+
+from config.settings import FSM_CACHE_TTL, FSM_CACHE_MAX_SIZE, FSM_FLUSH_INTERVAL, FSM_STATE_TTL, FSM_PRUNE_INTERVAL
+from database.database import engine
+from database.models import FsmRecord
+from services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+RowKey = Tuple[int, int, int, str]
+
+
+def _encode_value(value: Any) -> Any:
+    # Даты в данных календаря сохраняются с пометкой типа, чтобы вернуться теми же объектами
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, date):
+        return {"$date": value.isoformat()}
+    if isinstance(value, dt_time):
+        return {"$time": value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode_value(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1:
+        ((tag, value),) = obj.items()
+        if tag == "$datetime":
+            return datetime.fromisoformat(value)
+        if tag == "$date":
+            return date.fromisoformat(value)
+        if tag == "$time":
+            return dt_time.fromisoformat(value)
+    return obj
+
+
+def dump_data(data: Dict[str, Any]) -> Optional[str]:
+    """Компактный JSON данных состояния; None для пустых данных."""
+    if not data:
+        return None
+    return json.dumps(data, default=_encode_value, ensure_ascii=False, separators=(",", ":"))
+
+
+def load_data(payload: Optional[str]) -> Dict[str, Any]:
+    return json.loads(payload, object_hook=_decode_value) if payload else {}
+
+
+def row_key(key: StorageKey) -> RowKey:
+    """Первичный ключ строки: (bot, chat, user) и scope для тем, бизнес-подключений и destiny."""
+    scope = ""
+    if key.thread_id is not None or key.business_connection_id is not None or key.destiny != DEFAULT_DESTINY:
+        scope = f"{key.destiny}:{key.thread_id or ''}:{key.business_connection_id or ''}"
+    return key.bot_id, key.chat_id, key.user_id, scope
+
+
+class _Record:
+    """Состояние и данные одного ключа. Данные хранятся и как словарь, и как JSON для записи."""
+
+    __slots__ = ("state", "data", "payload", "updated", "version")
+
+    def __init__(
+        self, state: Optional[str] = None, payload: Optional[str] = None, updated: float = 0.0, version: int = 0,
+    ):
+        self.state = state
+        self.payload = payload
+        self.data = load_data(payload)
+        self.updated = updated  # время Unix последнего изменения
+        self.version = version  # версия строки в базе, на которой основана запись (0 - строки нет)
+
+    def is_empty(self) -> bool:
+        return self.state is None and self.payload is None
+
+
+class SQLiteStorage(BaseStorage):
+    """Хранилище FSM aiogram в базе данных бота.
+
+    Чтение обслуживается из памяти: недавние ключи хранятся в LRU-кэше, а
+    изменения копятся и записываются одной транзакцией раз в flush_interval,
+    поэтому set_state и update_data одного апдейта дают одну запись строки.
+    Диалоги без изменений дольше state_ttl сбрасываются.
+
+    Несколько процессов видят изменения друг друга после записи и истечения
+    кэша (по умолчанию около секунды). Запись условная: строка меняется,
+    только если ее версия не изменилась с момента чтения. Если другой процесс
+    успел сменить состояние чата, изменения этого процесса отбрасываются, а
+    следующее чтение получит строку из базы.
+    """
+
+    def __init__(
+        self,
+        cache_ttl: float = FSM_CACHE_TTL,
+        cache_max_size: int = FSM_CACHE_MAX_SIZE,
+        flush_interval: float = FSM_FLUSH_INTERVAL,
+        state_ttl: float = FSM_STATE_TTL,
+        prune_interval: float = FSM_PRUNE_INTERVAL,
+    ):
+        self._cache = TTLCache(cache_ttl, cache_max_size)
+        # Измененные, еще не записанные ключи; читаются раньше кэша
+        self._dirty: Dict[StorageKey, _Record] = {}
+        self.flush_interval = flush_interval
+        self.state_ttl = state_ttl
+        self.prune_interval = prune_interval
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._pruned_at = 0.0
+
+    async def _load(self, key: StorageKey) -> _Record:
+        bot_id, chat_id, user_id, scope = row_key(key)
+        async with engine.connect() as connection:
+            row = (await connection.execute(
+                select(FsmRecord.state, FsmRecord.data, FsmRecord.updated_at, FsmRecord.version).where(
+                    FsmRecord.bot_id == bot_id,
+                    FsmRecord.chat_id == chat_id,
+                    FsmRecord.user_id == user_id,
+                    FsmRecord.scope == scope,
+                )
+            )).first()
+        if row is None:
+            return _Record()
+        # updated_at хранится в UTC без часового пояса
+        updated = (row.updated_at - datetime(1970, 1, 1)).total_seconds()
+        return _Record(row.state, row.data, updated, row.version)
+
+    async def _record(self, key: StorageKey) -> _Record:
+        record = self._dirty.get(key)
+        if record is None:
+            record = await self._cache.get_or_load(key, lambda: self._load(key))
+        if record.updated and time.time() - record.updated > self.state_ttl:
+            # Устаревший диалог забывается; строку удалит prune
+            record.state = None
+            record.payload = None
+            record.data = {}
+            record.updated = 0.0
+        return record
+
+    def _mark_dirty(self, key: StorageKey, record: _Record) -> None:
+        record.updated = time.time()
+        self._dirty[key] = record
+        self._cache.set(key, record)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._record(key)
+        record.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(key, record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._record(key)).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            msg = f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            raise DataNotDictLikeError(msg)
+        # Сериализуем сразу: неподдерживаемое значение - ошибка обработчика, а не фоновой записи
+        payload = dump_data(data)
+        record = await self._record(key)
+        record.payload = payload
+        record.data = data.copy()
+        self._mark_dirty(key, record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._record(key)).data.copy()
+
+    async def flush(self) -> int:
+        """Записывает измененные ключи одной транзакцией. Возвращает их число."""
+        async with self._flush_lock:
+            if not self._dirty:
+                return 0
+            batch, self._dirty = self._dirty, {}
+            # Снимок записей до первого await: ключи могут снова измениться во время записи
+            # Первичный ключ строки -> (ключ FSM, версия строки после записи)
+            versions: Dict[RowKey, Tuple[StorageKey, int]] = {}
+            rows = []
+            cleared = []
+            for key, record in batch.items():
+                primary_key = row_key(key)
+                bot_id, chat_id, user_id, scope = primary_key
+                if record.is_empty():
+                    if not record.version:
+                        continue  # строки в базе нет
+                    versions[primary_key] = (key, 0)
+                    cleared.append((bot_id, chat_id, user_id, scope, record.version))
+                else:
+                    versions[primary_key] = (key, record.version + 1)
+                    rows.append({
+                        "bot_id": bot_id, "chat_id": chat_id, "user_id": user_id, "scope": scope,
+                        "state": record.state, "data": record.payload,
+                        "updated_at": datetime.utcfromtimestamp(record.updated),
+                        "version": record.version + 1,
+                    })
+            key_columns = (FsmRecord.bot_id, FsmRecord.chat_id, FsmRecord.user_id, FsmRecord.scope)
+            try:
+                async with engine.begin() as connection:
+                    written = []
+                    if rows:
+                        stmt = insert(FsmRecord).values(rows)
+                        stmt = stmt.on_conflict_do_update(
+                            index_elements=key_columns,
+                            set_={
+                                "state": stmt.excluded.state,
+                                "data": stmt.excluded.data,
+                                "updated_at": stmt.excluded.updated_at,
+                                "version": stmt.excluded.version,
+                            },
+                            # Строку, измененную другим процессом после нашего чтения, не трогаем
+                            where=FsmRecord.version == stmt.excluded.version - 1,
+                        ).returning(*key_columns)
+                        written = (await connection.execute(stmt)).all()
+                    deleted = []
+                    if cleared:
+                        # Пустое состояние не хранится: clear() удаляет строку
+                        deleted = (await connection.execute(delete(FsmRecord).where(
+                            tuple_(*key_columns, FsmRecord.version).in_(cleared)
+                        ).returning(*key_columns))).all()
+            except Exception:
+                # Возвращаем пакет, не затирая более свежие изменения
+                for key, record in batch.items():
+                    self._dirty.setdefault(key, record)
+                raise
+
+            applied = {tuple(row) for row in written} | {tuple(row) for row in deleted}
+            conflicts = 0
+            for primary_key, (key, version) in versions.items():
+                record = batch[key]
+                if primary_key in applied:
+                    record.version = version
+                else:
+                    # Другой процесс успел сменить состояние: берем его версию из базы
+                    conflicts += 1
+                    if self._dirty.get(key) is record:
+                        del self._dirty[key]
+                    self._cache.invalidate(key)
+            if conflicts:
+                logger.warning(f"Discarded {conflicts} FSM states changed by another process.")
+            logger.debug(f"Flushed {len(batch)} FSM states.")
+            return len(batch)
+
+    async def prune(self) -> int:
+        """Удаляет из базы диалоги без изменений дольше state_ttl."""
+        async with engine.begin() as connection:
+            result = await connection.execute(delete(FsmRecord).where(
+                FsmRecord.updated_at < datetime.utcnow() - timedelta(seconds=self.state_ttl)
+            ))
+        self._pruned_at = time.monotonic()
+        if result.rowcount:
+            logger.info(f"Removed {result.rowcount} expired FSM states.")
+        return result.rowcount
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if time.monotonic() - self._pruned_at >= self.prune_interval:
+                    await self.prune()
+            except Exception as e:
+                logger.error(f"Failed to save FSM states: {e}")
+
+    def start(self) -> None:
+        """Запускает фоновую запись состояний."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        """Останавливает фоновую запись и записывает оставшиеся изменения (вызывается aiogram при остановке)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+# Общее хранилище состояний процесса
+fsm_storage = SQLiteStorage()
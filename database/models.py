@@ -1,15 +1,129 @@
-from sqlalchemy import Column, Integer, String, BigInteger
+from sqlalchemy import Column, Integer, String, BigInteger, Boolean, Date, DateTime, Float, Text, Index, false, text
 from .database import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Рассылка выбирает доступных пользователей одного языка страницами по id
+        # одним поиском по индексу
+        Index("ix_users_delivery_language", "is_blocked", "is_deactivated", "language_code", "id"),
+    )
 
     id = Column(BigInteger, primary_key=True, index=True)
-    language_code = Column(String, default="en")
+    language_code = Column(String, default="en", index=True)
+    # Состояние доставки сообщений по результатам рассылок
+    is_blocked = Column(Boolean, nullable=False, default=False, server_default=false())  # пользователь заблокировал бота
+    is_deactivated = Column(Boolean, nullable=False, default=False, server_default=false())  # аккаунт удален
+    last_delivered_at = Column(DateTime)  # UTC
+    delivery_failures = Column(Integer, nullable=False, default=0, server_default=text("0"))  # ошибок доставки подряд
 
 class ButtonStatistic(Base):
     __tablename__ = "button_statistics"
 
     id = Column(Integer, primary_key=True, index=True)
     button_key = Column(String, unique=True, index=True)
-    click_count = Column(Integer, default=0) 
\ No newline at end of file
+    click_count = Column(Integer, default=0)
+
+# Нажатия кнопок по часам и их свертки по дням и месяцам (время в UTC).
+# Запрос за период читает самые крупные корзины, целиком лежащие в нем
+class ButtonStatisticHourly(Base):
+    __tablename__ = "button_statistics_hourly"
+    __table_args__ = (Index("ix_button_statistics_hourly_hour", "hour"),)
+
+    button_key = Column(String, primary_key=True)
+    hour = Column(DateTime, primary_key=True)  # начало часа
+    click_count = Column(Integer, nullable=False, default=0)
+
+class ButtonStatisticDaily(Base):
+    __tablename__ = "button_statistics_daily"
+    __table_args__ = (Index("ix_button_statistics_daily_day", "day"),)
+
+    button_key = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    click_count = Column(Integer, nullable=False, default=0)
+
+class ButtonStatisticMonthly(Base):
+    __tablename__ = "button_statistics_monthly"
+    __table_args__ = (Index("ix_button_statistics_monthly_month", "month"),)
+
+    button_key = Column(String, primary_key=True)
+    month = Column(Date, primary_key=True)  # первое число месяца
+    click_count = Column(Integer, nullable=False, default=0)
+
+# Локальная копия событий Google Calendar, поддерживаемая инкрементальной синхронизацией
+class Event(Base):
+    __tablename__ = "events"
+    __table_args__ = (
+        Index("ix_events_calendar_start", "calendar_id", "start_time"),
+        Index("ix_events_calendar_recurring", "calendar_id", "recurring_event_id"),
+    )
+
+    calendar_id = Column(String, primary_key=True)
+    id = Column(String, primary_key=True)
+    summary = Column(String)
+    # Для серии - интервал от первого до последнего экземпляра
+    start_time = Column(DateTime, nullable=False)  # UTC
+    end_time = Column(DateTime, nullable=False)  # UTC
+    # ID серии для измененных и отмененных экземпляров повторяющегося события
+    recurring_event_id = Column(String)
+    updated = Column(String)
+    data = Column(Text, nullable=False)  # JSON-ресурс события целиком
+
+class CalendarSyncState(Base):
+    __tablename__ = "calendar_sync_state"
+
+    calendar_id = Column(String, primary_key=True)
+    sync_token = Column(String)
+    synced_at = Column(DateTime)
+
+# Рассылка как задание в базе: после перезапуска бота она продолжается с сохраненной позиции
+class BroadcastJob(Base):
+    __tablename__ = "broadcast_jobs"
+    __table_args__ = (Index("ix_broadcast_jobs_status", "status"),)
+
+    id = Column(Integer, primary_key=True)
+    admin_id = Column(BigInteger, nullable=False)
+    text = Column(Text, nullable=False)
+    # JSON: код языка -> текст, подготовленный для этого языка один раз при создании
+    variants = Column(Text)
+    status = Column(String, nullable=False, default="running")  # running, completed, failed (текст отклонен Telegram)
+    # Пользователи обходятся по языкам: язык и наибольший ID в нем, до которого
+    # включительно всем отправлено (языки до cursor_language пройдены целиком)
+    cursor_language = Column(String)
+    cursor = Column(BigInteger)
+    total = Column(Integer, nullable=False, default=0)
+    sent = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    status_message_id = Column(BigInteger)  # сообщение администратору с ходом рассылки
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+# Ведра токенов ThrottlingMiddleware, общие для нескольких процессов бота
+class ThrottleBucket(Base):
+    __tablename__ = "throttle_buckets"
+    __table_args__ = (Index("ix_throttle_buckets_updated", "updated"),)
+
+    key = Column(BigInteger, primary_key=True)  # ID пользователя Telegram
+    tokens = Column(Float, nullable=False)
+    updated = Column(Float, nullable=False)  # время Unix последнего сообщения
+    warned_until = Column(Float, nullable=False, default=0)  # до этого момента предупреждение не повторяется
+    # Решение по последнему сообщению: возвращается тем же UPSERT, что его принял
+    allowed = Column(Boolean, nullable=False, default=True)
+    warn = Column(Boolean, nullable=False, default=False)
+
+# Состояния диалогов aiogram (FSM): переживают перезапуск и общие для процессов бота
+class FsmRecord(Base):
+    __tablename__ = "fsm_states"
+    __table_args__ = (Index("ix_fsm_states_updated_at", "updated_at"),)
+
+    bot_id = Column(BigInteger, primary_key=True)
+    chat_id = Column(BigInteger, primary_key=True)
+    user_id = Column(BigInteger, primary_key=True)
+    # Темы, бизнес-подключения и destiny ключа; пустая строка для обычного ключа
+    scope = Column(String, primary_key=True, default="")
+    state = Column(String)
+    data = Column(Text)  # JSON данных состояния; NULL, если данных нет
+    # Растет при каждой записи: процесс перезаписывает строку, только если видел ее последнюю версию
+    version = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    updated_at = Column(DateTime, nullable=False)  # UTC, последнее изменение
@@ -1,63 +1,343 @@
-from sqlalchemy.orm import Session
-from database.models import User, ButtonStatistic
-from sqlalchemy import update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import (
+    User, ButtonStatistic, ButtonStatisticHourly, ButtonStatisticDaily, ButtonStatisticMonthly, BroadcastJob,
+    Event, CalendarSyncState,
+)
+from sqlalchemy import Row, and_, select, update, delete, func, false, true
+from sqlalchemy.dialects.sqlite import insert
+from database.user_cache import user_cache
+from database.stats_aggregator import stats_aggregator, split_range
+from datetime import datetime
+from typing import AsyncIterator
+from config.settings import BROADCAST_PAGE_SIZE, DELIVERY_MAX_FAILURES
+from utils.recurrence import event_span, expand_events
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
 class UserRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def get_user(self, user_id: int) -> User | None:
+    async def get_user(self, user_id: int) -> User | None:
         """Получает пользователя по его ID."""
         logger.debug(f"Fetching user with id: {user_id}")
-        return self.db.query(User).filter(User.id == user_id).first()
+        return await self.db.get(User, user_id)
 
-    def create_user(self, user_id: int, language_code: str) -> User:
+    async def create_user(self, user_id: int, language_code: str) -> User:
         """Создает нового пользователя в базе данных."""
         logger.info(f"Creating new user with id: {user_id}, language: {language_code}")
         db_user = User(id=user_id, language_code=language_code)
         self.db.add(db_user)
-        self.db.commit()
-        self.db.refresh(db_user)
+        await self.db.commit()
+        user_cache.remember(user_id, language_code)
         return db_user
 
-    def update_user_language(self, user_id: int, language_code: str) -> User | None:
+    async def update_user_language(self, user_id: int, language_code: str) -> User | None:
         """Обновляет язык пользователя."""
         logger.info(f"Updating language for user {user_id} to {language_code}")
-        self.db.query(User).filter(User.id == user_id).update({"language_code": language_code})
-        self.db.commit()
-        return self.get_user(user_id)
+        # UPSERT: пользователь может еще ждать пакетного создания в кэше
+        user_cache.take_pending(user_id)
+        await self.db.execute(
+            insert(User)
+            .values(id=user_id, language_code=language_code)
+            .on_conflict_do_update(index_elements=[User.id], set_={"language_code": language_code})
+        )
+        await self.db.commit()
+        user_cache.remember(user_id, language_code)
+        # Пользователь мог быть загружен в сессию раньше: перечитываем его поверх старых значений
+        return await self.db.get(User, user_id, populate_existing=True)
 
-    def get_all_users(self) -> list[User]:
+    async def get_all_users(self) -> list[User]:
         """Получает список всех пользователей."""
         logger.debug("Fetching all users for broadcast")
-        return self.db.query(User).all()
+        result = await self.db.scalars(select(User))
+        return list(result.all())
+
+    @staticmethod
+    def _reachable():
+        # is_blocked и is_deactivated - начало индекса ix_users_delivery_language, за ними
+        # идут language_code и id для выборки по языкам; delivery_failures проверяется по строкам таблицы
+        return (
+            User.is_blocked == false(),
+            User.is_deactivated == false(),
+            User.delivery_failures < DELIVERY_MAX_FAILURES,
+        )
+
+    async def count_users(self, reachable_only: bool = False) -> int:
+        """Возвращает число пользователей (только доступных для рассылки при reachable_only)."""
+        stmt = select(func.count(User.id))
+        if reachable_only:
+            stmt = stmt.where(*self._reachable())
+        return await self.db.scalar(stmt)
+
+    async def iter_users(
+        self,
+        page_size: int = BROADCAST_PAGE_SIZE,
+        reachable_only: bool = False,
+        after_id: int | None = None,
+        by_language: bool = False,
+        language_code: str | None = None,
+    ) -> AsyncIterator[Row]:
+        """Потоково отдает пользователей (id, language_code) в порядке id.
+
+        Страницы выбираются по ключу (id > последнего), а не через OFFSET, поэтому
+        каждая страница - короткий поиск по индексу, а в памяти хранится только она.
+        При reachable_only пропускаются пользователи, которым доставка невозможна,
+        after_id продолжает выборку после указанного пользователя, by_language
+        ограничивает выборку пользователями с языком language_code (в том числе None).
+        """
+        last_id = after_id
+        while True:
+            stmt = select(User.id, User.language_code).order_by(User.id).limit(page_size)
+            if reachable_only:
+                stmt = stmt.where(*self._reachable())
+            if by_language:
+                stmt = stmt.where(User.language_code.is_(None) if language_code is None else User.language_code == language_code)
+            if last_id is not None:
+                stmt = stmt.where(User.id > last_id)
+            page = (await self.db.execute(stmt)).all()
+            for row in page:
+                yield row
+            if len(page) < page_size:
+                return
+            last_id = page[-1].id
+
+    async def get_languages(self, reachable_only: bool = False) -> list[str | None]:
+        """Языки пользователей (None - язык не задан), упорядоченные по коду."""
+        stmt = select(User.language_code).distinct().order_by(User.language_code)
+        if reachable_only:
+            stmt = stmt.where(*self._reachable())
+        return list((await self.db.scalars(stmt)).all())
+
+    async def record_deliveries(
+        self,
+        delivered: list[int],
+        blocked: list[int],
+        deactivated: list[int],
+        unreachable: list[int],
+        commit: bool = True,
+    ) -> None:
+        """Сохраняет результаты доставки пакета сообщений одной транзакцией.
+
+        Передаются только результаты, зависящие от чата получателя: сбои сети и
+        ошибки самого сообщения не должны исключать пользователя из рассылок.
+        С commit=False транзакцию завершает вызывающий код (например, вместе с позицией рассылки).
+        """
+        if delivered:
+            await self.db.execute(
+                update(User).where(User.id.in_(delivered))
+                .values(last_delivered_at=datetime.utcnow(), delivery_failures=0)
+            )
+        if blocked:
+            await self.db.execute(
+                update(User).where(User.id.in_(blocked))
+                .values(is_blocked=True, delivery_failures=User.delivery_failures + 1)
+            )
+        if deactivated:
+            await self.db.execute(
+                update(User).where(User.id.in_(deactivated))
+                .values(is_deactivated=True, delivery_failures=User.delivery_failures + 1)
+            )
+        if unreachable:
+            await self.db.execute(
+                update(User).where(User.id.in_(unreachable))
+                .values(delivery_failures=User.delivery_failures + 1)
+            )
+        if commit:
+            await self.db.commit()
+        # Следующее сообщение такого пользователя пройдет мимо кэша, и UserMiddleware
+        # увидит, что чат снова доступен
+        for user_id in (*blocked, *deactivated, *unreachable):
+            user_cache.invalidate(user_id)
+        logger.debug(f"Recorded deliveries: {len(delivered)} delivered, {len(blocked)} blocked, "
+                     f"{len(deactivated)} deactivated, {len(unreachable)} unreachable")
+
+    async def mark_reachable(self, user_id: int) -> None:
+        """Сбрасывает состояние доставки: пользователь снова пишет боту."""
+        logger.info(f"User {user_id} is reachable again, resetting delivery status")
+        await self.db.execute(
+            update(User).where(User.id == user_id)
+            .values(is_blocked=False, is_deactivated=False, delivery_failures=0)
+        )
+        await self.db.commit()
+
+    async def get_delivery_counts(self) -> dict[str, int]:
+        """Число доступных и недоступных для рассылки пользователей."""
+        reachable = and_(*self._reachable())
+        row = (await self.db.execute(select(
+            func.count(User.id).label("total"),
+            func.count(User.id).filter(reachable).label("reachable"),
+            func.count(User.id).filter(User.is_blocked == true()).label("blocked"),
+            func.count(User.id).filter(User.is_deactivated == true()).label("deactivated"),
+        ))).one()
+        return {
+            "total": row.total,
+            "reachable": row.reachable,
+            "unreachable": row.total - row.reachable,
+            "blocked": row.blocked,
+            "deactivated": row.deactivated,
+        }
 
     # Добавьте другие методы для работы с пользователем по мере необходимости 
 
 # Новый репозиторий для статистики нажатий кнопок
 class ButtonStatisticRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def increment_button_click(self, button_key: str):
-        # Используем update для атомарного инкремента счетчика или создания записи, если не существует
-        stmt = update(ButtonStatistic).where(ButtonStatistic.button_key == button_key).values(click_count=ButtonStatistic.click_count + 1)
-        result = self.db.execute(stmt)
+    async def increment_button_click(self, button_key: str):
+        # Нажатие накапливается в памяти и записывается пакетом (см. StatisticsAggregator)
+        stats_aggregator.increment(button_key)
+        logger.debug(f"Counted click for button '{button_key}'.")
 
-        if result.rowcount == 0:
-            # Если запись не была обновлена (не существовала), создаем новую
-            stat = ButtonStatistic(button_key=button_key, click_count=1)
-            self.db.add(stat)
-            logger.debug(f"Created new statistic entry for button '{button_key}' with count 1.")
-        else:
-             logger.debug(f"Incremented click count for button '{button_key}' using update. Rows affected: {result.rowcount}")
+    async def get_all_statistics(self):
+        logger.debug("Fetching all button statistics.")
+        # Читаем под блокировкой накопителя, чтобы пакет, записываемый прямо сейчас,
+        # не был учтен дважды или пропущен
+        async with stats_aggregator.lock:
+            rows = await self.db.execute(select(ButtonStatistic.button_key, ButtonStatistic.click_count))
+            counts = {row.button_key: row.click_count for row in rows}
+            for button_key, count in stats_aggregator.pending().items():
+                counts[button_key] = counts.get(button_key, 0) + count
+        return self._sorted_statistics(counts)
 
-        self.db.commit()
+    async def get_statistics_between(self, time_min: datetime, time_max: datetime):
+        """Нажатия за [time_min, time_max) (UTC, с точностью до часа) из почасовой статистики и ее сверток."""
+        logger.debug(f"Fetching button statistics between {time_min} and {time_max}.")
+        hours, days, months = split_range(time_min, time_max)
+        counts: dict[str, int] = {}
+        async with stats_aggregator.lock:
+            for model, column, ranges, to_bucket in (
+                (ButtonStatisticHourly, ButtonStatisticHourly.hour, hours, lambda moment: moment),
+                (ButtonStatisticDaily, ButtonStatisticDaily.day, days, datetime.date),
+                (ButtonStatisticMonthly, ButtonStatisticMonthly.month, months, datetime.date),
+            ):
+                for lo, hi in ranges:
+                    rows = await self.db.execute(
+                        select(model.button_key, func.sum(model.click_count).label("click_count"))
+                        .where(column >= to_bucket(lo), column < to_bucket(hi))
+                        .group_by(model.button_key)
+                    )
+                    for row in rows:
+                        counts[row.button_key] = counts.get(row.button_key, 0) + row.click_count
+            for button_key, count in stats_aggregator.pending(time_min, time_max).items():
+                counts[button_key] = counts.get(button_key, 0) + count
+        return self._sorted_statistics(counts)
 
-    def get_all_statistics(self):
-        logger.debug("Fetching all button statistics.")
+    @staticmethod
+    def _sorted_statistics(counts: dict[str, int]) -> list[ButtonStatistic]:
         # Возвращаем статистику, отсортированную по убыванию количества кликов
-        return self.db.query(ButtonStatistic).order_by(ButtonStatistic.click_count.desc()).all() 
\ No newline at end of file
+        return [
+            ButtonStatistic(button_key=button_key, click_count=count)
+            for button_key, count in sorted(counts.items(), key=lambda item: item[1], reverse=True)
+        ]
+
+# Репозиторий заданий рассылки
+class BroadcastJobRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create_job(self, admin_id: int, text: str, variants: dict[str, str], total: int) -> BroadcastJob:
+        """Создает задание рассылки с текстами для каждого языка."""
+        now = datetime.utcnow()
+        job = BroadcastJob(admin_id=admin_id, text=text, variants=json.dumps(variants, ensure_ascii=False),
+                           status="running", total=total, sent=0, failed=0, created_at=now, updated_at=now)
+        self.db.add(job)
+        await self.db.commit()
+        logger.info(f"Created broadcast job {job.id} for {total} users")
+        return job
+
+    async def set_status_message(self, job_id: int, message_id: int) -> None:
+        await self.db.execute(update(BroadcastJob).where(BroadcastJob.id == job_id).values(status_message_id=message_id))
+        await self.db.commit()
+
+    async def get_running_jobs(self) -> list[BroadcastJob]:
+        """Задания, прерванные до завершения, в порядке создания."""
+        result = await self.db.scalars(
+            select(BroadcastJob).where(BroadcastJob.status == "running").order_by(BroadcastJob.id)
+        )
+        return list(result.all())
+
+    async def save_checkpoint(
+        self,
+        job_id: int,
+        cursor: tuple[str | None, int] | None,
+        sent: int,
+        failed: int,
+        status: str = "running",
+    ) -> None:
+        """Сохраняет позицию (язык, ID пользователя), счетчики и статус рассылки и завершает транзакцию."""
+        now = datetime.utcnow()
+        values = {"sent": sent, "failed": failed, "updated_at": now}
+        if cursor is not None:
+            values.update(cursor_language=cursor[0], cursor=cursor[1])
+        if status != "running":
+            values.update(status=status, finished_at=now)
+        await self.db.execute(update(BroadcastJob).where(BroadcastJob.id == job_id).values(**values))
+        await self.db.commit()
+
+# Репозиторий локальной копии событий календаря
+class EventRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_sync_token(self, calendar_id: str) -> str | None:
+        """Возвращает сохраненный syncToken календаря."""
+        state = await self.db.get(CalendarSyncState, calendar_id)
+        return state.sync_token if state else None
+
+    async def apply_changes(self, calendar_id: str, items: list[dict], sync_token: str | None = None, full_resync: bool = False) -> None:
+        """Применяет изменения событий и сохраняет новый syncToken в одной транзакции."""
+        if full_resync:
+            await self.db.execute(delete(Event).where(Event.calendar_id == calendar_id))
+
+        for item in items:
+            # Отмененный экземпляр серии храним: он исключает экземпляр при развертывании
+            if item.get('status') == 'cancelled' and not (item.get('recurringEventId') and 'originalStartTime' in item):
+                await self.db.execute(delete(Event).where(Event.calendar_id == calendar_id, Event.id == item['id']))
+                continue
+            span_item = item if 'start' in item else {**item, 'start': item['originalStartTime'], 'end': item['originalStartTime']}
+            start_time, end_time = event_span(span_item)
+            await self.db.merge(Event(
+                calendar_id=calendar_id,
+                id=item['id'],
+                summary=item.get('summary'),
+                start_time=start_time,
+                end_time=end_time,
+                recurring_event_id=item.get('recurringEventId'),
+                updated=item.get('updated'),
+                data=json.dumps(item, ensure_ascii=False),
+            ))
+
+        if sync_token is not None:
+            await self.db.merge(CalendarSyncState(calendar_id=calendar_id, sync_token=sync_token, synced_at=datetime.utcnow()))
+
+        await self.db.commit()
+        logger.debug(f"Applied {len(items)} event changes to calendar '{calendar_id}' (full resync: {full_resync}).")
+
+    async def get_events_between(self, calendar_id: str, time_min: datetime, time_max: datetime) -> list[dict]:
+        """Возвращает экземпляры событий, пересекающиеся с интервалом, отсортированные по началу (время в UTC).
+
+        Повторяющиеся события разворачиваются локально вместе с их исключениями.
+        """
+        rows = await self.db.execute(select(Event.id, Event.data).where(
+            Event.calendar_id == calendar_id,
+            Event.start_time < time_max,
+            Event.end_time > time_min,
+        ))
+        items = {row.id: json.loads(row.data) for row in rows}
+
+        # Исключения серии могут быть перенесены за пределы интервала, но все равно
+        # отменяют исходный экземпляр, поэтому загружаем их для всех серий интервала
+        master_ids = [event_id for event_id, item in items.items() if item.get('recurrence')]
+        if master_ids:
+            exception_rows = await self.db.execute(select(Event.id, Event.data).where(
+                Event.calendar_id == calendar_id,
+                Event.recurring_event_id.in_(master_ids),
+            ))
+            for row in exception_rows:
+                items.setdefault(row.id, json.loads(row.data))
+
+        return expand_events(items.values(), time_min, time_max)
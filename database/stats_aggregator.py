@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert
+
+from config.settings import (
+    STATS_FLUSH_INTERVAL, STATS_FLUSH_THRESHOLD,
+    STATS_HOURLY_RETENTION_DAYS, STATS_DAILY_RETENTION_DAYS, STATS_PRUNE_INTERVAL,
+)
+from database.database import SessionLocal
+from database.models import ButtonStatistic, ButtonStatisticHourly, ButtonStatisticDaily, ButtonStatisticMonthly
+
+logger = logging.getLogger(__name__)
+
+Range = Tuple[datetime, datetime]
+
+
+def hour_start(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def day_start(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def month_start(moment: datetime) -> datetime:
+    return day_start(moment).replace(day=1)
+
+
+def _next_month(moment: datetime) -> datetime:
+    return (moment.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def split_range(time_min: datetime, time_max: datetime) -> Tuple[List[Range], List[Range], List[Range]]:
+    """Делит [time_min, time_max) на часы, дни и месяцы: крупнейшие корзины, целиком лежащие в интервале.
+
+    Границы выравниваются по часу. Часов и дней получается не больше чем на
+    два неполных дня и два неполных месяца по краям, поэтому стоимость
+    запроса не зависит от длины истории.
+    """
+    time_min = hour_start(time_min)
+    time_max = hour_start(time_max)
+    hours: List[Range] = []
+    days: List[Range] = []
+    months: List[Range] = []
+
+    day_lo = day_start(time_min)
+    if day_lo < time_min:
+        day_lo += timedelta(days=1)
+    day_hi = day_start(time_max)
+    if day_lo >= day_hi:
+        return [(time_min, time_max)], days, months
+    hours = [(time_min, day_lo), (day_hi, time_max)]
+
+    month_lo = month_start(day_lo)
+    if month_lo < day_lo:
+        month_lo = _next_month(month_lo)
+    month_hi = month_start(day_hi)
+    if month_lo >= month_hi:
+        days = [(day_lo, day_hi)]
+    else:
+        days = [(day_lo, month_lo), (month_hi, day_hi)]
+        months = [(month_lo, month_hi)]
+    return [r for r in hours if r[0] < r[1]], [r for r in days if r[0] < r[1]], months
+
+
+def retained_start(time_min: datetime, now: datetime) -> datetime:
+    """Начало периода с точностью, которая еще хранится: часы старше срока хранения
+    доступны только в дневной свертке, дни - только в месячной."""
+    if time_min < month_start(now) - timedelta(days=STATS_DAILY_RETENTION_DAYS):
+        return month_start(time_min)
+    if time_min < day_start(now) - timedelta(days=STATS_HOURLY_RETENTION_DAYS):
+        return day_start(time_min)
+    return hour_start(time_min)
+
+
+class StatisticsAggregator:
+    """Накопитель нажатий кнопок с отложенной записью (write-behind).
+
+    Нажатия суммируются в памяти по (button_key, час) и записываются в одной
+    транзакции: по одному UPSERT в общий счетчик и в почасовую, дневную и
+    месячную статистику. Запись выполняется периодически, при накоплении
+    threshold нажатий и при остановке бота.
+    """
+
+    def __init__(self, flush_interval: float = STATS_FLUSH_INTERVAL, threshold: int = STATS_FLUSH_THRESHOLD):
+        self.flush_interval = flush_interval
+        self.threshold = threshold
+        # (button_key, начало часа UTC) -> число нажатий
+        self._pending: Counter = Counter()
+        self._pending_total = 0
+        # Запись и чтение статистики с учетом накопленного не должны пересекаться,
+        # иначе записываемый пакет будет учтен дважды или пропущен
+        self.lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._pruned_at = 0.0
+
+    def increment(self, button_key: str, count: int = 1) -> None:
+        """Учитывает нажатие без обращения к базе."""
+        self._pending[(button_key, hour_start(datetime.utcnow()))] += count
+        self._pending_total += count
+        if self._pending_total >= self.threshold:
+            self._wakeup.set()
+
+    def pending(self, time_min: Optional[datetime] = None, time_max: Optional[datetime] = None) -> Dict[str, int]:
+        """Нажатия, еще не записанные в базу, по кнопкам; при заданных границах - только за [time_min, time_max)."""
+        counts: Counter = Counter()
+        for (button_key, hour), count in self._pending.items():
+            if (time_min is None or hour >= time_min) and (time_max is None or hour < time_max):
+                counts[button_key] += count
+        return dict(counts)
+
+    @staticmethod
+    def _upsert(model, counts: Counter, bucket_column: Optional[str] = None):
+        """UPSERT, прибавляющий counts к счетчикам model; ключи counts - button_key или (button_key, корзина)."""
+        if bucket_column is None:
+            rows = [{"button_key": key, "click_count": count} for key, count in counts.items()]
+            index_elements = ["button_key"]
+        else:
+            rows = [{"button_key": key, bucket_column: bucket, "click_count": count} for (key, bucket), count in counts.items()]
+            index_elements = ["button_key", bucket_column]
+        stmt = insert(model).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={"click_count": model.click_count + stmt.excluded.click_count},
+        )
+
+    async def flush(self) -> int:
+        """Записывает накопленные нажатия. Возвращает число записанных кнопок."""
+        async with self.lock:
+            if not self._pending:
+                return 0
+            batch, self._pending, self._pending_total = self._pending, Counter(), 0
+            totals: Counter = Counter()
+            daily: Counter = Counter()
+            monthly: Counter = Counter()
+            for (button_key, hour), count in batch.items():
+                totals[button_key] += count
+                daily[(button_key, hour.date())] += count
+                monthly[(button_key, month_start(hour).date())] += count
+            try:
+                async with SessionLocal() as db:
+                    await db.execute(self._upsert(ButtonStatistic, totals))
+                    await db.execute(self._upsert(ButtonStatisticHourly, batch, "hour"))
+                    await db.execute(self._upsert(ButtonStatisticDaily, daily, "day"))
+                    await db.execute(self._upsert(ButtonStatisticMonthly, monthly, "month"))
+                    await db.commit()
+            except Exception:
+                # Возвращаем пакет, чтобы записать его в следующий раз
+                self._pending.update(batch)
+                self._pending_total += sum(batch.values())
+                raise
+            logger.debug(f"Flushed click counters for {len(totals)} buttons.")
+            return len(totals)
+
+    async def prune(self) -> None:
+        """Удаляет почасовые и дневные корзины старше срока хранения: их заменяют свертки."""
+        now = datetime.utcnow()
+        # Границы совпадают с retained_start
+        async with SessionLocal() as db:
+            await db.execute(delete(ButtonStatisticHourly).where(
+                ButtonStatisticHourly.hour < day_start(now) - timedelta(days=STATS_HOURLY_RETENTION_DAYS)
+            ))
+            await db.execute(delete(ButtonStatisticDaily).where(
+                ButtonStatisticDaily.day < (month_start(now) - timedelta(days=STATS_DAILY_RETENTION_DAYS)).date()
+            ))
+            await db.commit()
+        self._pruned_at = time.monotonic()
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+                if time.monotonic() - self._pruned_at >= STATS_PRUNE_INTERVAL:
+                    await self.prune()
+            except Exception as e:
+                logger.error(f"Failed to flush button statistics: {e}")
+
+    def start(self) -> None:
+        """Запускает фоновую запись статистики."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Останавливает фоновую запись и записывает оставшиеся нажатия."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+# Общий накопитель статистики процесса
+stats_aggregator = StatisticsAggregator()
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from sqlalchemy.dialects.sqlite import insert
+
+from config.settings import USER_CACHE_TTL, USER_CACHE_MAX_SIZE, USER_CREATE_BATCH_SIZE, USER_CREATE_FLUSH_INTERVAL
+from database.database import SessionLocal
+from database.models import User
+from services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class UserCache:
+    """Кэш языков пользователей по Telegram ID с пакетным созданием новых пользователей.
+
+    Известные пользователи обслуживаются из памяти без SELECT. Отсутствие
+    пользователя в базе тоже запоминается: пока он ждет пакетной записи,
+    его сообщения не ищут его в базе снова.
+    """
+
+    def __init__(
+        self,
+        ttl: float = USER_CACHE_TTL,
+        max_size: int = USER_CACHE_MAX_SIZE,
+        batch_size: int = USER_CREATE_BATCH_SIZE,
+        flush_interval: float = USER_CREATE_FLUSH_INTERVAL,
+    ):
+        self._cache = TTLCache(ttl, max_size)
+        # Новые пользователи, еще не записанные в базу: user_id -> язык
+        self._pending: Dict[int, str] = {}
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    def get_language(self, user_id: int) -> Optional[str]:
+        """Язык пользователя из памяти или None, если его нужно искать в базе."""
+        language_code = self._pending.get(user_id)
+        if language_code is None:
+            language_code = self._cache.get(user_id)
+        if language_code is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return language_code
+
+    def peek_language(self, user_id: int) -> Optional[str]:
+        """Язык пользователя из памяти без учета в статистике попаданий."""
+        return self._pending.get(user_id) or self._cache.peek(user_id)
+
+    def remember(self, user_id: int, language_code: str) -> None:
+        """Запоминает язык пользователя, который есть в базе (write-through после записи)."""
+        self._cache.set(user_id, language_code)
+
+    def queue_create(self, user_id: int, language_code: str) -> None:
+        """Ставит нового пользователя в очередь на пакетное создание."""
+        self._pending[user_id] = language_code
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def take_pending(self, user_id: int) -> bool:
+        """Забирает пользователя из очереди создания, чтобы записать его сразу."""
+        return self._pending.pop(user_id, None) is not None
+
+    def invalidate(self, user_id: int) -> None:
+        self._cache.invalidate(user_id)
+
+    async def flush(self) -> int:
+        """Записывает накопленных новых пользователей одним INSERT. Возвращает их число."""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            try:
+                async with SessionLocal() as db:
+                    # Пользователь мог быть создан в обход очереди (например, при смене языка)
+                    stmt = insert(User).values([
+                        {"id": user_id, "language_code": language_code}
+                        for user_id, language_code in batch.items()
+                    ]).on_conflict_do_nothing(index_elements=[User.id])
+                    await db.execute(stmt)
+                    await db.commit()
+            except Exception:
+                # Возвращаем пакет в очередь, не затирая более свежие записи
+                for user_id, language_code in batch.items():
+                    self._pending.setdefault(user_id, language_code)
+                raise
+            for user_id, language_code in batch.items():
+                self.remember(user_id, language_code)
+            logger.info(f"Created {len(batch)} new users in one batch.")
+            return len(batch)
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to create queued users: {e}")
+
+    def start(self) -> None:
+        """Запускает фоновую запись новых пользователей."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Останавливает фоновую запись и записывает оставшихся пользователей."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, float]:
+        """Попадания, промахи и размер кэша."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "pending": len(self._pending),
+            "hits": self.hits,
+            "misses": self.misses,
+            "lookups": lookups,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Общий кэш пользователей процесса
+user_cache = UserCache()
@@ -3,12 +3,11 @@ from config.settings import ADMIN_IDS, LANGUAGES
 from typing import Optional
 from utils.i18n import get_text # Импортируем функцию локализации
 import logging # Импортируем logging
-from sqlalchemy.orm import Session # Импортируем Session
-from database.database import get_db # Импортируем get_db
+from sqlalchemy.ext.asyncio import AsyncSession # Импортируем AsyncSession
 
 logger = logging.getLogger(__name__) # Создаем логгер для этого модуля
 
-def get_main_keyboard(user_id: Optional[int], db: Session = next(get_db())) -> ReplyKeyboardMarkup:
+def get_main_keyboard(user_id: Optional[int], db: Optional[AsyncSession] = None) -> ReplyKeyboardMarkup:
     """Создает основную клавиатуру с кнопками."""
     is_admin = user_id is not None and user_id in ADMIN_IDS
     logger.info(f"get_main_keyboard called for user_id: {user_id}, is_admin: {is_admin}") # Логирование
@@ -29,7 +28,7 @@ def get_main_keyboard(user_id: Optional[int], db: Session = next(get_db())) -> R
     keyboard = ReplyKeyboardMarkup(keyboard=buttons, resize_keyboard=True)
     return keyboard
 
-def get_calendar_reply_keyboard(user_id: Optional[int], db: Session = next(get_db())) -> ReplyKeyboardMarkup:
+def get_calendar_reply_keyboard(user_id: Optional[int], db: Optional[AsyncSession] = None) -> ReplyKeyboardMarkup:
     """Создает Reply-клавиатуру с кнопками действий календаря."""
     logger.info(f"get_calendar_reply_keyboard called for user_id: {user_id}")
 
@@ -58,7 +57,7 @@ def get_calendar_reply_keyboard(user_id: Optional[int], db: Session = next(get_d
     keyboard = ReplyKeyboardMarkup(keyboard=buttons, resize_keyboard=True)
     return keyboard
 
-def get_admin_keyboard(user_id: Optional[int], db: Session = next(get_db())) -> ReplyKeyboardMarkup:
+def get_admin_keyboard(user_id: Optional[int], db: Optional[AsyncSession] = None) -> ReplyKeyboardMarkup:
     """Создает Reply-клавиатуру с кнопками административных действий."""
     logger.info(f"get_admin_keyboard called for user_id: {user_id}")
 
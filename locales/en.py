@@ -11,7 +11,7 @@ TEXTS = {
 
     # Help
     "help_student": "Hello! I am a bot for viewing the schedule.\n\nAvailable commands:\n• /help - show this message\n• /calendar - open calendar management menu\n\nYou can use the \"Events for the week\" button in the calendar menu to view the schedule.",
-    "help_admin": "Hello, administrator!\n\nAvailable commands:\n• /help - show this message\n• /calendar - open calendar management menu\n• /stats - view bot statistics\n• /broadcast - send message to all users\n\n",
+    "help_admin": "Hello, administrator!\n\nAvailable commands:\n• /help - show this message\n• /calendar - open calendar management menu\n• /stats [period] - view bot statistics\n• /broadcast - send message to all users\n• /bulk_create - create events in bulk\n• /bulk_delete - delete events in bulk\n• /free [days] [minutes] - find free time slots\n\n",
 
     # Calendar
     "calendar_menu": "Calendar menu:",
@@ -31,6 +31,8 @@ TEXTS = {
     "create_event_description_prompt": "Enter event description (or '-' if no description):",
     "create_event_success": "Event successfully created!\n\nName: {summary}\nStart: {start_time}\nEnd: {end_time}\nDescription: {description}",
     "create_event_failed": "Failed to create event. Please try again.",
+    "create_event_conflicts": "⚠️ This time overlaps with existing events:",
+    "create_event_conflict_item": "\n• {summary}: {start_time} – {end_time}",
     "week_events_empty": "No events for the next 7 days.",
     "week_events_header": "Events for the next 7 days:\n\n",
     "week_events_item": "*{summary}*\nTime: {formatted_time}\nDescription: {description}\nID: `{event_id}`\n\n",
@@ -39,6 +41,19 @@ TEXTS = {
     "delete_event_empty_id": "Please enter the event ID to delete.",
     "delete_event_success": "Event with ID `{event_id}` successfully deleted.",
     "delete_event_failed": "Failed to delete event with ID `{event_id}`. Make sure the ID is correct and the event exists.",
+    "bulk_create_prompt": "Send events one per line in the format:\nDD.MM.YYYY HH:MM; duration in hours; name; description\n\nThe description is optional. A .txt file with the same lines is also accepted.",
+    "bulk_create_invalid_lines": "Could not parse lines: {line_numbers}. Fix them and send the list again.",
+    "bulk_create_result": "Bulk creation complete!\nCreated: {created_count}\nFailed to create: {failed_count}",
+    "bulk_create_failed_lines": "\nFailed lines: {line_numbers}",
+    "bulk_delete_prompt": "Send the IDs of the events to delete, separated by spaces or new lines:",
+    "bulk_delete_result": "Bulk deletion complete!\nDeleted: {deleted_count}\nFailed to delete: {failed_count}",
+    "bulk_delete_failed_ids": "\nNot deleted: {event_ids}",
+    "free_slots_usage": "Usage: /free [days] [minutes]\nDays: 1 to {max_days}, minutes: minimum slot length.",
+    "free_slots_header": "Free slots of at least {minutes} min over the next {days} days:\n",
+    "free_slots_item": "\n• {date}: {start_time} – {end_time}",
+    "free_slots_more": "\n…and {count} more",
+    "free_slots_empty": "No free slots of at least {minutes} min over the next {days} days.",
+    "bulk_empty": "The message contains no events.",
 
     # Language
     "choose_language": "Choose interface language:",
@@ -53,11 +68,19 @@ TEXTS = {
     "button_back_to_main": "⬅️ Back to main menu",
     "stats_empty": "Statistics are empty.",
     "stats_header": "Command usage statistics:\n\n",
+    "stats_header_range": "Command usage statistics from `{start}` to `{end}` UTC:\n\n",
+    "stats_usage": "Usage: /stats [period]\nPeriod: 24h - hours, 7d - days (up to {max_days}), all - all time.",
     "stats_item": "`{handler_name}`: `{count}`\n",
-    "broadcast_prompt": "Enter the message to broadcast to all users:\n\n",
+    "stats_delivery": "\nUsers: `{total}` total, `{reachable}` reachable, `{unreachable}` unreachable \\(blocked the bot `{blocked}`, deactivated `{deactivated}`\\)\n",
+    "stats_user_cache": "\nUser cache: `{hit_rate}` hits of `{lookups}` lookups, `{size}` entries\n",
+    "throttled": "⏳ Please wait a moment before your next request.",
+    "broadcast_prompt": "Enter the message to broadcast to all users:\n\nTo send different text per language, start each part with a line holding the language code, for example [ru] or [en]. A part like @key is taken from the bot's locale.\n\n",
     "broadcast_empty": "Broadcast message cannot be empty.",
     "broadcast_sending": "Sending message:\n\n{broadcast_text}\n\nTotal users to broadcast: {user_count}...",
+    "broadcast_progress": "Broadcast in progress: {processed} of {total}\nSent: {sent_count}\nFailed: {failed_count}",
     "broadcast_complete": "Broadcast complete!\nSent: {sent_count}\nFailed to send: {failed_count}",
+    "broadcast_invalid_message": "Telegram rejected the broadcast text for language {language}: {error}\nFix the message and send it again.",
+    "broadcast_aborted": "Broadcast stopped: Telegram rejected the text for language {language}: {error}\nSent: {sent_count}\nFailed to send: {failed_count}",
     "broadcast_cancelled": "Broadcast cancelled.",
 
     # General errors/messages
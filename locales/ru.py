@@ -17,7 +17,7 @@ TEXTS = {
 
     # Помощь
     "help_student": "Привет! Я бот для просмотра расписания.\n\nДоступные команды:\n• /help - показать это сообщение\n• /calendar - открыть меню управления календарем\n\nВы можете использовать кнопку \"События на неделю\" в меню календаря для просмотра расписания.",
-    "help_admin": "Привет, администратор!\n\nДоступные команды:\n• /help - показать это сообщение\n• /calendar - открыть меню управления календарем\n• /stats - просмотр статистики бота\n• /broadcast - рассылка сообщений\n\n",
+    "help_admin": "Привет, администратор!\n\nДоступные команды:\n• /help - показать это сообщение\n• /calendar - открыть меню управления календарем\n• /stats [период] - просмотр статистики бота\n• /broadcast - рассылка сообщений\n• /bulk_create - массовое создание событий\n• /bulk_delete - массовое удаление событий\n• /free [дни] [минуты] - поиск свободного времени\n\n",
 
     # Календарь
     "calendar_menu": "Меню календаря:",
@@ -37,6 +37,8 @@ TEXTS = {
     "create_event_description_prompt": "Введите описание события (или '-' если описания нет):",
     "create_event_success": "Событие успешно создано!\n\nНазвание: {summary}\nНачало: {start_time}\nОкончание: {end_time}\nОписание: {description}",
     "create_event_failed": "Не удалось создать событие. Попробуйте еще раз.",
+    "create_event_conflicts": "⚠️ Это время пересекается с существующими событиями:",
+    "create_event_conflict_item": "\n• {summary}: {start_time} – {end_time}",
     "week_events_empty": "На ближайшие 7 дней нет событий.",
     "week_events_header": "События на ближайшие 7 дней:\n\n",
     "week_events_item": "*{summary}*\nВремя: {formatted_time}\nОписание: {description}\nID: `{event_id}`\n\n",
@@ -45,6 +47,19 @@ TEXTS = {
     "delete_event_empty_id": "Пожалуйста, введите ID события для удаления.",
     "delete_event_success": "Событие с ID `{event_id}` успешно удалено.",
     "delete_event_failed": "Не удалось удалить событие с ID `{event_id}`. Убедитесь, что ID верен и событие существует.",
+    "bulk_create_prompt": "Отправьте события по одному на строку в формате:\nДД.ММ.ГГГГ ЧЧ:ММ; продолжительность в часах; название; описание\n\nОписание необязательно. Можно также отправить .txt файл с такими же строками.",
+    "bulk_create_invalid_lines": "Не удалось разобрать строки: {line_numbers}. Исправьте их и отправьте список еще раз.",
+    "bulk_create_result": "Массовое создание завершено!\nСоздано: {created_count}\nНе удалось создать: {failed_count}",
+    "bulk_create_failed_lines": "\nСтроки с ошибками: {line_numbers}",
+    "bulk_delete_prompt": "Отправьте ID событий для удаления через пробел или с новой строки:",
+    "bulk_delete_result": "Массовое удаление завершено!\nУдалено: {deleted_count}\nНе удалось удалить: {failed_count}",
+    "bulk_delete_failed_ids": "\nНе удалены: {event_ids}",
+    "free_slots_usage": "Использование: /free [дни] [минуты]\nДни: от 1 до {max_days}, минуты: минимальная длина окна.",
+    "free_slots_header": "Свободные окна от {minutes} мин на ближайшие {days} дн.:\n",
+    "free_slots_item": "\n• {date}: {start_time} – {end_time}",
+    "free_slots_more": "\n…и еще {count}",
+    "free_slots_empty": "На ближайшие {days} дн. нет свободных окон от {minutes} мин.",
+    "bulk_empty": "В сообщении нет событий.",
 
     # Язык
     "choose_language": "Выберите язык интерфейса:",
@@ -59,11 +74,19 @@ TEXTS = {
     "button_back_to_main": "⬅️ В главное меню",
     "stats_empty": "Статистика пока пуста.",
     "stats_header": "Статистика использования команд:\n\n",
+    "stats_header_range": "Статистика использования команд с `{start}` по `{end}` UTC:\n\n",
+    "stats_usage": "Использование: /stats [период]\nПериод: 24h - часы, 7d - дни (до {max_days}), all - за все время.",
     "stats_item": "`{handler_name}`: `{count}`\n",
-    "broadcast_prompt": "Введите сообщение для рассылки всем пользователям:\n\n",
+    "stats_delivery": "\nПользователи: всего `{total}`, доступны `{reachable}`, недоступны `{unreachable}` \\(заблокировали бота `{blocked}`, удалены `{deactivated}`\\)\n",
+    "stats_user_cache": "\nКэш пользователей: попаданий `{hit_rate}` из `{lookups}` запросов, записей `{size}`\n",
+    "throttled": "⏳ Пожалуйста, подождите немного перед следующим запросом.",
+    "broadcast_prompt": "Введите сообщение для рассылки всем пользователям:\n\nЧтобы отправить разный текст на разных языках, начните каждую часть строкой с кодом языка, например [ru] или [en]. Часть вида @ключ берется из локали бота.\n\n",
     "broadcast_empty": "Сообщение для рассылки не может быть пустым.",
     "broadcast_sending": "Отправляю сообщение:\n\n{broadcast_text}\n\nВсего пользователей для рассылки: {user_count}...",
+    "broadcast_progress": "Идет рассылка: {processed} из {total}\nОтправлено: {sent_count}\nНе удалось отправить: {failed_count}",
     "broadcast_complete": "Рассылка завершена!\nОтправлено: {sent_count}\nНе удалось отправить: {failed_count}",
+    "broadcast_invalid_message": "Telegram не принимает текст рассылки для языка {language}: {error}\nИсправьте сообщение и отправьте его снова.",
+    "broadcast_aborted": "Рассылка остановлена: Telegram не принимает текст для языка {language}: {error}\nОтправлено: {sent_count}\nНе удалось отправить: {failed_count}",
     "broadcast_cancelled": "Рассылка отменена.",
 
     # Статистика команд
@@ -72,6 +95,9 @@ TEXTS = {
     "command_broadcast": "Команда /broadcast",
     "command_help": "Команда /help",
     "command_start": "Команда /start (старый ключ)",
+    "command_bulk_create": "Команда /bulk_create",
+    "command_bulk_delete": "Команда /bulk_delete",
+    "command_free": "Команда /free",
 
     # Ошибка при попытке отправить текст кнопки в рассылке
     "broadcast_button_text_error": "Пожалуйста, введите текст сообщения для рассылки или вернитесь в главное меню.",
@@ -1,13 +1,159 @@
-from typing import Dict, Any, Callable, Awaitable
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Callable, Awaitable, NamedTuple, Optional
 from aiogram import BaseMiddleware
 from aiogram.types import Message, Update
+from sqlalchemy import case, delete, func, literal
+from sqlalchemy.dialects.sqlite import insert
+from config.settings import (
+    DEFAULT_LANGUAGE, THROTTLE_RATE, THROTTLE_BURST, THROTTLE_WARNING_WINDOW, THROTTLE_EVICTION_INTERVAL,
+    THROTTLE_BACKEND,
+)
+from database.database import engine
+from database.models import ThrottleBucket
+from database.user_cache import user_cache
+from utils.i18n import get_text, set_user_language, reset_user_language
+import logging
 import time
 
+logger = logging.getLogger(__name__)
+
+
+class ThrottleDecision(NamedTuple):
+    allowed: bool
+    warn: bool  # предупредить пользователя (не чаще одного раза за окно)
+
+
+class ThrottlingBackend(ABC):
+    """Хранилище ведер токенов пользователей.
+
+    Ведро пополняется со скоростью rate токенов в секунду до burst; каждое
+    сообщение забирает токен. Сообщение без токена отклоняется, и первое
+    отклоненное за warning_window секунд требует предупреждения.
+    """
+
+    def __init__(
+        self,
+        rate: float = THROTTLE_RATE,
+        burst: float = THROTTLE_BURST,
+        warning_window: float = THROTTLE_WARNING_WINDOW,
+        eviction_interval: float = THROTTLE_EVICTION_INTERVAL,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.warning_window = warning_window
+        self.eviction_interval = eviction_interval
+        # Ведро, простоявшее столько времени, снова полное и ничем не отличается от отсутствующего
+        self.idle_ttl = burst / rate
+        self._evicted_at = 0.0
+
+    @abstractmethod
+    async def hit(self, key: int, now: float) -> ThrottleDecision:
+        """Учитывает сообщение и решает, пропустить ли его."""
+
+    @abstractmethod
+    async def evict(self, now: float) -> int:
+        """Удаляет ведра неактивных пользователей. Возвращает их число."""
+
+    async def check(self, key: int) -> ThrottleDecision:
+        now = time.time()
+        if now - self._evicted_at >= self.eviction_interval:
+            self._evicted_at = now
+            evicted = await self.evict(now)
+            if evicted:
+                logger.debug(f"Evicted {evicted} idle throttle buckets")
+        return await self.hit(key, now)
+
+
+class MemoryThrottlingBackend(ThrottlingBackend):
+    """Ведра в памяти процесса. Хранятся только ведра активных пользователей."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # key -> [токены, время обновления, до какого момента не предупреждать]
+        self._buckets: Dict[int, list] = {}
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    async def hit(self, key: int, now: float) -> ThrottleDecision:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._buckets[key] = [self.burst - 1, now, 0.0]
+            return ThrottleDecision(True, False)
+
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return ThrottleDecision(True, False)
+        bucket[0] = tokens
+        if bucket[2] <= now:
+            bucket[2] = now + self.warning_window
+            return ThrottleDecision(False, True)
+        return ThrottleDecision(False, False)
+
+    async def evict(self, now: float) -> int:
+        idle = [
+            key for key, (_, updated, warned_until) in self._buckets.items()
+            if now - updated >= self.idle_ttl and warned_until <= now
+        ]
+        for key in idle:
+            del self._buckets[key]
+        return len(idle)
+
+
+class SqliteThrottlingBackend(ThrottlingBackend):
+    """Ведра в таблице throttle_buckets базы бота: лимиты общие для всех процессов.
+
+    Пополнение, списание токена и решение выполняются одним UPSERT ... RETURNING,
+    поэтому одновременные сообщения из разных процессов не гонятся между собой.
+    """
+
+    async def hit(self, key: int, now: float) -> ThrottleDecision:
+        table = ThrottleBucket.__table__
+        # В SET все выражения вычисляются по старой строке
+        tokens = func.min(self.burst, table.c.tokens + (now - table.c.updated) * self.rate)
+        throttled = tokens < 1
+        warn = throttled & (table.c.warned_until <= now)
+        stmt = insert(table).values(
+            key=key, tokens=self.burst - 1, updated=now, warned_until=0, allowed=True, warn=False,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.key],
+            set_={
+                "tokens": case((throttled, tokens), else_=tokens - 1),
+                "updated": now,
+                "warned_until": case((warn, literal(now + self.warning_window)), else_=table.c.warned_until),
+                "allowed": ~throttled,
+                "warn": warn,
+            },
+        ).returning(table.c.allowed, table.c.warn)
+        async with engine.begin() as connection:
+            row = (await connection.execute(stmt)).one()
+        return ThrottleDecision(bool(row.allowed), bool(row.warn))
+
+    async def evict(self, now: float) -> int:
+        async with engine.begin() as connection:
+            result = await connection.execute(delete(ThrottleBucket).where(
+                ThrottleBucket.updated <= now - self.idle_ttl,
+                ThrottleBucket.warned_until <= now,
+            ))
+        return result.rowcount
+
+
+def create_throttling_backend(name: str = THROTTLE_BACKEND) -> ThrottlingBackend:
+    """Хранилище по имени из настроек: memory или sqlite."""
+    if name == "sqlite":
+        return SqliteThrottlingBackend()
+    if name != "memory":
+        logger.warning(f"Unknown throttling backend '{name}', using memory")
+    return MemoryThrottlingBackend()
+
+
 class ThrottlingMiddleware(BaseMiddleware):
-    def __init__(self, rate_limit: float = 1.0):
-        self.rate_limit = rate_limit
-        self.last_message: Dict[int, float] = {}
-        
+    def __init__(self, backend: Optional[ThrottlingBackend] = None):
+        self.backend = backend or create_throttling_backend()
+
     async def __call__(
         self,
         handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
@@ -16,17 +162,19 @@ class ThrottlingMiddleware(BaseMiddleware):
     ) -> Any:
         if isinstance(event, Message) and event.from_user:
             user_id = event.from_user.id
-            current_time = time.time()
-            
-            if user_id in self.last_message:
-                time_passed = current_time - self.last_message[user_id]
-                if time_passed < self.rate_limit:
-                    if isinstance(event, Message):
-                         await event.answer(
-                            "⏳ Пожалуйста, подождите немного перед следующим запросом."
-                        )
-                    return
-                    
-            self.last_message[user_id] = current_time
-        
-        return await handler(event, data) 
\ No newline at end of file
+            decision = await self.backend.check(user_id)
+            if not decision.allowed:
+                if decision.warn:
+                    await event.answer(self._warning_text(user_id))
+                return
+
+        return await handler(event, data)
+
+    @staticmethod
+    def _warning_text(user_id: int) -> str:
+        # UserMiddleware еще не определил язык апдейта: берем его из кэша пользователей
+        language_token = set_user_language(user_id, user_cache.peek_language(user_id) or DEFAULT_LANGUAGE)
+        try:
+            return get_text("throttled", user_id)
+        finally:
+            reset_user_language(language_token)
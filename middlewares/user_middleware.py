@@ -4,10 +4,12 @@ from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
 from aiogram.types import Message, TelegramObject
 
-from sqlalchemy.orm import Session
-from database.database import get_db
+from database.database import SessionLocal
+from database.models import User
 from database.repositories import UserRepository
+from database.user_cache import user_cache
 from config.settings import DEFAULT_LANGUAGE
+from utils.i18n import set_user_language, reset_user_language
 
 logger = logging.getLogger(__name__)
 
@@ -33,27 +35,40 @@ class UserMiddleware(BaseMiddleware):
             # Продолжаем обработку без user_id или можем прекратить, если user_id критичен
             return await handler(event, data)
 
-        # Получаем сессию БД. Используем get_db() как зависимость.
-        # Важно: здесь мы получаем новую сессию для каждого события
-        db: Session = next(get_db())
-        user_repo = UserRepository(db)
+        # Язык известного пользователя берется из кэша, без SELECT на каждое сообщение
+        language_code = user_cache.get_language(user_id)
 
-        # Ищем пользователя в базе данных
-        db_user = user_repo.get_user(user_id)
+        # Важно: здесь мы получаем новую асинхронную сессию для каждого события;
+        # соединение берется из пула и возвращается в него при выходе из блока
+        async with SessionLocal() as db:
+            user_repo = UserRepository(db)
 
-        if db_user is None:
-            # Если пользователь не найден, создаем нового
-            logger.info(f"UserMiddleware: New user detected: {user_id}. Creating DB entry.")
-            db_user = user_repo.create_user(user_id, DEFAULT_LANGUAGE)
+            if language_code is None:
+                # Промах кэша: ищем пользователя в базе данных
+                db_user = await user_repo.get_user(user_id)
+                if db_user is None:
+                    # Если пользователь не найден, ставим его в очередь на пакетное создание
+                    logger.info(f"UserMiddleware: New user detected: {user_id}. Queued for batched creation.")
+                    user_cache.queue_create(user_id, DEFAULT_LANGUAGE)
+                    db_user = User(id=user_id, language_code=DEFAULT_LANGUAGE)
+                else:
+                    if db_user.is_blocked or db_user.is_deactivated or db_user.delivery_failures:
+                        # Пользователь снова пишет боту, значит, чат доступен для рассылок
+                        await user_repo.mark_reachable(user_id)
+                    user_cache.remember(user_id, db_user.language_code)
+            else:
+                # Попадание в кэш: обработчики получают несвязанный с сессией объект только
+                # с ID и языком (остальные поля не загружены и равны None)
+                db_user = User(id=user_id, language_code=language_code)
 
-        # Добавляем пользователя из БД и сессию в данные события
-        data["db_user"] = db_user
-        data["db"] = db # Также передаем сессию, если она нужна в хендлерах напрямую
+            # Добавляем пользователя и сессию в данные события
+            data["db_user"] = db_user
+            data["db"] = db # Также передаем сессию, если она нужна в хендлерах напрямую
 
-
-        try:
-            # Передаем управление следующему хендлеру или мидлвари
-            return await handler(event, data)
-        finally:
-            # Закрываем сессию после обработки события
-            db.close() 
\ No newline at end of file
+            # Язык определяется один раз на апдейт: get_text и клавиатуры читают его из контекста
+            language_token = set_user_language(user_id, db_user.language_code)
+            try:
+                # Передаем управление следующему хендлеру или мидлвари
+                return await handler(event, data)
+            finally:
+                reset_user_language(language_token)
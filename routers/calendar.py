@@ -4,23 +4,49 @@ from aiogram.types import Message, CallbackQuery, ReplyKeyboardRemove
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from datetime import datetime, timedelta
-from dateutil import parser
+from dateutil import parser, tz
 from typing import Optional, Dict, Any
+import html
 
-from services.calendar_api import GoogleCalendarAPI
+from services.calendar_api import GoogleCalendarAPI, EVENT_TIME_ZONE
 from states.calendar_states import CalendarStates
 from keyboards.inline import get_calendar_keyboard, get_event_actions_keyboard
 from keyboards.reply import get_main_keyboard, get_calendar_reply_keyboard
 from utils.i18n import get_text
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
 
 router = Router()
 calendar_api = GoogleCalendarAPI()
 
+
+def _format_event_time(value: Dict[str, str]) -> str:
+    """Время начала/конца события в часовом поясе бота для сообщений пользователю."""
+    if 'dateTime' not in value:
+        return parser.isoparse(value['date']).strftime('%d.%m.%Y')
+    parsed = parser.isoparse(value['dateTime'])
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(tz.gettz(EVENT_TIME_ZONE))
+    return parsed.strftime('%d.%m.%Y %H:%M')
+
+
+async def warn_about_conflicts(message: Message, db: AsyncSession, user_id: Optional[int], start_time: datetime, end_time: datetime):
+    """Предупреждает о событиях, пересекающихся с создаваемым, до его создания."""
+    conflicts = await calendar_api.find_conflicts(start_time, end_time)
+    if not conflicts:
+        return
+    text = get_text("create_event_conflicts", user_id, db=db)
+    for conflict in conflicts:
+        text += get_text("create_event_conflict_item", user_id, db=db).format(
+            summary=html.escape(conflict.get('summary', '')),
+            start_time=_format_event_time(conflict['start']),
+            end_time=_format_event_time(conflict['end']),
+        )
+    await message.answer(text)
+
 @router.message(Command("calendar"))
-async def cmd_calendar(message: Message, db: Session, user_id: Optional[int] = None):
+async def cmd_calendar(message: Message, db: AsyncSession, user_id: Optional[int] = None):
     if user_id is None and message.from_user:
         user_id = message.from_user.id
 
@@ -35,7 +61,7 @@ async def cmd_calendar(message: Message, db: Session, user_id: Optional[int] = N
     )
 
 @router.message(CalendarStates.waiting_for_event_name)
-async def process_event_name(message: Message, db: Session, state: FSMContext):
+async def process_event_name(message: Message, db: AsyncSession, state: FSMContext):
     logger.info(f"Received message in waiting_for_event_name state: {message.text}")
     user_id = message.from_user.id if message.from_user else None
     if message.text:
@@ -47,7 +73,7 @@ async def process_event_name(message: Message, db: Session, state: FSMContext):
         await state.set_state(CalendarStates.waiting_for_event_date)
 
 @router.message(CalendarStates.waiting_for_event_date)
-async def process_event_date(message: Message, db: Session, state: FSMContext):
+async def process_event_date(message: Message, db: AsyncSession, state: FSMContext):
     user_id = message.from_user.id if message.from_user else None
     if not message.text:
         await message.answer(
@@ -71,7 +97,7 @@ async def process_event_date(message: Message, db: Session, state: FSMContext):
         )
 
 @router.message(CalendarStates.waiting_for_event_time)
-async def process_event_time(message: Message, db: Session, state: FSMContext):
+async def process_event_time(message: Message, db: AsyncSession, state: FSMContext):
     user_id = message.from_user.id if message.from_user else None
     if not message.text:
         await message.answer(
@@ -98,7 +124,7 @@ async def process_event_time(message: Message, db: Session, state: FSMContext):
         )
 
 @router.message(CalendarStates.waiting_for_event_duration)
-async def process_event_duration(message: Message, db: Session, state: FSMContext):
+async def process_event_duration(message: Message, db: AsyncSession, state: FSMContext):
     user_id = message.from_user.id if message.from_user else None
     if not message.text:
         await message.answer(
@@ -125,13 +151,14 @@ async def process_event_duration(message: Message, db: Session, state: FSMContex
         )
 
 @router.message(CalendarStates.waiting_for_event_description)
-async def process_event_description(message: Message, db: Session, state: FSMContext):
+async def process_event_description(message: Message, db: AsyncSession, state: FSMContext):
     user_id = message.from_user.id if message.from_user else None
     data = await state.get_data()
     description = message.text if message.text is not None and message.text != "-" else get_text("no_description", user_id, db=db)
     
     logger.info(f"Attempting to create event with data: {data}")
-    
+
+    await warn_about_conflicts(message, db, user_id, data["start_time"], data["end_time"])
     event = await calendar_api.create_event(
         summary=data["event_name"],
         start_time=data["start_time"],
@@ -1,53 +1,60 @@
 import logging
 from aiogram import Router, F, Bot
 from aiogram.types import Message, ReplyKeyboardRemove, Update
-from aiogram.filters import Command, StateFilter
+from aiogram.filters import Command, CommandObject, StateFilter
 from keyboards.reply import get_main_keyboard, get_calendar_reply_keyboard, get_language_selection_keyboard, get_admin_keyboard
-from routers.calendar import cmd_calendar
+from routers.calendar import cmd_calendar, calendar_api, warn_about_conflicts # Общий с routers.calendar клиент календаря (один пул и кэш)
 from aiogram.fsm.context import FSMContext
 from aiogram.enums import ParseMode
+from aiogram.utils.text_decorations import html_decoration
 import re # Импортируем модуль re для регулярных выражений
 from typing import Optional, Dict, Any, List, TypedDict, Union, cast
 
 # Импортируем зависимости для работы с базой данных
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import Column
 from database.models import User
 from database.repositories import UserRepository, ButtonStatisticRepository # Импортируем ButtonStatisticRepository
-from database.database import get_db # Импортируем get_db
+from database.user_cache import user_cache # Кэш пользователей UserMiddleware (попадания для /stats)
+from database.stats_aggregator import hour_start, retained_start
+from services.broadcast import BroadcastMessageError, broadcast_engine, render_variants
 
 # Импортируем зависимости, необходимые для логики календаря
-from services.calendar_api import GoogleCalendarAPI
 from states.calendar_states import CalendarStates
 from datetime import datetime, timedelta
 from dateutil import parser
+from zoneinfo import ZoneInfo
+from services.calendar_api import EVENT_TIME_ZONE
+from utils.free_slots import busy_intervals, find_free_slots
 
 from filters.admin_filter import AdminFilter # Импортируем AdminFilter
 from config.settings import ADMIN_IDS, LANGUAGES # Импортируем список ADMIN_IDS и языковые настройки
+from config.settings import (
+    WORK_DAY_START, WORK_DAY_END, WORKDAYS,
+    FREE_SLOT_DEFAULT_DAYS, FREE_SLOT_DEFAULT_MINUTES, FREE_SLOT_MAX_DAYS, FREE_SLOT_MAX_SHOWN,
+    STATS_MAX_RANGE_DAYS,
+)
 
 from states.admin_states import AdminStates # Импортируем состояния администратора
 from states.language_states import LanguageStates # Импортируем состояния языка
-from utils.i18n import get_text # Импортируем функцию локализации
+from utils.i18n import get_text, set_user_language # Импортируем функцию локализации
 from utils.i18n import loaded_locales # Импортируем загруженные локали
 
 logger = logging.getLogger(__name__)
 
 router = Router()
 
-# Инициализируем API календаря здесь, так как хендлеры теперь в этом файле
-calendar_api = GoogleCalendarAPI()
-
 def escape_markdownv2(text: str) -> str:
     """Escapes characters reserved in MarkdownV2."""
     reserved_chars = r'_*[]()~`>#+-|=|{}.! '
     return re.sub(f'([{re.escape(reserved_chars)}])', r'\\\g<1>', text)
 
 @router.message(Command("start"))
-async def cmd_start(event: Message, db: Session, state: FSMContext):
+async def cmd_start(event: Message, db: AsyncSession, state: FSMContext):
     user_id = event.from_user.id if event.from_user else None
 
     stats_repo = ButtonStatisticRepository(db)
-    stats_repo.increment_button_click("command_start_stats")
+    await stats_repo.increment_button_click("command_start_stats")
 
     if user_id is None:
         logger.error("Не удалось определить user_id в cmd_start.")
@@ -75,7 +82,7 @@ async def cmd_start(event: Message, db: Session, state: FSMContext):
             reply_markup=get_main_keyboard(user_id, db=db)
         )
 
-async def send_help_message(event: Message, db: Session, state: FSMContext):
+async def send_help_message(event: Message, db: AsyncSession, state: FSMContext):
     user_id = event.from_user.id if event.from_user else None
 
     if user_id in ADMIN_IDS:
@@ -86,31 +93,62 @@ async def send_help_message(event: Message, db: Session, state: FSMContext):
     await event.answer(response)
 
 @router.message(Command("help"))
-async def cmd_help(event: Message, db: Session, state: FSMContext):
+async def cmd_help(event: Message, db: AsyncSession, state: FSMContext):
     stats_repo = ButtonStatisticRepository(db)
-    stats_repo.increment_button_click("button_help")
+    await stats_repo.increment_button_click("button_help")
     await send_help_message(event, db, state)
 
-@router.message(F.text == get_text("button_help", None, db=next(get_db())))
-async def handle_help_button(event: Message, db: Session, state: FSMContext):
+@router.message(F.text == get_text("button_help", None, db=None))
+async def handle_help_button(event: Message, db: AsyncSession, state: FSMContext):
     # Статистика для этой кнопки обрабатывается в handle_unknown
     await send_help_message(event, db, state)
 
+def _parse_stats_period(args: Optional[str]) -> Optional[timedelta]:
+    """Период /stats вида 24h или 7d; None - за все время. ValueError при ошибке."""
+    if not args or args.strip() == "all":
+        return None
+    match = re.fullmatch(r"(\d+)([hd])", args.strip())
+    if not match:
+        raise ValueError(args)
+    amount = int(match.group(1))
+    period = timedelta(hours=amount) if match.group(2) == "h" else timedelta(days=amount)
+    if not timedelta(hours=1) <= period <= timedelta(days=STATS_MAX_RANGE_DAYS):
+        raise ValueError(args)
+    return period
+
 @router.message(Command("stats"), AdminFilter())
-async def cmd_stats(event: Message, db: Session, state: FSMContext):
+async def cmd_stats(event: Message, db: AsyncSession, state: FSMContext, command: Optional[CommandObject] = None):
     user_id = event.from_user.id if event.from_user else None
     
     stats_repo = ButtonStatisticRepository(db)
-    stats_repo.increment_button_click("button_stats")
+    await stats_repo.increment_button_click("button_stats")
+
+    try:
+        period = _parse_stats_period(command.args if command else None)
+    except ValueError:
+        await event.answer(get_text("stats_usage", user_id, db=db).format(max_days=STATS_MAX_RANGE_DAYS))
+        return
 
     # Используем репозиторий для получения статистики
-    all_stats = stats_repo.get_all_statistics()
+    if period is None:
+        all_stats = await stats_repo.get_all_statistics()
+        header = get_text("stats_header", user_id, db=db)
+    else:
+        # Период заканчивается текущим часом включительно; старые границы округляются
+        # до точности, которая еще хранится
+        now = datetime.utcnow()
+        time_max = hour_start(now) + timedelta(hours=1)
+        time_min = retained_start(time_max - period, now)
+        all_stats = await stats_repo.get_statistics_between(time_min, time_max)
+        header = get_text("stats_header_range", user_id, db=db).format(
+            start=time_min.strftime('%d.%m.%Y %H:%M'), end=time_max.strftime('%d.%m.%Y %H:%M')
+        )
 
     if not all_stats:
         await event.answer(get_text("stats_empty", user_id, db=db))
         return
 
-    response = get_text("stats_header", user_id, db=db) + "\n"
+    response = header + "\n"
     for stat_entry in all_stats:
         button_key = stat_entry.button_key
         count = stat_entry.click_count
@@ -120,31 +158,102 @@ async def cmd_stats(event: Message, db: Session, state: FSMContext):
         logger.info(f"Stats localization check: key='{button_key}', get_text returned='{button_text}'")
         response += get_text("stats_item", user_id, db=db).format(handler_name=button_text, count=count)
 
+    # Сколько пользователей доступно для рассылок
+    delivery = await UserRepository(db).get_delivery_counts()
+    response += get_text("stats_delivery", user_id, db=db).format(**delivery)
+
+    cache_stats = user_cache.stats()
+    response += get_text("stats_user_cache", user_id, db=db).format(
+        hit_rate=f"{cache_stats['hit_rate']:.1%}", lookups=cache_stats["lookups"], size=cache_stats["size"]
+    )
+
     await event.answer(response, parse_mode=ParseMode.MARKDOWN_V2)
 
 @router.message(Command("broadcast"), AdminFilter())
-async def cmd_broadcast(event: Message, db: Session, state: FSMContext):
+async def cmd_broadcast(event: Message, db: AsyncSession, state: FSMContext):
     user_id = event.from_user.id if event.from_user else None
     stats_repo = ButtonStatisticRepository(db)
-    stats_repo.increment_button_click("button_broadcast")
+    await stats_repo.increment_button_click("button_broadcast")
     await event.answer(get_text("broadcast_prompt", user_id, db=db))
     await state.set_state(AdminStates.waiting_for_broadcast_message)
 
-@router.message(F.text == get_text("button_calendar", None, db=next(get_db())))
-async def handle_calendar_button(event: Message, db: Session, state: FSMContext):
+@router.message(Command("bulk_create"), AdminFilter())
+async def cmd_bulk_create(event: Message, db: AsyncSession, state: FSMContext):
+    user_id = event.from_user.id if event.from_user else None
+    stats_repo = ButtonStatisticRepository(db)
+    await stats_repo.increment_button_click("command_bulk_create")
+    await event.answer(get_text("bulk_create_prompt", user_id, db=db))
+    await state.set_state(CalendarStates.waiting_for_bulk_events)
+
+@router.message(Command("bulk_delete"), AdminFilter())
+async def cmd_bulk_delete(event: Message, db: AsyncSession, state: FSMContext):
+    user_id = event.from_user.id if event.from_user else None
+    stats_repo = ButtonStatisticRepository(db)
+    await stats_repo.increment_button_click("command_bulk_delete")
+    await event.answer(get_text("bulk_delete_prompt", user_id, db=db))
+    await state.set_state(CalendarStates.waiting_for_event_ids_to_bulk_delete)
+
+@router.message(Command("free"), AdminFilter())
+async def cmd_free(event: Message, db: AsyncSession, command: CommandObject):
+    user_id = event.from_user.id if event.from_user else None
+    stats_repo = ButtonStatisticRepository(db)
+    await stats_repo.increment_button_click("command_free")
+
+    args = (command.args or "").split()
+    try:
+        days = int(args[0]) if args else FREE_SLOT_DEFAULT_DAYS
+        minutes = int(args[1]) if len(args) > 1 else FREE_SLOT_DEFAULT_MINUTES
+    except ValueError:
+        days = minutes = 0
+    if len(args) > 2 or not 1 <= days <= FREE_SLOT_MAX_DAYS or minutes <= 0:
+        await event.answer(get_text("free_slots_usage", user_id, db=db).format(max_days=FREE_SLOT_MAX_DAYS))
+        return
+
+    # Свободное время считается по кэшированным событиям, без отдельного обращения к Google
+    events = await calendar_api.get_events(days=days)
+    zone = ZoneInfo(EVENT_TIME_ZONE)
+    now = datetime.now(zone).replace(tzinfo=None, second=0, microsecond=0)
+    slots = find_free_slots(
+        busy_intervals(events, zone),
+        now,
+        now + timedelta(days=days),
+        timedelta(minutes=minutes),
+        datetime.strptime(WORK_DAY_START, '%H:%M').time(),
+        datetime.strptime(WORK_DAY_END, '%H:%M').time(),
+        WORKDAYS,
+    )
+    logger.info(f"Found {len(slots)} free slots for {days} days from {len(events)} events")
+
+    if not slots:
+        await event.answer(get_text("free_slots_empty", user_id, db=db).format(days=days, minutes=minutes))
+        return
+
+    response = get_text("free_slots_header", user_id, db=db).format(days=days, minutes=minutes)
+    for start, end in slots[:FREE_SLOT_MAX_SHOWN]:
+        response += get_text("free_slots_item", user_id, db=db).format(
+            date=start.strftime('%d.%m.%Y'),
+            start_time=start.strftime('%H:%M'),
+            end_time=end.strftime('%H:%M'),
+        )
+    if len(slots) > FREE_SLOT_MAX_SHOWN:
+        response += get_text("free_slots_more", user_id, db=db).format(count=len(slots) - FREE_SLOT_MAX_SHOWN)
+    await event.answer(response)
+
+@router.message(F.text == get_text("button_calendar", None, db=None))
+async def handle_calendar_button(event: Message, db: AsyncSession, state: FSMContext):
     # Статистика для этой кнопки обрабатывается в handle_unknown
     logger.info(f"Button 'Календарь' clicked by user {event.from_user.id if event.from_user else 'N/A'}")
     await cmd_calendar(event, db=db)
 
-@router.message(F.text == get_text("button_create_event", None, db=next(get_db())), AdminFilter())
-async def handle_create_event_button(event: Message, db: Session, state: FSMContext):
+@router.message(F.text == get_text("button_create_event", None, db=None), AdminFilter())
+async def handle_create_event_button(event: Message, db: AsyncSession, state: FSMContext):
     # Статистика для этой кнопки обрабатывается в handle_unknown
     user_id = event.from_user.id if event.from_user else None
     await event.answer(get_text("create_event_name_prompt", user_id, db=db))
     await state.set_state(CalendarStates.waiting_for_event_name)
 
-@router.message(F.text == get_text("button_week_events", None, db=next(get_db())))
-async def handle_week_events_button(event: Message, db: Session, state: FSMContext):
+@router.message(F.text == get_text("button_week_events", None, db=None))
+async def handle_week_events_button(event: Message, db: AsyncSession, state: FSMContext):
     # Статистика для этой кнопки обрабатывается в handle_unknown
     user_id = event.from_user.id if event.from_user else None
     logger.info(f"Button 'События на неделю' clicked by user {user_id}. Calling universal handler.")
@@ -160,15 +269,15 @@ async def handle_week_events_button(event: Message, db: Session, state: FSMConte
             await handler_func(event, db, state)
             return
 
-@router.message(F.text == get_text("button_delete_event", None, db=next(get_db())), AdminFilter())
-async def handle_delete_event_button(event: Message, db: Session, state: FSMContext):
+@router.message(F.text == get_text("button_delete_event", None, db=None), AdminFilter())
+async def handle_delete_event_button(event: Message, db: AsyncSession, state: FSMContext):
     # Статистика для этой кнопки обрабатывается в handle_unknown
     user_id = event.from_user.id if event.from_user else None
     await event.answer(get_text("delete_event_prompt", user_id, db=db))
     await state.set_state(CalendarStates.waiting_for_event_id_to_delete)
 
-@router.message(F.text == get_text("button_back", None, db=next(get_db())))
-async def handle_back_button(event: Message, db: Session, state: FSMContext):
+@router.message(F.text == get_text("button_back", None, db=None))
+async def handle_back_button(event: Message, db: AsyncSession, state: FSMContext):
     # Статистика для этой кнопки обрабатывается в handle_unknown
     current_state = await state.get_state()
     if current_state:
@@ -179,7 +288,7 @@ async def handle_back_button(event: Message, db: Session, state: FSMContext):
     await event.answer("Главное меню:", reply_markup=get_main_keyboard(user_id, db=db))
 
 @router.message(CalendarStates.waiting_for_event_id_to_delete, AdminFilter())
-async def process_event_id_to_delete(event: Message, db: Session, state: FSMContext):
+async def process_event_id_to_delete(event: Message, db: AsyncSession, state: FSMContext):
     event_id = event.text
     user_id = event.from_user.id if event.from_user else None
 
@@ -198,7 +307,7 @@ async def process_event_id_to_delete(event: Message, db: Session, state: FSMCont
     await event.answer(get_text("main_menu", user_id, db=db), reply_markup=get_main_keyboard(user_id, db=db))
 
 @router.message(StateFilter(LanguageStates.waiting_for_language_selection))
-async def process_language_selection(event: Message, db: Session, db_user: User, state: FSMContext):
+async def process_language_selection(event: Message, db: AsyncSession, db_user: User, state: FSMContext):
     logger.info(f"User {event.from_user.id if event.from_user else 'N/A'} in waiting_for_language_selection state, received: {event.text}")
     selected_language_name = event.text
     user_id = event.from_user.id if event.from_user else None
@@ -218,7 +327,9 @@ async def process_language_selection(event: Message, db: Session, db_user: User,
 
     if selected_language_code and selected_language_code in loaded_locales:
         user_repo = UserRepository(db)
-        user_repo.update_user_language(user_id, selected_language_code)
+        await user_repo.update_user_language(user_id, selected_language_code)
+        # Остаток апдейта (подтверждение и клавиатура) уже на новом языке
+        set_user_language(user_id, selected_language_code)
         await event.answer(get_text("language_changed", user_id, db=db).format(language_name=selected_language_name),
                              reply_markup=get_main_keyboard(user_id, db=db))
         logger.info(f"User {user_id} changed language to {selected_language_code} in DB via repository.")
@@ -230,15 +341,15 @@ async def process_language_selection(event: Message, db: Session, db_user: User,
         logger.warning(f"User {user_id} sent unknown or unloaded language name: {selected_language_name}. Current DB language: {db_user.language_code}")
         return
 
-@router.message(StateFilter(AdminStates.waiting_for_broadcast_message), F.text == get_text("button_back_to_main", None, db=next(get_db())), AdminFilter())
-async def handle_back_from_broadcast(event: Message, db: Session, state: FSMContext):
+@router.message(StateFilter(AdminStates.waiting_for_broadcast_message), F.text == get_text("button_back_to_main", None, db=None), AdminFilter())
+async def handle_back_from_broadcast(event: Message, db: AsyncSession, state: FSMContext):
     # ИЗМЕНЕНИЕ: Специальный обработчик для кнопки "В главное меню" в состоянии рассылки
     logger.info(f"Admin {event.from_user.id if event.from_user else 'N/A'} pressed 'Back to main menu' button during broadcast.")
     # Вызываем существующую логику возврата в главное меню
     await _handle_back_to_main_logic(event, db, state)
 
 @router.message(StateFilter(AdminStates.waiting_for_broadcast_message), AdminFilter())
-async def process_broadcast_message(event: Message, db: Session, bot: Bot, state: FSMContext):
+async def process_broadcast_message(event: Message, db: AsyncSession, bot: Bot, state: FSMContext):
     user_id = event.from_user.id if event.from_user else None
     
     if not event.text:
@@ -262,43 +373,32 @@ async def process_broadcast_message(event: Message, db: Session, bot: Bot, state
         # Не сбрасываем состояние, чтобы администратор мог ввести другое сообщение или выйти
         return # Прекращаем выполнение функции, не отправляя рассылку
 
-    # Если введен не текст кнопки, продолжаем рассылку
-    user_repo = UserRepository(db) # Получаем репозиторий здесь
-    all_users = user_repo.get_all_users()
-    # ИЗМЕНЕНИЕ: Преобразуем user.id сначала к str, затем к int
-    user_ids_to_broadcast = [int(str(user.id)) for user in all_users]
-    logger.info(f"Broadcasting message to {len(user_ids_to_broadcast)} users")
-
-    sent_count = 0
-    failed_count = 0
+    # Тексты для каждого языка готовятся один раз, до начала рассылки
+    variants = render_variants(event.text)
+    if not all(variants.values()):
+        await event.answer(get_text("broadcast_empty", user_id, db=db))
+        return
 
-    # Сбрасываем состояние ПЕРЕД отправкой сообщения о завершении и главного меню
+    # Если введен не текст кнопки, запускаем рассылку в фоне: ход рассылки
+    # движок показывает администратору отдельным сообщением
+    try:
+        await broadcast_engine.start(bot, user_id, event.text, variants)
+    except BroadcastMessageError as e:
+        # Администратор уже видит отклоненный текст; остаемся в состоянии, чтобы он отправил исправленный
+        logger.warning(f"Admin {user_id} broadcast text rejected: {e}")
+        await event.answer(get_text("broadcast_invalid_message", user_id, db=db).format(
+            language=e.language_code,
+            error=html_decoration.quote(e.error.message),
+        ))
+        return
     await state.clear()
-
-    for broadcast_user_id in user_ids_to_broadcast:
-        try:
-            await bot.send_message(
-                chat_id=broadcast_user_id,
-                text=event.text,
-                parse_mode=ParseMode.MARKDOWN_V2
-            )
-            sent_count += 1
-        except Exception as e:
-            logger.error(f"Failed to send broadcast message to user {broadcast_user_id}: {e}")
-            failed_count += 1
-
-    await event.answer(
-        get_text("broadcast_complete", user_id, db=db).format(
-            sent_count=sent_count,
-            failed_count=failed_count
-        )
-    )
+    logger.info(f"Broadcast started in background by admin {user_id}")
 
     # Отправляем главное меню после сброса состояния
     await event.answer(get_text("main_menu", user_id, db=db), reply_markup=get_main_keyboard(user_id, db=db))
 
 @router.message(StateFilter(CalendarStates.waiting_for_event_name))
-async def process_event_name(event: Message, db: Session, state: FSMContext):
+async def process_event_name(event: Message, db: AsyncSession, state: FSMContext):
     logger.info(f"Processing event name for user {event.from_user.id if event.from_user else 'N/A'} in state waiting_for_event_name")
     user_id = event.from_user.id if event.from_user else None
     event_name = event.text
@@ -312,7 +412,7 @@ async def process_event_name(event: Message, db: Session, state: FSMContext):
     await state.set_state(CalendarStates.waiting_for_event_date)
 
 @router.message(StateFilter(CalendarStates.waiting_for_event_date))
-async def process_event_date(event: Message, db: Session, state: FSMContext):
+async def process_event_date(event: Message, db: AsyncSession, state: FSMContext):
     logger.info(f"Processing event date for user {event.from_user.id if event.from_user else 'N/A'} in state waiting_for_event_date")
     user_id = event.from_user.id if event.from_user else None
     event_date_str = event.text
@@ -335,7 +435,7 @@ async def process_event_date(event: Message, db: Session, state: FSMContext):
     await state.set_state(CalendarStates.waiting_for_event_time)
 
 @router.message(StateFilter(CalendarStates.waiting_for_event_description))
-async def process_event_description(event: Message, db: Session, state: FSMContext):
+async def process_event_description(event: Message, db: AsyncSession, state: FSMContext):
     # ИЗМЕНЕНО: Эта функция теперь обрабатывает ввод описания и создает событие
     logger.info(f"Processing event description for user {event.from_user.id if event.from_user else 'N/A'} in state waiting_for_event_description")
     user_id = event.from_user.id if event.from_user else None
@@ -361,6 +461,8 @@ async def process_event_description(event: Message, db: Session, state: FSMConte
 
     # Вызываем API календаря для создания события
     try:
+        # Пересечения проверяются по индексу событий, без отдельного запроса к Google
+        await warn_about_conflicts(event, db, user_id, start_datetime, end_datetime)
         created_event = await calendar_api.create_event(
             summary=str(event_name), # Приведение к str
             start_time=start_datetime,
@@ -386,7 +488,7 @@ async def process_event_description(event: Message, db: Session, state: FSMConte
     await event.answer(get_text("main_menu", user_id, db=db), reply_markup=get_main_keyboard(user_id, db=db))
 
 @router.message(StateFilter(CalendarStates.waiting_for_event_time))
-async def process_event_time(event: Message, db: Session, state: FSMContext):
+async def process_event_time(event: Message, db: AsyncSession, state: FSMContext):
     # ИЗМЕНЕНО: Эта функция теперь обрабатывает ввод времени и запрашивает описание
     logger.info(f"Processing event time for user {event.from_user.id if event.from_user else 'N/A'} in state waiting_for_event_time")
     user_id = event.from_user.id if event.from_user else None
@@ -407,6 +509,99 @@ async def process_event_time(event: Message, db: Session, state: FSMContext):
     await event.answer(get_text("create_event_description_prompt", user_id, db=db)) # Запрашиваем описание
     await state.set_state(CalendarStates.waiting_for_event_description) # Переходим в состояние ожидания описания
 
+def _parse_bulk_events(text: str) -> tuple[list[tuple[int, dict]], list[int]]:
+    """Разбирает строки вида 'ДД.ММ.ГГГГ ЧЧ:ММ; часы; название; описание'.
+
+    Возвращает пары (номер строки, событие) и номера строк, которые разобрать не удалось.
+    """
+    events = []
+    invalid_lines = []
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        parts = [part.strip() for part in line.split(';', 3)]
+        try:
+            if len(parts) < 3 or not parts[2]:
+                raise ValueError(f"Not enough fields in line {line_number}")
+            start_datetime = datetime.strptime(parts[0], '%d.%m.%Y %H:%M')
+            end_datetime = start_datetime + timedelta(hours=float(parts[1].replace(',', '.')))
+        except ValueError:
+            invalid_lines.append(line_number)
+            continue
+        events.append((line_number, {
+            "summary": parts[2],
+            "start_time": start_datetime,
+            "end_time": end_datetime,
+            "description": parts[3] if len(parts) > 3 else "",
+        }))
+    return events, invalid_lines
+
+async def _read_bulk_input(event: Message, bot: Bot) -> str:
+    """Текст сообщения или содержимое приложенного .txt файла."""
+    if event.document:
+        file = await bot.download(event.document)
+        return file.read().decode('utf-8') if file else ""
+    return event.text or ""
+
+@router.message(StateFilter(CalendarStates.waiting_for_bulk_events), AdminFilter())
+async def process_bulk_events(event: Message, db: AsyncSession, bot: Bot, state: FSMContext):
+    user_id = event.from_user.id if event.from_user else None
+    events, invalid_lines = _parse_bulk_events(await _read_bulk_input(event, bot))
+
+    if invalid_lines:
+        # Остаемся в состоянии, чтобы администратор мог отправить исправленный список
+        await event.answer(get_text("bulk_create_invalid_lines", user_id, db=db).format(
+            line_numbers=", ".join(map(str, invalid_lines))
+        ))
+        return
+
+    if not events:
+        await event.answer(get_text("bulk_empty", user_id, db=db))
+        return
+
+    logger.info(f"Admin {user_id} requested bulk creation of {len(events)} events")
+    created_events = await calendar_api.create_events([event_data for _, event_data in events])
+    failed_lines = [line_number for (line_number, _), created in zip(events, created_events) if created is None]
+
+    response = get_text("bulk_create_result", user_id, db=db).format(
+        created_count=len(events) - len(failed_lines),
+        failed_count=len(failed_lines)
+    )
+    if failed_lines:
+        response += get_text("bulk_create_failed_lines", user_id, db=db).format(
+            line_numbers=", ".join(map(str, failed_lines))
+        )
+    await event.answer(response)
+
+    await state.clear()
+    await event.answer(get_text("main_menu", user_id, db=db), reply_markup=get_main_keyboard(user_id, db=db))
+
+@router.message(StateFilter(CalendarStates.waiting_for_event_ids_to_bulk_delete), AdminFilter())
+async def process_bulk_delete(event: Message, db: AsyncSession, bot: Bot, state: FSMContext):
+    user_id = event.from_user.id if event.from_user else None
+    # dict.fromkeys убирает повторы, сохраняя порядок ID
+    event_ids = list(dict.fromkeys((await _read_bulk_input(event, bot)).split()))
+
+    if not event_ids:
+        await event.answer(get_text("delete_event_empty_id", user_id, db=db))
+        return
+
+    logger.info(f"Admin {user_id} requested bulk deletion of {len(event_ids)} events")
+    results = await calendar_api.delete_events(event_ids)
+    failed_ids = [event_id for event_id, deleted in results.items() if not deleted]
+
+    response = get_text("bulk_delete_result", user_id, db=db).format(
+        deleted_count=len(event_ids) - len(failed_ids),
+        failed_count=len(failed_ids)
+    )
+    if failed_ids:
+        response += get_text("bulk_delete_failed_ids", user_id, db=db).format(event_ids=", ".join(failed_ids))
+    await event.answer(response)
+
+    await state.clear()
+    await event.answer(get_text("main_menu", user_id, db=db), reply_markup=get_main_keyboard(user_id, db=db))
+
 class CalendarEvent(TypedDict):
     id: str
     summary: str
@@ -414,7 +609,7 @@ class CalendarEvent(TypedDict):
     start: Dict[str, str]
 
 @router.message()
-async def handle_unknown(event: Message, db: Session, state: FSMContext):
+async def handle_unknown(event: Message, db: AsyncSession, state: FSMContext):
     # Получаем текущее состояние
     current_state = await state.get_state()
 
@@ -437,8 +632,8 @@ async def handle_unknown(event: Message, db: Session, state: FSMContext):
 
             # Используем репозиторий для инкрементации статистики
             stats_repo = ButtonStatisticRepository(db)
-            stats_repo.increment_button_click(key) # Статистика инкрементируется здесь для кнопок, пойманных handle_unknown
-            logger.info(f"Button '{key}' clicked. Statistics updated in DB.")
+            await stats_repo.increment_button_click(key) # Статистика инкрементируется здесь для кнопок, пойманных handle_unknown
+            logger.info(f"Button '{key}' clicked. Click counted.")
 
             # Вызываем соответствующий обработчик
             await handler_func(event, db, state) # Передаем event, db и state
@@ -453,7 +648,7 @@ async def handle_unknown(event: Message, db: Session, state: FSMContext):
 
 
 # Вспомогательные функции для логики кнопок
-async def _handle_language_button_logic(event: Message, db: Session, state: FSMContext):
+async def _handle_language_button_logic(event: Message, db: AsyncSession, state: FSMContext):
     logger.info(f"User {event.from_user.id if event.from_user else 'N/A'} clicked Language button via universal handler.")
     user_id = event.from_user.id if event.from_user else None
 
@@ -470,7 +665,7 @@ async def _handle_language_button_logic(event: Message, db: Session, state: FSMC
     )
     await state.set_state(LanguageStates.waiting_for_language_selection)
 
-async def _handle_create_event_logic(event: Message, db: Session, state: FSMContext):
+async def _handle_create_event_logic(event: Message, db: AsyncSession, state: FSMContext):
     user_id = event.from_user.id if event.from_user else None
     
     if user_id is None or user_id not in ADMIN_IDS:
@@ -483,7 +678,7 @@ async def _handle_create_event_logic(event: Message, db: Session, state: FSMCont
     )
     await state.set_state(CalendarStates.waiting_for_event_name)
 
-async def _handle_week_events_logic(event: Message, db: Session, state: FSMContext):
+async def _handle_week_events_logic(event: Message, db: AsyncSession, state: FSMContext):
     user_id = event.from_user.id if event.from_user else None
     events: List[Dict[str, Any]] = await calendar_api.get_events(days=7)
 
@@ -514,7 +709,7 @@ async def _handle_week_events_logic(event: Message, db: Session, state: FSMConte
 
     await event.answer(response, parse_mode=ParseMode.MARKDOWN_V2)
 
-async def _handle_delete_event_logic(event: Message, db: Session, state: FSMContext):
+async def _handle_delete_event_logic(event: Message, db: AsyncSession, state: FSMContext):
     user_id = event.from_user.id if event.from_user else None
     
     if user_id is None or user_id not in ADMIN_IDS:
@@ -527,7 +722,7 @@ async def _handle_delete_event_logic(event: Message, db: Session, state: FSMCont
     )
     await state.set_state(CalendarStates.waiting_for_event_id_to_delete)
 
-async def _handle_back_logic(event: Message, db: Session, state: FSMContext):
+async def _handle_back_logic(event: Message, db: AsyncSession, state: FSMContext):
     user_id = event.from_user.id if event.from_user else None
     
     await state.clear()
@@ -536,7 +731,7 @@ async def _handle_back_logic(event: Message, db: Session, state: FSMContext):
         reply_markup=get_main_keyboard(user_id, db=db)
     )
 
-async def _handle_admin_menu_logic(event: Message, db: Session, state: FSMContext):
+async def _handle_admin_menu_logic(event: Message, db: AsyncSession, state: FSMContext):
     user_id = event.from_user.id if event.from_user else None
     
     if user_id is None or user_id not in ADMIN_IDS:
@@ -548,7 +743,7 @@ async def _handle_admin_menu_logic(event: Message, db: Session, state: FSMContex
         reply_markup=get_admin_keyboard(user_id, db=db)
     )
 
-async def _handle_back_to_main_logic(event: Message, db: Session, state: FSMContext):
+async def _handle_back_to_main_logic(event: Message, db: AsyncSession, state: FSMContext):
     current_state = await state.get_state()
     if current_state:
         logger.info(f"Clearing state: {current_state}")
@@ -562,56 +757,56 @@ async def _handle_back_to_main_logic(event: Message, db: Session, state: FSMCont
     await event.answer(get_text("main_menu", user_id, db=db), reply_markup=get_main_keyboard(user_id, db=db))
 
 # Вспомогательные функции-обертки для хендлеров кнопок
-async def _wrap_cmd_calendar(event: Message, db: Session, state: FSMContext):
+async def _wrap_cmd_calendar(event: Message, db: AsyncSession, state: FSMContext):
     stats_repo = ButtonStatisticRepository(db)
-    stats_repo.increment_button_click("button_calendar") # Регистрируем статистику для кнопки
+    await stats_repo.increment_button_click("button_calendar") # Регистрируем статистику для кнопки
     await cmd_calendar(event, db=db)
 
-async def _wrap_send_help_message(event: Message, db: Session, state: FSMContext):
+async def _wrap_send_help_message(event: Message, db: AsyncSession, state: FSMContext):
     stats_repo = ButtonStatisticRepository(db)
-    stats_repo.increment_button_click("button_help") # Регистрируем статистику для кнопки
+    await stats_repo.increment_button_click("button_help") # Регистрируем статистику для кнопки
     await send_help_message(event, db, state)
 
-async def _wrap_handle_language_button_logic(event: Message, db: Session, state: FSMContext):
+async def _wrap_handle_language_button_logic(event: Message, db: AsyncSession, state: FSMContext):
     stats_repo = ButtonStatisticRepository(db)
-    stats_repo.increment_button_click("button_language") # Регистрируем статистику для кнопки
+    await stats_repo.increment_button_click("button_language") # Регистрируем статистику для кнопки
     await _handle_language_button_logic(event, db, state)
 
-async def _wrap_handle_create_event_logic(event: Message, db: Session, state: FSMContext):
+async def _wrap_handle_create_event_logic(event: Message, db: AsyncSession, state: FSMContext):
     stats_repo = ButtonStatisticRepository(db)
-    stats_repo.increment_button_click("button_create_event") # Регистрируем статистику для кнопки
+    await stats_repo.increment_button_click("button_create_event") # Регистрируем статистику для кнопки
     await _handle_create_event_logic(event, db, state)
 
-async def _wrap_handle_week_events_logic(event: Message, db: Session, state: FSMContext):
+async def _wrap_handle_week_events_logic(event: Message, db: AsyncSession, state: FSMContext):
     stats_repo = ButtonStatisticRepository(db)
-    stats_repo.increment_button_click("button_week_events") # Регистрируем статистику для кнопки
+    await stats_repo.increment_button_click("button_week_events") # Регистрируем статистику для кнопки
     await _handle_week_events_logic(event, db, state)
 
-async def _wrap_handle_delete_event_logic(event: Message, db: Session, state: FSMContext):
+async def _wrap_handle_delete_event_logic(event: Message, db: AsyncSession, state: FSMContext):
     stats_repo = ButtonStatisticRepository(db)
-    stats_repo.increment_button_click("button_delete_event") # Регистрируем статистику для кнопки
+    await stats_repo.increment_button_click("button_delete_event") # Регистрируем статистику для кнопки
     await _handle_delete_event_logic(event, db, state)
 
-async def _wrap_handle_back_logic(event: Message, db: Session, state: FSMContext):
+async def _wrap_handle_back_logic(event: Message, db: AsyncSession, state: FSMContext):
     stats_repo = ButtonStatisticRepository(db)
-    stats_repo.increment_button_click("button_back") # Регистрируем статистику для кнопки
+    await stats_repo.increment_button_click("button_back") # Регистрируем статистику для кнопки
     await _handle_back_logic(event, db, state)
 
-async def _wrap_handle_admin_menu_logic(event: Message, db: Session, state: FSMContext):
+async def _wrap_handle_admin_menu_logic(event: Message, db: AsyncSession, state: FSMContext):
     stats_repo = ButtonStatisticRepository(db)
-    stats_repo.increment_button_click("button_admin_menu") # Регистрируем статистику для кнопки
+    await stats_repo.increment_button_click("button_admin_menu") # Регистрируем статистику для кнопки
     await _handle_admin_menu_logic(event, db, state)
 
-async def _wrap_handle_back_to_main_logic(event: Message, db: Session, state: FSMContext):
+async def _wrap_handle_back_to_main_logic(event: Message, db: AsyncSession, state: FSMContext):
     stats_repo = ButtonStatisticRepository(db)
-    stats_repo.increment_button_click("button_back_to_main") # Регистрируем статистику для кнопки
+    await stats_repo.increment_button_click("button_back_to_main") # Регистрируем статистику для кнопки
     await _handle_back_to_main_logic(event, db, state)
 
-async def _wrap_cmd_stats(event: Message, db: Session, state: FSMContext):
+async def _wrap_cmd_stats(event: Message, db: AsyncSession, state: FSMContext):
     # Статистика для этой команды обрабатывается в cmd_stats
     await cmd_stats(event, db, state)
 
-async def _wrap_cmd_broadcast(event: Message, db: Session, state: FSMContext):
+async def _wrap_cmd_broadcast(event: Message, db: AsyncSession, state: FSMContext):
     # Статистика для этой команды обрабатывается в cmd_broadcast
     await cmd_broadcast(event, db, state)
 
@@ -0,0 +1,439 @@
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Hashable, List, Optional, Set, Tuple
+import asyncio
+import json
+import random
+import re
+import time
+from aiogram import Bot
+from aiogram.enums import ParseMode
+from aiogram.utils.text_decorations import html_decoration, markdown_decoration
+from aiogram.exceptions import (
+    TelegramAPIError, TelegramBadRequest, TelegramForbiddenError, TelegramNetworkError, TelegramRetryAfter,
+    TelegramServerError,
+)
+from config.settings import (
+    BROADCAST_RATE, BROADCAST_CONCURRENCY, BROADCAST_MAX_RETRIES, BROADCAST_RETRY_BASE_DELAY,
+    BROADCAST_PROGRESS_INTERVAL, BROADCAST_STATUS_BATCH, DEFAULT_LANGUAGE, LANGUAGES,
+)
+from database.database import SessionLocal
+from database.models import BroadcastJob
+from database.repositories import BroadcastJobRepository, UserRepository
+from utils.i18n import get_text, loaded_locales, set_user_language
+from utils.rate_limit import TokenBucket
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Строка "[ru]" начинает текст рассылки для языка, секция "@ключ" - текст из локали
+_SECTION = re.compile(r"^\[([a-z]{2,3})\][ \t]*$", re.MULTILINE)
+_TEMPLATE = re.compile(r"^@(\w+)$")
+
+
+def render_variants(text: str) -> Dict[str, str]:
+    """Готовит текст рассылки для каждого языка из LANGUAGES.
+
+    Текст может состоять из секций, начинающихся строкой [код языка]. Язык
+    без своей секции получает текст до первой секции, секцию языка по
+    умолчанию или первую секцию. Секция вида @ключ заменяется текстом из
+    локали языка, экранированным для MarkdownV2. Без секций всем языкам
+    достается исходный текст.
+    """
+    parts = _SECTION.split(text)
+    sections = {parts[index]: parts[index + 1].strip() for index in range(1, len(parts), 2)}
+    fallback = parts[0].strip() or sections.get(DEFAULT_LANGUAGE) or next(iter(sections.values()), "")
+    variants = {}
+    for language_code in LANGUAGES:
+        body = sections.get(language_code, fallback)
+        template = _TEMPLATE.match(body)
+        if template and template.group(1) in loaded_locales.get(language_code, {}):
+            body = markdown_decoration.quote(loaded_locales[language_code][template.group(1)])
+        variants[language_code] = body
+    return variants
+
+
+def _language_order(language_code: Optional[str]) -> Tuple[bool, str]:
+    # Порядок языков как в ORDER BY language_code SQLite: NULL раньше остальных
+    return (language_code is not None, language_code or "")
+
+
+@dataclass
+class BroadcastProgress:
+    total: int = 0
+    sent: int = 0
+    failed: int = 0
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.failed
+
+
+# Результаты отправки одному пользователю. В состояние доставки пользователя
+# попадают только ошибки, вызванные его чатом; FAILED (сбой сети или сервера
+# Telegram, исчерпанные повторы) на него не влияет
+DELIVERED = "delivered"
+BLOCKED = "blocked"
+DEACTIVATED = "deactivated"
+UNREACHABLE = "unreachable"  # чат не найден
+FAILED = "failed"
+
+# Ошибки BadRequest, относящиеся к чату получателя, а не к тексту сообщения
+_CHAT_NOT_FOUND_ERRORS = ("chat not found", "user not found", "peer_id_invalid")
+
+
+def _empty_results() -> Dict[str, List[int]]:
+    return {DELIVERED: [], BLOCKED: [], DEACTIVATED: [], UNREACHABLE: [], FAILED: []}
+
+
+class BroadcastMessageError(Exception):
+    """Telegram отклонил сам текст рассылки (ошибка разметки, слишком длинное сообщение...)."""
+
+    def __init__(self, language_code: Optional[str], error: TelegramBadRequest):
+        super().__init__(f"Broadcast text for language {language_code} rejected: {error.message}")
+        self.language_code = language_code
+        self.error = error
+
+
+@dataclass
+class DeliveryLog:
+    """Результаты доставки, еще не записанные в базу: результат -> ID пользователей."""
+    results: Dict[str, List[int]] = field(default_factory=_empty_results)
+    size: int = 0
+
+    def add(self, outcome: str, user_id: int) -> None:
+        self.results[outcome].append(user_id)
+        self.size += 1
+
+    def take(self) -> Dict[str, List[int]]:
+        """Забирает накопленные результаты."""
+        results, self.results, self.size = self.results, _empty_results(), 0
+        return results
+
+
+class CursorTracker:
+    """Позиция рассылки при отправке вне порядка: последний ключ, до которого
+    включительно (в порядке передачи воркерам) все пользователи уже обработаны."""
+
+    def __init__(self, position: Optional[Hashable] = None):
+        self.position = position
+        self._dispatched: Deque[Hashable] = deque()
+        self._done: Set[Hashable] = set()
+
+    def dispatch(self, key: Hashable) -> None:
+        self._dispatched.append(key)
+
+    def complete(self, key: Hashable) -> None:
+        self._done.add(key)
+        while self._dispatched and self._dispatched[0] in self._done:
+            self.position = self._dispatched.popleft()
+            self._done.discard(self.position)
+
+
+@dataclass
+class BroadcastRun:
+    """Состояние выполняющейся рассылки."""
+    job_id: int
+    admin_id: int
+    # Код языка -> готовый текст
+    variants: Dict[str, str]
+    status_message_id: Optional[int]
+    progress: BroadcastProgress
+    cursor: CursorTracker
+    deliveries: DeliveryLog = field(default_factory=DeliveryLog)
+    # Контрольные точки записываются по очереди, чтобы позиция не откатывалась назад
+    checkpoint_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    @classmethod
+    def from_job(cls, job: BroadcastJob) -> "BroadcastRun":
+        return cls(
+            job_id=job.id,
+            admin_id=job.admin_id,
+            variants=json.loads(job.variants) if job.variants else render_variants(job.text),
+            status_message_id=job.status_message_id,
+            progress=BroadcastProgress(total=job.total, sent=job.sent, failed=job.failed),
+            cursor=CursorTracker((job.cursor_language, job.cursor) if job.cursor is not None else None),
+        )
+
+    def variant_for(self, language_code: Optional[str]) -> str:
+        return self.variants.get(language_code) or self.variants[DEFAULT_LANGUAGE]
+
+
+class BroadcastEngine:
+    """Фоновая рассылка сообщения всем пользователям на их языке.
+
+    Сообщения отправляют несколько воркеров одновременно; общий темп
+    ограничивает ведро токенов (лимит Telegram - около 30 сообщений в
+    секунду на бота). Каждый получатель получает одно сообщение, поэтому
+    лимит на чат соблюдается сам собой, а сообщение о ходе рассылки
+    администратору обновляется не чаще progress_interval.
+
+    Рассылка хранится в базе как задание (BroadcastJob). Позиция и счетчики
+    сохраняются вместе с результатами доставки каждые status_batch
+    сообщений, а прерванные задания продолжаются при запуске бота
+    (resume). После сбоя повторно могут получить сообщение только
+    пользователи, обработанные после последней контрольной точки.
+    """
+
+    def __init__(
+        self,
+        rate: float = BROADCAST_RATE,
+        concurrency: int = BROADCAST_CONCURRENCY,
+        max_retries: int = BROADCAST_MAX_RETRIES,
+        retry_base_delay: float = BROADCAST_RETRY_BASE_DELAY,
+        progress_interval: float = BROADCAST_PROGRESS_INTERVAL,
+        status_batch: int = BROADCAST_STATUS_BATCH,
+    ):
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.progress_interval = progress_interval
+        self.status_batch = status_batch
+        # Одно ведро на все рассылки: лимит Telegram действует на бота целиком.
+        # Без запаса токенов сообщения идут равномерно, без всплесков выше лимита
+        self._bucket = TokenBucket(rate, capacity=1)
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def start(self, bot: Bot, admin_id: int, text: str, variants: Optional[Dict[str, str]] = None) -> asyncio.Task:
+        """Создает задание рассылки и выполняет его в фоне.
+
+        variants - тексты по языкам (см. render_variants); по умолчанию готовятся из text.
+        Перед созданием задания тексты отправляются администратору на проверку:
+        если Telegram их не принимает, выбрасывается BroadcastMessageError.
+        """
+        if variants is None:
+            variants = render_variants(text)
+        await self.check_variants(bot, admin_id, variants)
+        async with SessionLocal() as db:
+            total = await UserRepository(db).count_users(reachable_only=True)
+            job = await BroadcastJobRepository(db).create_job(admin_id, text, variants, total)
+        return self._spawn(bot, BroadcastRun.from_job(job))
+
+    async def check_variants(self, bot: Bot, admin_id: int, variants: Dict[str, str]) -> None:
+        """Отправляет администратору каждый различный текст рассылки так, как его получат пользователи."""
+        checked: Set[str] = set()
+        for language_code, text in variants.items():
+            if text in checked:
+                continue
+            checked.add(text)
+            await self._bucket.acquire()
+            try:
+                await bot.send_message(chat_id=admin_id, text=text, parse_mode=ParseMode.MARKDOWN_V2)
+            except TelegramBadRequest as e:
+                raise BroadcastMessageError(language_code, e) from e
+
+    async def resume(self, bot: Bot) -> None:
+        """Продолжает задания, прерванные остановкой бота."""
+        async with SessionLocal() as db:
+            jobs = await BroadcastJobRepository(db).get_running_jobs()
+            for job in jobs:
+                logger.info(f"Resuming broadcast job {job.id} after user {job.cursor} "
+                            f"({job.sent + job.failed} of {job.total} done)")
+                admin = await UserRepository(db).get_user(job.admin_id)
+                # Задача копирует контекст, поэтому ход рассылки показывается на языке администратора
+                if admin is not None:
+                    set_user_language(job.admin_id, admin.language_code)
+                self._spawn(bot, BroadcastRun.from_job(job))
+
+    def _spawn(self, bot: Bot, run: BroadcastRun) -> asyncio.Task:
+        task = asyncio.create_task(self._run(bot, run))
+        self._tasks.add(task)
+        task.add_done_callback(self._on_done)
+        return task
+
+    def _on_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Broadcast failed: {task.exception()}")
+
+    async def stop(self) -> None:
+        """Прерывает текущие рассылки, сохранив их позицию; при запуске они продолжатся."""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run(self, bot: Bot, run: BroadcastRun) -> BroadcastProgress:
+        progress = run.progress
+        logger.info(f"Broadcast job {run.job_id} by {run.admin_id} running for {progress.total} users")
+        started_at = time.monotonic()
+        processed_before = progress.processed
+
+        if run.status_message_id is None:
+            status_message = await bot.send_message(run.admin_id, self._progress_text(run.admin_id, progress))
+            run.status_message_id = status_message.message_id
+            async with SessionLocal() as db:
+                await BroadcastJobRepository(db).set_status_message(run.job_id, run.status_message_id)
+        reporter = asyncio.create_task(self._report_progress(bot, run))
+
+        # Очередь ограничена, поэтому пользователи читаются из базы не быстрее отправки
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.create_task(self._worker(bot, queue, run)) for _ in range(self.concurrency)]
+        producer = asyncio.create_task(self._feed(queue, run, len(workers)))
+        status = "running"
+        try:
+            # Ошибка воркера или чтения из базы прерывает рассылку, не дожидаясь остальных
+            done, _ = await asyncio.wait([producer, *workers], return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+            status = "completed"
+        except BroadcastMessageError as e:
+            # Текст не принимается Telegram: повторять его остальным пользователям бессмысленно
+            logger.error(f"Broadcast job {run.job_id} stopped: {e}")
+            status = "failed"
+            aborted = e
+        finally:
+            producer.cancel()
+            for worker in workers:
+                worker.cancel()
+            reporter.cancel()
+            # При остановке бота сохраняем позицию, при завершении - отмечаем задание выполненным или прерванным
+            await self._checkpoint(run, status=status)
+
+        if status == "failed":
+            await self._edit_status(bot, run, get_text("broadcast_aborted", run.admin_id).format(
+                language=aborted.language_code,
+                error=html_decoration.quote(aborted.error.message),
+                sent_count=progress.sent,
+                failed_count=progress.failed,
+            ))
+            return progress
+
+        elapsed = time.monotonic() - started_at
+        processed = progress.processed - processed_before
+        logger.info(
+            f"Broadcast job {run.job_id} finished: {progress.sent} sent, {progress.failed} failed "
+            f"in {elapsed:.1f}s ({processed / elapsed if elapsed else 0:.1f} msg/s)"
+        )
+        await self._edit_status(bot, run, get_text("broadcast_complete", run.admin_id).format(
+            sent_count=progress.sent,
+            failed_count=progress.failed,
+        ))
+        return progress
+
+    async def _feed(self, queue: asyncio.Queue, run: BroadcastRun, workers: int):
+        async with SessionLocal() as db:
+            await self._produce(UserRepository(db), queue, run)
+        for _ in range(workers):
+            await queue.put(None)
+
+    async def _produce(self, user_repo: UserRepository, queue: asyncio.Queue, run: BroadcastRun):
+        """Передает воркерам получателей, сгруппированных по языку, вместе с готовым текстом."""
+        position = run.cursor.position
+        # Заблокировавшие бота и удаленные пользователи отсекаются запросом
+        for language_code in await user_repo.get_languages(reachable_only=True):
+            after_id = None
+            if position is not None:
+                if _language_order(language_code) < _language_order(position[0]):
+                    continue  # язык пройден до перезапуска
+                if language_code == position[0]:
+                    after_id = position[1]
+            # Текст выбирается один раз на язык, воркеры только отправляют его
+            text = run.variant_for(language_code)
+            async for recipient in user_repo.iter_users(
+                reachable_only=True, by_language=True, language_code=language_code, after_id=after_id,
+            ):
+                run.cursor.dispatch((language_code, recipient.id))
+                await queue.put((language_code, recipient.id, text))
+
+    async def _worker(self, bot: Bot, queue: asyncio.Queue, run: BroadcastRun):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            language_code, chat_id, text = item
+            outcome = await self._send(bot, chat_id, text, language_code)
+            if outcome == DELIVERED:
+                run.progress.sent += 1
+            else:
+                run.progress.failed += 1
+            run.deliveries.add(outcome, chat_id)
+            run.cursor.complete((language_code, chat_id))
+            if run.deliveries.size >= self.status_batch:
+                await self._checkpoint(run)
+
+    async def _checkpoint(self, run: BroadcastRun, status: str = "running"):
+        """Записывает результаты доставки, позицию, счетчики и статус рассылки одной транзакцией."""
+        async with run.checkpoint_lock:
+            results = run.deliveries.take()
+            try:
+                async with SessionLocal() as db:
+                    await UserRepository(db).record_deliveries(
+                        results[DELIVERED], results[BLOCKED], results[DEACTIVATED], results[UNREACHABLE], commit=False,
+                    )
+                    await BroadcastJobRepository(db).save_checkpoint(
+                        run.job_id, run.cursor.position, run.progress.sent, run.progress.failed, status=status,
+                    )
+            except Exception as e:
+                logger.error(f"Failed to save checkpoint of broadcast job {run.job_id}: {e}")
+
+    async def _send(self, bot: Bot, chat_id: int, text: str, language_code: Optional[str] = None) -> str:
+        """Отправляет сообщение с повторами. Возвращает результат доставки (DELIVERED, BLOCKED, ...).
+
+        Ошибка самого текста (BadRequest, не связанный с чатом) выбрасывается как BroadcastMessageError.
+        """
+        attempt = 0
+        while True:
+            await self._bucket.acquire()
+            try:
+                await bot.send_message(chat_id=chat_id, text=text, parse_mode=ParseMode.MARKDOWN_V2)
+                return DELIVERED
+            except TelegramRetryAfter as e:
+                # Flood control действует на всего бота: останавливаем выдачу токенов всем воркерам.
+                # Такой повтор не считается попыткой - сообщение будет отправлено после паузы
+                logger.warning(f"Broadcast hit flood control, pausing for {e.retry_after}s")
+                self._bucket.pause(e.retry_after)
+            except (TelegramNetworkError, TelegramServerError) as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    logger.error(f"Failed to send broadcast message to user {chat_id} after {attempt} attempts: {e}")
+                    return FAILED
+                # Экспоненциальная пауза со случайным разбросом, чтобы воркеры не повторяли синхронно
+                delay = self.retry_base_delay * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                logger.warning(f"Transient error sending to user {chat_id}, retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+            except TelegramForbiddenError as e:
+                # Пользователь заблокировал бота или удалил аккаунт: в следующих рассылках он пропускается
+                logger.info(f"User {chat_id} is unreachable: {e.message}")
+                return DEACTIVATED if "deactivated" in e.message else BLOCKED
+            except TelegramBadRequest as e:
+                message = e.message.lower()
+                if "user is deactivated" in message:
+                    logger.info(f"User {chat_id} is unreachable: {e.message}")
+                    return DEACTIVATED
+                if any(error in message for error in _CHAT_NOT_FOUND_ERRORS):
+                    logger.info(f"User {chat_id} is unreachable: {e.message}")
+                    return UNREACHABLE
+                raise BroadcastMessageError(language_code, e) from e
+            except TelegramAPIError as e:
+                # Прочие ошибки не говорят о чате получателя и не меняют его состояние доставки
+                logger.error(f"Failed to send broadcast message to user {chat_id}: {e}")
+                return FAILED
+
+    def _progress_text(self, admin_id: int, progress: BroadcastProgress) -> str:
+        return get_text("broadcast_progress", admin_id).format(
+            sent_count=progress.sent,
+            failed_count=progress.failed,
+            processed=progress.processed,
+            total=progress.total,
+        )
+
+    async def _report_progress(self, bot: Bot, run: BroadcastRun):
+        reported: Optional[int] = None
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            if run.progress.processed != reported:
+                reported = run.progress.processed
+                await self._edit_status(bot, run, self._progress_text(run.admin_id, run.progress))
+
+    async def _edit_status(self, bot: Bot, run: BroadcastRun, text: str):
+        # Сообщение администратору тоже расходует общий лимит бота
+        await self._bucket.acquire()
+        try:
+            await bot.edit_message_text(text=text, chat_id=run.admin_id, message_id=run.status_message_id)
+        except TelegramAPIError as e:
+            logger.warning(f"Failed to update broadcast progress for admin {run.admin_id}: {e}")
+
+
+# Общий движок рассылок процесса
+broadcast_engine = BroadcastEngine()
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def _consume_exception(task: asyncio.Task) -> None:
+    # Ошибку загрузки получают ожидающие; если все они отменены, она не должна попадать в лог как необработанная
+    if not task.cancelled():
+        task.exception()
+
+
+class TTLCache:
+    """Ограниченный LRU-кэш с TTL записей и объединением одновременных загрузок."""
+
+    def __init__(self, ttl: float, max_size: int = 128):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        # Загрузки, которые выполняются прямо сейчас: ключ -> задача загрузки
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        # Поколение кэша растет при каждой инвалидации, чтобы не сохранять
+        # результат загрузки, начатой до изменения данных
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._lookup(key, count=False) is not _MISSING
+
+    def _lookup(self, key: Hashable, count: bool = True) -> Any:
+        entry = self._data.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return value
+            del self._data[key]
+        if count:
+            self.misses += 1
+        return _MISSING
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Возвращает значение из кэша или default, если записи нет или она устарела."""
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Как get, но не учитывается в счетчиках и не продлевает запись в LRU."""
+        entry = self._data.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Сохраняет значение, вытесняя самые давние записи при переполнении."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            evicted_key, _ = self._data.popitem(last=False)
+            self.evictions += 1
+            logger.debug(f"Evicted cache entry: {evicted_key}")
+
+    def invalidate(self, key: Hashable) -> None:
+        """Удаляет одну запись."""
+        self._data.pop(key, None)
+        self._generation += 1
+
+    def clear(self) -> None:
+        """Удаляет все записи."""
+        self._data.clear()
+        self._generation += 1
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: Optional[float] = None) -> Any:
+        """Возвращает значение из кэша, а при промахе загружает его один раз для всех ожидающих.
+
+        Загрузка выполняется в отдельной задаче: отмена одного из ожидающих не
+        прерывает ее для остальных.
+        """
+        value = self._lookup(key)
+        if value is not _MISSING:
+            return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, loader, ttl, self._generation))
+            task.add_done_callback(_consume_exception)
+            self._inflight[key] = task
+        else:
+            logger.debug(f"Joining in-flight load for key: {key}")
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: Optional[float], generation: int) -> Any:
+        try:
+            value = await loader()
+            if generation == self._generation:
+                self.set(key, value, ttl)
+            return value
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики попаданий, промахов и вытеснений."""
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
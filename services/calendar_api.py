@@ -1,140 +1,614 @@
-from typing import List, Dict, Optional, Union
-from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Union, Any, Awaitable, Callable, AsyncIterator
+from datetime import datetime, timedelta, timezone
+from dateutil import tz
+from concurrent.futures import ThreadPoolExecutor
 from google.oauth2.credentials import Credentials
 from google.auth.external_account_authorized_user import Credentials as ExternalCredentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
-import pickle
-import os
-from config.settings import SCOPES, GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, GOOGLE_REDIRECT_URI
+from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest
+import asyncio
+import heapq
+import time
+import uuid
+import threading
+from config.settings import (
+    CALENDAR_MAX_CONCURRENCY, CALENDAR_HTTP_TIMEOUT, CACHE_TTL, CACHE_MAX_SIZE,
+    CALENDAR_SYNC_INTERVAL, CALENDAR_PAGE_SIZE, CALENDAR_BATCH_SIZE, GOOGLE_CALENDAR_BASE_URL,
+    CALENDAR_LIST_FIELDS, CALENDAR_SYNC_FIELDS, CALENDAR_INSERT_FIELDS, CALENDAR_IDS,
+)
+from database.database import SessionLocal
+from database.repositories import EventRepository
+from services.cache import TTLCache
+from services.credentials import CredentialManager
+from services.http_metrics import PayloadStats, MeteredHttp, MeteredJsonModel
+from utils.interval_tree import IntervalTree
+from utils.recurrence import event_time_utc
 import logging
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_CALENDAR_ID = 'primary'
+# Часовой пояс, в котором бот создает события и принимает время от пользователей
+EVENT_TIME_ZONE = 'Europe/Moscow'
+# На сколько дней вперед строится индекс, если его окно не покрывает проверяемое время
+CONFLICT_INDEX_DAYS = 7
+
+
+def _local_to_utc(value: datetime) -> datetime:
+    """Переводит naive-время в EVENT_TIME_ZONE в naive UTC."""
+    return value.replace(tzinfo=tz.gettz(EVENT_TIME_ZONE)).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class _CalendarIndex:
+    """Дерево интервалов событий календаря, загруженных за окно [time_min, time_max) в UTC."""
+
+    def __init__(self, events: List[Dict], time_min: datetime, time_max: datetime):
+        self.tree = IntervalTree()
+        self.time_min = time_min
+        self.time_max = time_max
+        self.built_at = time.monotonic()
+        for event in events:
+            self.add(event)
+
+    def covers(self, time_min: datetime, time_max: datetime) -> bool:
+        return self.time_min <= time_min and time_max <= self.time_max
+
+    def add(self, event: Dict):
+        self.tree.insert(event['id'], event_time_utc(event['start']), event_time_utc(event['end']), event)
+
+
 class GoogleCalendarAPI:
-    def __init__(self):
+    def __init__(
+        self,
+        max_concurrency: int = CALENDAR_MAX_CONCURRENCY,
+        credential_manager: Optional[CredentialManager] = None,
+        base_url: Optional[str] = GOOGLE_CALENDAR_BASE_URL,
+        cache_ttl: float = CACHE_TTL,
+        field_projection: bool = True,
+        calendar_ids: Optional[List[str]] = None,
+    ):
         self.credentials: Optional[Union[Credentials, ExternalCredentials]] = None
         self.service = None
-        self._cache = {}
-        
+        self._service_credentials = None
+        self._credential_manager = credential_manager or CredentialManager()
+        # Адрес альтернативного сервера API (например, локального benchmarks.fake_calendar_server)
+        self.base_url = base_url.rstrip('/') if base_url else None
+        # Календари, события которых возвращает get_events по умолчанию
+        self.calendar_ids: List[str] = list(calendar_ids or CALENDAR_IDS)
+        # У каждого календаря свой кэш: изменение одного не сбрасывает остальные
+        self._cache_ttl = cache_ttl
+        self._caches: Dict[str, TTLCache] = {}
+        # Индексы событий календарей для проверки пересечений без обращения к Google
+        self._indexes: Dict[str, _CalendarIndex] = {}
+        # Запрашивать только нужные поля (fields=); отключается для сравнения в бенчмарке
+        self.field_projection = field_projection
+        self._payload_stats = PayloadStats()
+        # Клиент googleapiclient синхронный, поэтому все обращения к Google
+        # выполняются в ограниченном пуле потоков, а не в цикле событий aiogram
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="gcal")
+        # Ограничивает число календарей, загружаемых одновременно одним get_events
+        self._fanout = asyncio.Semaphore(max_concurrency)
+        self._service_lock = threading.Lock()
+        self._local = threading.local()
+        # Календари, локальная копия которых синхронизирована и может обслуживать чтение
+        self._mirrored_calendars: set[str] = set()
+        self._sync_task: Optional[asyncio.Task] = None
+        # Синхронизации одного календаря идут по очереди: иначе две из них прочтут один
+        # syncToken, и более старая дельта может быть записана после новой
+        self._sync_locks: Dict[str, asyncio.Lock] = {}
+
     def get_credentials(self) -> Optional[Union[Credentials, ExternalCredentials]]:
-        """Получение или обновление учетных данных."""
-        if os.path.exists('token.pickle'):
-            with open('token.pickle', 'rb') as token:
-                self.credentials = pickle.load(token)
-                
-        if not self.credentials or not self.credentials.valid:
-            if self.credentials and self.credentials.expired and self.credentials.refresh_token:
-                self.credentials.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_config(
-                    {
-                        "installed": {
-                            "client_id": GOOGLE_CLIENT_ID,
-                            "client_secret": GOOGLE_CLIENT_SECRET,
-                            "redirect_uris": [GOOGLE_REDIRECT_URI],
-                            "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                            "token_uri": "https://oauth2.googleapis.com/token"
-                        }
-                    },
-                    SCOPES
-                )
-                self.credentials = flow.run_local_server(port=8080)
-                
-            with open('token.pickle', 'wb') as token:
-                pickle.dump(self.credentials, token)
-                
+        """Получение учетных данных из памяти менеджера."""
+        self.credentials = self._credential_manager.get_credentials()
         return self.credentials
-        
+
     def get_service(self):
         """Получение сервиса Google Calendar."""
-        if not self.service:
+        with self._service_lock:
             credentials = self.get_credentials()
-            if credentials:
-                self.service = build('calendar', 'v3', credentials=credentials)
+            # Обновление токена меняет учетные данные на месте, поэтому сервис
+            # пересобирается, только если объект учетных данных был заменен
+            if credentials and (not self.service or self._service_credentials is not credentials):
+                client_options = {'api_endpoint': f"{self.base_url}/calendar/v3/"} if self.base_url else None
+                self.service = build(
+                    'calendar', 'v3',
+                    credentials=credentials,
+                    client_options=client_options,
+                    model=MeteredJsonModel(self._payload_stats),
+                )
+                self._service_credentials = credentials
         return self.service
-        
-    async def get_events(self, days: int = 7) -> List[Dict]:
-        """Получение событий календаря на указанное количество дней."""
-        cache_key = f"events_{days}"
-        if cache_key in self._cache:
-            logger.info(f"Returning events from cache for key: {cache_key}")
-            return self._cache[cache_key]
 
-        logger.info(f"Fetching events from Google Calendar API for key: {cache_key}")
+    def _get_http(self) -> AuthorizedHttp:
+        """Возвращает HTTP-клиент текущего потока пула (httplib2 не потокобезопасен)."""
+        http = getattr(self._local, "http", None)
+        if http is None or http.credentials is not self.credentials:
+            # Соединение живет вместе с потоком и переиспользуется (keep-alive)
+            http = AuthorizedHttp(self.credentials, http=MeteredHttp(self._payload_stats, timeout=CALENDAR_HTTP_TIMEOUT))
+            self._local.http = http
+        return http
+
+    def _fields(self, fields: str) -> Optional[str]:
+        """Значение параметра fields для вызова или None, если проекция отключена."""
+        return fields if self.field_projection and fields else None
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Выполняет блокирующую функцию в пуле потоков календаря."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def _get_service_async(self):
+        """Неблокирующее получение сервиса Google Calendar."""
+        if self.service and self._service_credentials is self._credential_manager.credentials and self.credentials.valid:
+            return self.service
+        return await self._run(self.get_service)
+
+    async def _execute(self, request) -> Any:
+        """Выполняет подготовленный запрос googleapiclient в пуле потоков."""
+        return await self._run(lambda: request.execute(http=self._get_http()))
+
+    async def _execute_batch(self, service, requests: List[Any]) -> List[tuple[Any, Optional[Exception]]]:
+        """Выполняет запросы через batch-эндпоинт пачками и возвращает (ответ, ошибка) для каждого."""
+        results: List[tuple[Any, Optional[Exception]]] = [(None, None)] * len(requests)
+        for offset in range(0, len(requests), CALENDAR_BATCH_SIZE):
+            chunk = range(offset, min(offset + CALENDAR_BATCH_SIZE, len(requests)))
+
+            def callback(request_id, response, exception):
+                results[int(request_id)] = (response, exception)
+
+            if self.base_url:
+                # new_batch_http_request всегда использует адрес batch-эндпоинта Google
+                batch = BatchHttpRequest(callback=callback, batch_uri=f"{self.base_url}/batch/calendar/v3")
+            else:
+                batch = service.new_batch_http_request(callback=callback)
+            for index in chunk:
+                batch.add(requests[index], request_id=str(index))
+            try:
+                await self._execute(batch)
+            except Exception as e:
+                logger.error(f"Batch request for items {chunk.start}-{chunk.stop - 1} failed: {e}")
+                for index in chunk:
+                    results[index] = (None, e)
+        return results
+
+    async def start(self, sync_interval: float = CALENDAR_SYNC_INTERVAL):
+        """Загружает учетные данные, запускает их фоновое обновление и синхронизацию календаря
+        каждые sync_interval секунд (0 - без периодической синхронизации)."""
+        await self._credential_manager.start()
+        self.start_sync(sync_interval)
+
+    def close(self):
+        """Останавливает фоновые задачи и пул потоков клиента."""
+        self._credential_manager.stop()
+        if self._sync_task:
+            self._sync_task.cancel()
+            self._sync_task = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _with_event_repo(self, func: Callable[[EventRepository], Awaitable[Any]]) -> Any:
+        """Выполняет операцию с локальной копией событий в отдельной сессии БД."""
+        async with SessionLocal() as db:
+            return await func(EventRepository(db))
+
+    async def _iter_pages(self, make_request: Callable[[Optional[str]], Any]) -> AsyncIterator[Dict]:
+        """Перебирает страницы результата list-запроса, следуя nextPageToken."""
+        page_token = None
+        while True:
+            page = await self._execute(make_request(page_token))
+            yield page
+            page_token = page.get('nextPageToken')
+            if not page_token:
+                return
+
+    async def _list_changes(self, service, calendar_id: str, sync_token: Optional[str]) -> tuple[List[Dict], Optional[str]]:
+        """Загружает все страницы изменений и возвращает их вместе с nextSyncToken."""
+        items: List[Dict] = []
+        next_sync_token = None
+        # Серии загружаются один раз целиком (singleEvents=False) и разворачиваются локально
+        async for page in self._iter_pages(lambda page_token: service.events().list(
+            calendarId=calendar_id,
+            singleEvents=False,
+            syncToken=sync_token,
+            pageToken=page_token,
+            maxResults=CALENDAR_PAGE_SIZE,
+            fields=self._fields(CALENDAR_SYNC_FIELDS),
+        )):
+            items.extend(page.get('items', []))
+            next_sync_token = page.get('nextSyncToken')
+        return items, next_sync_token
+
+    async def sync_events(self, calendar_id: str = DEFAULT_CALENDAR_ID) -> int:
+        """Инкрементальная синхронизация локальной копии календаря по syncToken."""
+        lock = self._sync_locks.setdefault(calendar_id, asyncio.Lock())
+        async with lock:
+            return await self._sync_events(calendar_id)
+
+    async def _sync_events(self, calendar_id: str) -> int:
+        service = await self._get_service_async()
+        if not service:
+            return 0
+
+        sync_token = await self._with_event_repo(lambda repo: repo.get_sync_token(calendar_id))
+        full_resync = sync_token is None
         try:
-            service = self.get_service()
-            if not service:
-                return []
-                
-            now = datetime.utcnow()
-            time_min = now.isoformat() + 'Z'
-            time_max = (now + timedelta(days=days)).isoformat() + 'Z'
-            
-            events_result = service.events().list(
-                calendarId='primary',
-                timeMin=time_min,
-                timeMax=time_max,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-            
-            events = events_result.get('items', [])
-            self._cache[cache_key] = events
-            return events
-            
+            items, next_sync_token = await self._list_changes(service, calendar_id, sync_token)
+        except HttpError as e:
+            if e.resp.status != 410:
+                raise
+            # Токен устарел (410 Gone): Google требует полной пересинхронизации
+            logger.warning(f"Sync token for calendar '{calendar_id}' expired, running full resync.")
+            full_resync = True
+            items, next_sync_token = await self._list_changes(service, calendar_id, None)
+
+        await self._with_event_repo(lambda repo: repo.apply_changes(calendar_id, items, next_sync_token, full_resync))
+        if full_resync:
+            self._indexes.pop(calendar_id, None)
+        else:
+            self._index_changes(calendar_id, items)
+        self._mirrored_calendars.add(calendar_id)
+        if items or full_resync:
+            self.invalidate_cache(calendar_id)
+        logger.info(f"Synced calendar '{calendar_id}': {len(items)} changes (full resync: {full_resync}).")
+        return len(items)
+
+    async def _sync_loop(self, interval: float):
+        while True:
+            results = await asyncio.gather(
+                *(self.sync_events(calendar_id) for calendar_id in self.calendar_ids),
+                return_exceptions=True,
+            )
+            for calendar_id, result in zip(self.calendar_ids, results):
+                if isinstance(result, asyncio.CancelledError):
+                    raise result
+                if isinstance(result, Exception):
+                    logger.error(f"Error syncing calendar '{calendar_id}': {result}")
+            await asyncio.sleep(interval)
+
+    def start_sync(self, interval: float = CALENDAR_SYNC_INTERVAL):
+        """Запускает периодическую фоновую синхронизацию локальной копии календаря."""
+        if interval <= 0 or self._sync_task:
+            return
+        self._sync_task = asyncio.create_task(self._sync_loop(interval))
+
+    def _calendar_cache(self, calendar_id: str) -> TTLCache:
+        cache = self._caches.get(calendar_id)
+        if cache is None:
+            cache = self._caches[calendar_id] = TTLCache(ttl=self._cache_ttl, max_size=CACHE_MAX_SIZE)
+        return cache
+
+    async def get_events(self, days: int = 7, calendar_ids: Optional[List[str]] = None) -> List[Dict]:
+        """Получение событий календарей на указанное количество дней.
+
+        Календари загружаются параллельно, а их события сливаются в один
+        упорядоченный по началу список. Каждое событие помечено ключом
+        calendarId. Календарь, который не удалось загрузить, пропускается.
+        """
+        calendar_ids = list(calendar_ids or self.calendar_ids)
+        per_calendar = await asyncio.gather(*(self._get_calendar_events(calendar_id, days) for calendar_id in calendar_ids))
+        # Списки календарей уже отсортированы, поэтому достаточно слияния через кучу
+        return list(heapq.merge(*per_calendar, key=lambda event: event_time_utc(event['start'])))
+
+    async def _get_calendar_events(self, calendar_id: str, days: int) -> List[Dict]:
+        cache_key = f"events_{days}"
+        try:
+            # Одновременные промахи по одному ключу дают один запрос к Google
+            return await self._calendar_cache(calendar_id).get_or_load(
+                cache_key, lambda: self._fetch_events(calendar_id, days)
+            )
         except Exception as e:
-            logger.error(f"Error getting events: {e}")
+            logger.error(f"Error getting events for calendar '{calendar_id}': {e}")
             return []
-            
-    async def create_event(self, summary: str, start_time: datetime, end_time: datetime, description: str = "") -> Optional[Dict]:
-        """Создание нового события в календаре."""
+
+    async def _fetch_events(self, calendar_id: str, days: int) -> List[Dict]:
+        """Загрузка событий календаря на ближайшие дни в обход кэша."""
+        now = datetime.utcnow()
+        return await self._load_window(calendar_id, now, now + timedelta(days=days))
+
+    async def _load_window(self, calendar_id: str, time_min: datetime, time_max: datetime) -> List[Dict]:
+        """Загрузка событий календаря за интервал (UTC) из локальной копии или из Google; обновляет индекс."""
+        async with self._fanout:
+            if calendar_id in self._mirrored_calendars:
+                # Локальная копия актуальна: отвечаем индексированным запросом без обращения к Google
+                events = await self._with_event_repo(lambda repo: repo.get_events_between(
+                    calendar_id, time_min, time_max
+                ))
+            else:
+                logger.info(f"Fetching events from Google Calendar API for calendar '{calendar_id}': {time_min} - {time_max}")
+                events = [event async for event in self.iter_events(time_min, time_max, calendar_id=calendar_id)]
+        for event in events:
+            event['calendarId'] = calendar_id
+        self._update_index(calendar_id, events, time_min, time_max)
+        return events
+
+    def _index_is_fresh(self, calendar_id: str, index: _CalendarIndex) -> bool:
+        # Индекс синхронизируемого календаря обновляется вместе с локальной копией,
+        # остальные устаревают так же, как кэш событий
+        return calendar_id in self._mirrored_calendars or time.monotonic() - index.built_at < self._cache_ttl
+
+    def _update_index(self, calendar_id: str, events: List[Dict], time_min: datetime, time_max: datetime) -> _CalendarIndex:
+        index = self._indexes.get(calendar_id)
+        # Свежий индекс с более широким окном не заменяется загрузкой узкого окна
+        if index is None or not index.covers(time_min, time_max) or not self._index_is_fresh(calendar_id, index):
+            index = self._indexes[calendar_id] = _CalendarIndex(events, time_min, time_max)
+        return index
+
+    def _index_changes(self, calendar_id: str, items: List[Dict]):
+        """Отражает изменения событий в индексе календаря без его перестроения."""
+        index = self._indexes.get(calendar_id)
+        if index is None:
+            return
+        for item in items:
+            if item.get('recurrence') or item.get('recurringEventId'):
+                # Изменение серии затрагивает много экземпляров: индекс строится заново при следующей проверке
+                self._indexes.pop(calendar_id, None)
+                return
+            if item.get('status') != 'cancelled':
+                index.add({**item, 'calendarId': calendar_id})
+            elif not index.tree.remove(item['id']):
+                # Удалено событие не из индекса - возможно, серия, экземпляры которой хранятся под другими ID
+                self._indexes.pop(calendar_id, None)
+                return
+
+    async def find_conflicts(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        calendar_ids: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        """События календарей, пересекающиеся с интервалом, упорядоченные по началу.
+
+        Время задается так же, как в create_event (naive, в EVENT_TIME_ZONE).
+        Ответ строится по индексу событий, загруженных для недельного
+        просмотра или из локальной копии; Google запрашивается, только если
+        индекса нет, он устарел или не покрывает интервал.
+        """
+        time_min, time_max = _local_to_utc(start_time), _local_to_utc(end_time)
+        calendar_ids = list(calendar_ids or self.calendar_ids)
+        per_calendar = await asyncio.gather(
+            *(self._calendar_conflicts(calendar_id, time_min, time_max) for calendar_id in calendar_ids)
+        )
+        return list(heapq.merge(*per_calendar, key=lambda event: event_time_utc(event['start'])))
+
+    async def _calendar_conflicts(self, calendar_id: str, time_min: datetime, time_max: datetime) -> List[Dict]:
+        index = self._indexes.get(calendar_id)
+        if index is None or not index.covers(time_min, time_max) or not self._index_is_fresh(calendar_id, index):
+            now = datetime.utcnow()
+            try:
+                await self._load_window(
+                    calendar_id, min(now, time_min), max(time_max, now + timedelta(days=CONFLICT_INDEX_DAYS))
+                )
+            except Exception as e:
+                logger.error(f"Error loading events of calendar '{calendar_id}' for conflict check: {e}")
+                return []
+            index = self._indexes[calendar_id]
+        return index.tree.overlap(time_min, time_max)
+
+    async def iter_events(
+        self,
+        time_min: datetime,
+        time_max: datetime,
+        page_size: int = CALENDAR_PAGE_SIZE,
+        calendar_id: str = DEFAULT_CALENDAR_ID,
+    ) -> AsyncIterator[Dict]:
+        """Потоково выдает события интервала (время в UTC) по мере загрузки страниц, в обход кэша."""
+        service = await self._get_service_async()
+        if not service:
+            return
+
+        async for page in self._iter_pages(lambda page_token: service.events().list(
+            calendarId=calendar_id,
+            timeMin=time_min.isoformat() + 'Z',
+            timeMax=time_max.isoformat() + 'Z',
+            singleEvents=True,
+            orderBy='startTime',
+            maxResults=page_size,
+            pageToken=page_token,
+            fields=self._fields(CALENDAR_LIST_FIELDS),
+        )):
+            for event in page.get('items', []):
+                yield event
+
+    async def _apply_local_changes(self, calendar_id: str, items: List[Dict]):
+        """Сразу отражает собственные изменения в индексе и локальной копии, не дожидаясь синхронизации."""
+        self._index_changes(calendar_id, items)
+        if calendar_id not in self._mirrored_calendars:
+            return
         try:
-            service = self.get_service()
+            await self._with_event_repo(lambda repo: repo.apply_changes(calendar_id, items))
+        except Exception as e:
+            logger.error(f"Error updating local event mirror: {e}")
+
+    def invalidate_cache(self, calendar_id: Optional[str] = None):
+        """Сбрасывает кэш событий календаря или, без calendar_id, всех календарей."""
+        if calendar_id is None:
+            for cache in self._caches.values():
+                cache.clear()
+        elif calendar_id in self._caches:
+            self._caches[calendar_id].clear()
+
+    async def watch_events(self, address: str, token: str, ttl: int, calendar_id: str = DEFAULT_CALENDAR_ID) -> Dict:
+        """Создает канал push-уведомлений об изменениях событий календаря."""
+        service = await self._get_service_async()
+        if not service:
+            raise RuntimeError("Google Calendar service not available.")
+        body = {
+            'id': uuid.uuid4().hex,
+            'type': 'web_hook',
+            'address': address,
+            'token': token,
+            'params': {'ttl': str(ttl)},
+        }
+        return await self._execute(service.events().watch(calendarId=calendar_id, body=body))
+
+    async def stop_channel(self, channel_id: str, resource_id: str):
+        """Останавливает канал push-уведомлений."""
+        service = await self._get_service_async()
+        if not service:
+            raise RuntimeError("Google Calendar service not available.")
+        await self._execute(service.channels().stop(body={'id': channel_id, 'resourceId': resource_id}))
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Суммарная статистика кэшей событий всех календарей."""
+        total: Dict[str, int] = {}
+        for cache in self._caches.values():
+            for key, value in cache.stats().items():
+                total[key] = total.get(key, 0) + value
+        return total
+
+    def payload_stats(self) -> Dict[str, float]:
+        """Объем полученных ответов (по сети и после распаковки) и время разбора JSON."""
+        return self._payload_stats.snapshot()
+
+    def reset_payload_stats(self):
+        self._payload_stats.reset()
+
+    @staticmethod
+    def _event_body(summary: str, start_time: datetime, end_time: datetime, description: str = "") -> Dict:
+        """Тело запроса на создание события."""
+        return {
+            'summary': summary,
+            'description': description,
+            'start': {
+                'dateTime': start_time.isoformat(),
+                'timeZone': EVENT_TIME_ZONE,
+            },
+            'end': {
+                'dateTime': end_time.isoformat(),
+                'timeZone': EVENT_TIME_ZONE,
+            },
+        }
+
+    async def create_event(
+        self,
+        summary: str,
+        start_time: datetime,
+        end_time: datetime,
+        description: str = "",
+        calendar_id: Optional[str] = None,
+    ) -> Optional[Dict]:
+        """Создание нового события в календаре (по умолчанию - в первом из calendar_ids)."""
+        calendar_id = calendar_id or self.calendar_ids[0]
+        try:
+            service = await self._get_service_async()
             if not service:
                 logger.error("Google Calendar service not available.")
                 return None
-                
-            event = {
-                'summary': summary,
-                'description': description,
-                'start': {
-                    'dateTime': start_time.isoformat(),
-                    'timeZone': 'Europe/Moscow',
-                },
-                'end': {
-                    'dateTime': end_time.isoformat(),
-                    'timeZone': 'Europe/Moscow',
-                },
-            }
-            
-            logger.info(f"Creating event with body: {event}")
-            event = service.events().insert(calendarId='primary', body=event).execute()
-            logger.info(f"Event created successfully: {event}")
-            # Очищаем кэш после успешного создания события
-            self._cache = {}
+
+            event = self._event_body(summary, start_time, end_time, description)
+
+            logger.debug(f"Creating event with body: {event}")
+            event = await self._execute(service.events().insert(
+                calendarId=calendar_id, body=event, fields=self._fields(CALENDAR_INSERT_FIELDS)
+            ))
+            logger.info(f"Event {event.get('id')} created successfully in calendar '{calendar_id}'.")
+            await self._apply_local_changes(calendar_id, [event])
+            # Очищаем кэш календаря после успешного создания события
+            self.invalidate_cache(calendar_id)
             return event
-            
+
         except Exception as e:
             logger.error(f"Error creating event: {e}")
             return None
-            
-    async def delete_event(self, event_id: str) -> bool:
+
+    async def create_events(self, events: List[Dict], calendar_id: Optional[str] = None) -> List[Optional[Dict]]:
+        """Массовое создание событий через batch-запросы.
+
+        Каждый элемент events содержит ключи summary, start_time, end_time и
+        необязательный description. Возвращает созданные события в том же
+        порядке, None на месте тех, что создать не удалось.
+        """
+        calendar_id = calendar_id or self.calendar_ids[0]
+        if not events:
+            return []
+        try:
+            service = await self._get_service_async()
+            if not service:
+                logger.error("Google Calendar service not available.")
+                return [None] * len(events)
+
+            requests = [
+                service.events().insert(
+                    calendarId=calendar_id,
+                    body=self._event_body(**event),
+                    fields=self._fields(CALENDAR_INSERT_FIELDS),
+                )
+                for event in events
+            ]
+            logger.info(f"Creating {len(requests)} events via batch requests.")
+            results = await self._execute_batch(service, requests)
+        except Exception as e:
+            logger.error(f"Error creating events: {e}")
+            return [None] * len(events)
+
+        created: List[Optional[Dict]] = []
+        for event, (response, exception) in zip(events, results):
+            if exception is not None:
+                logger.error(f"Error creating event '{event.get('summary')}': {exception}")
+            created.append(response if exception is None else None)
+
+        successful = [event for event in created if event]
+        logger.info(f"Batch create finished: {len(successful)} of {len(events)} events created.")
+        if successful:
+            await self._apply_local_changes(calendar_id, successful)
+            # Один сброс кэша на весь пакет
+            self.invalidate_cache(calendar_id)
+        return created
+
+    async def delete_event(self, event_id: str, calendar_id: Optional[str] = None) -> bool:
         """Удаление события из календаря."""
+        calendar_id = calendar_id or self.calendar_ids[0]
         try:
-            service = self.get_service()
+            service = await self._get_service_async()
             if not service:
                 logger.error("Google Calendar service not available for deletion.")
                 return False
-                
+
             logger.info(f"Attempting to delete event with ID: {event_id}")
-            service.events().delete(calendarId='primary', eventId=event_id).execute()
+            await self._execute(service.events().delete(calendarId=calendar_id, eventId=event_id))
             logger.info(f"Event with ID {event_id} deleted successfully.")
-            # Очищаем кэш после успешного удаления события
-            self._cache = {}
+            await self._apply_local_changes(calendar_id, [{'id': event_id, 'status': 'cancelled'}])
+            # Очищаем кэш календаря после успешного удаления события
+            self.invalidate_cache(calendar_id)
             return True
-            
+
         except Exception as e:
             logger.error(f"Error deleting event with ID {event_id}: {e}")
-            return False 
\ No newline at end of file
+            return False
+
+    async def delete_events(self, event_ids: List[str], calendar_id: Optional[str] = None) -> Dict[str, bool]:
+        """Массовое удаление событий через batch-запросы. Возвращает результат для каждого ID."""
+        calendar_id = calendar_id or self.calendar_ids[0]
+        if not event_ids:
+            return {}
+        try:
+            service = await self._get_service_async()
+            if not service:
+                logger.error("Google Calendar service not available for deletion.")
+                return {event_id: False for event_id in event_ids}
+
+            requests = [
+                service.events().delete(calendarId=calendar_id, eventId=event_id)
+                for event_id in event_ids
+            ]
+            logger.info(f"Deleting {len(requests)} events via batch requests.")
+            results = await self._execute_batch(service, requests)
+        except Exception as e:
+            logger.error(f"Error deleting events: {e}")
+            return {event_id: False for event_id in event_ids}
+
+        deleted: Dict[str, bool] = {}
+        for event_id, (_, exception) in zip(event_ids, results):
+            if exception is not None:
+                logger.error(f"Error deleting event with ID {event_id}: {exception}")
+            deleted[event_id] = exception is None
+
+        successful = [event_id for event_id, ok in deleted.items() if ok]
+        logger.info(f"Batch delete finished: {len(successful)} of {len(event_ids)} events deleted.")
+        if successful:
+            await self._apply_local_changes(calendar_id, [{'id': event_id, 'status': 'cancelled'} for event_id in successful])
+            # Один сброс кэша на весь пакет
+            self.invalidate_cache(calendar_id)
+        return deleted
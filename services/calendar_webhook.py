@@ -0,0 +1,171 @@
+from typing import Dict, List, Optional, Set
+import asyncio
+import secrets
+import time
+from aiohttp import web
+from config.settings import (
+    CALENDAR_WEBHOOK_URL, CALENDAR_WEBHOOK_HOST, CALENDAR_WEBHOOK_PORT, CALENDAR_WEBHOOK_PATH,
+    CALENDAR_WATCH_TTL, CALENDAR_WATCH_RENEW_MARGIN,
+)
+from services.calendar_api import GoogleCalendarAPI
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Пауза перед повторной попыткой создать канал после ошибки
+WATCH_RETRY_DELAY = 60  # в секундах
+
+
+class CalendarWatcher:
+    """Принимает push-уведомления Google Calendar (events.watch) и обновляет данные по ним.
+
+    Поднимает небольшой HTTP-сервер для приема уведомлений, регистрирует
+    каналы для календарей и продлевает их до истечения срока действия.
+    """
+
+    def __init__(
+        self,
+        api: GoogleCalendarAPI,
+        address: str = CALENDAR_WEBHOOK_URL,
+        calendar_ids: Optional[List[str]] = None,
+        host: str = CALENDAR_WEBHOOK_HOST,
+        port: int = CALENDAR_WEBHOOK_PORT,
+        path: str = CALENDAR_WEBHOOK_PATH,
+        ttl: int = CALENDAR_WATCH_TTL,
+        renew_margin: int = CALENDAR_WATCH_RENEW_MARGIN,
+    ):
+        self.api = api
+        self.address = address
+        self.calendar_ids = calendar_ids or api.calendar_ids
+        self.host = host
+        self.port = port
+        self.path = path
+        self.ttl = ttl
+        self.renew_margin = renew_margin
+        # Секрет канала: Google возвращает его в X-Goog-Channel-Token каждого уведомления
+        self.token = secrets.token_urlsafe(24)
+        # channel_id -> ресурс канала (id, resourceId, expiration) и календарь
+        self.channels: Dict[str, Dict] = {}
+        self.notifications_received = 0
+        self._runner: Optional[web.AppRunner] = None
+        self._renew_tasks: Dict[str, asyncio.Task] = {}
+        self._refresh_tasks: Dict[str, asyncio.Task] = {}
+        self._dirty: Set[str] = set()
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle_notification)
+        return app
+
+    async def handle_notification(self, request: web.Request) -> web.Response:
+        """Обработчик уведомления: отвечает сразу, обновление данных идет в фоне."""
+        channel_id = request.headers.get("X-Goog-Channel-ID")
+        channel = self.channels.get(channel_id or "")
+        if channel is None or request.headers.get("X-Goog-Channel-Token") != self.token:
+            logger.warning(f"Ignored calendar notification for unknown channel: {channel_id}")
+            # На ответ с ошибкой Google повторяет уведомление, поэтому чужие и старые только игнорируем
+            return web.Response(status=200)
+
+        self.notifications_received += 1
+        state = request.headers.get("X-Goog-Resource-State")
+        logger.debug(f"Calendar notification #{request.headers.get('X-Goog-Message-Number')} ({state}) for '{channel['calendar_id']}'")
+        # 'sync' приходит сразу после создания канала и изменений не означает
+        if state != "sync":
+            self._schedule_refresh(channel["calendar_id"])
+        return web.Response(status=200)
+
+    def _schedule_refresh(self, calendar_id: str):
+        """Объединяет серию уведомлений: пока идет обновление, повторное лишь помечается."""
+        if calendar_id in self._refresh_tasks:
+            self._dirty.add(calendar_id)
+            return
+        self._refresh_tasks[calendar_id] = asyncio.create_task(self._refresh(calendar_id))
+
+    async def _refresh(self, calendar_id: str):
+        try:
+            while True:
+                self._dirty.discard(calendar_id)
+                try:
+                    # Инкрементальная синхронизация загружает только изменения и сама сбрасывает кэш
+                    await self.api.sync_events(calendar_id)
+                except Exception as e:
+                    logger.error(f"Error refreshing calendar '{calendar_id}' after notification: {e}")
+                    self.api.invalidate_cache(calendar_id)
+                if calendar_id not in self._dirty:
+                    return
+        finally:
+            self._refresh_tasks.pop(calendar_id, None)
+
+    async def _watch(self, calendar_id: str) -> Dict:
+        channel = await self.api.watch_events(self.address, self.token, self.ttl, calendar_id)
+        channel["calendar_id"] = calendar_id
+        self.channels[channel["id"]] = channel
+        logger.info(f"Watching calendar '{calendar_id}' via channel {channel['id']} until {channel.get('expiration')}")
+        return channel
+
+    async def _stop_channel(self, channel: Dict):
+        self.channels.pop(channel["id"], None)
+        try:
+            await self.api.stop_channel(channel["id"], channel["resourceId"])
+        except Exception as e:
+            logger.warning(f"Error stopping calendar channel {channel['id']}: {e}")
+
+    async def _renew_loop(self, calendar_id: str, channel: Optional[Dict] = None):
+        while True:
+            if channel is None:
+                try:
+                    channel = await self._watch(calendar_id)
+                except Exception as e:
+                    logger.error(f"Error creating watch channel for calendar '{calendar_id}': {e}")
+                    await asyncio.sleep(WATCH_RETRY_DELAY)
+                    continue
+
+            # expiration приходит в миллисекундах от начала эпохи
+            expiration = int(channel.get("expiration", 0)) / 1000 or time.time() + self.ttl
+            await asyncio.sleep(max(expiration - self.renew_margin - time.time(), 0))
+            try:
+                # Новый канал создается до остановки старого, чтобы не пропустить изменения
+                new_channel = await self._watch(calendar_id)
+            except Exception as e:
+                logger.error(f"Error renewing watch channel for calendar '{calendar_id}': {e}")
+                if expiration <= time.time():
+                    self.channels.pop(channel["id"], None)
+                    channel = None
+                await asyncio.sleep(WATCH_RETRY_DELAY)
+                continue
+            await self._stop_channel(channel)
+            channel = new_channel
+
+    async def start(self):
+        """Запускает прием уведомлений и регистрирует каналы для календарей."""
+        if self._runner:
+            return
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Calendar webhook listening on {self.host}:{self.port}{self.path}")
+
+        for calendar_id in self.calendar_ids:
+            channel = None
+            try:
+                channel = await self._watch(calendar_id)
+            except Exception as e:
+                logger.error(f"Error creating watch channel for calendar '{calendar_id}': {e}")
+            # Начальная синхронизация уже после создания канала, чтобы не потерять изменения
+            # между ними; дальше данные обновляются по уведомлениям
+            try:
+                await self.api.sync_events(calendar_id)
+            except Exception as e:
+                logger.error(f"Error syncing calendar '{calendar_id}': {e}")
+            self._renew_tasks[calendar_id] = asyncio.create_task(self._renew_loop(calendar_id, channel))
+
+    async def stop(self):
+        """Останавливает каналы и HTTP-сервер."""
+        for task in list(self._renew_tasks.values()) + list(self._refresh_tasks.values()):
+            task.cancel()
+        self._renew_tasks.clear()
+        for channel in list(self.channels.values()):
+            await self._stop_channel(channel)
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
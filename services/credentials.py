@@ -0,0 +1,138 @@
+from typing import Optional, Union
+from datetime import datetime, timedelta
+from google.oauth2.credentials import Credentials
+from google.auth.external_account_authorized_user import Credentials as ExternalCredentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+from google.auth.transport.requests import Request
+import asyncio
+import threading
+import tempfile
+import pickle
+import os
+from config.settings import (
+    SCOPES, GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, GOOGLE_REDIRECT_URI,
+    GOOGLE_TOKEN_PATH, CREDENTIALS_REFRESH_MARGIN,
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+AnyCredentials = Union[Credentials, ExternalCredentials]
+
+# Пауза перед повторной попыткой обновления токена после ошибки
+REFRESH_RETRY_DELAY = 30  # в секундах
+
+
+class CredentialManager:
+    """Хранит учетные данные Google в памяти и обновляет токен в фоне до его истечения."""
+
+    def __init__(
+        self,
+        token_path: str = GOOGLE_TOKEN_PATH,
+        refresh_margin: int = CREDENTIALS_REFRESH_MARGIN,
+        credentials: Optional[AnyCredentials] = None,
+    ):
+        self.token_path = token_path
+        self.refresh_margin = timedelta(seconds=refresh_margin)
+        # Готовые учетные данные (например, для локального сервера) не читаются с диска
+        self.credentials: Optional[AnyCredentials] = credentials
+        self._lock = threading.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def get_credentials(self) -> Optional[AnyCredentials]:
+        """Возвращает учетные данные из памяти, загружая их с диска только при первом обращении."""
+        with self._lock:
+            if self.credentials is None:
+                self._load()
+            elif not self.credentials.valid:
+                # Фоновое обновление не успело (например, не было запущено) - обновляем на месте
+                self._refresh()
+            return self.credentials
+
+    def _load(self):
+        if os.path.exists(self.token_path):
+            with open(self.token_path, 'rb') as token:
+                self.credentials = pickle.load(token)
+
+        if self.credentials and self.credentials.valid:
+            return
+        if self.credentials and self.credentials.expired and self.credentials.refresh_token:
+            self._refresh()
+            return
+
+        flow = InstalledAppFlow.from_client_config(
+            {
+                "installed": {
+                    "client_id": GOOGLE_CLIENT_ID,
+                    "client_secret": GOOGLE_CLIENT_SECRET,
+                    "redirect_uris": [GOOGLE_REDIRECT_URI],
+                    "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+                    "token_uri": "https://oauth2.googleapis.com/token"
+                }
+            },
+            SCOPES
+        )
+        self.credentials = flow.run_local_server(port=8080)
+        self._save()
+
+    def _refresh(self):
+        logger.info("Refreshing Google API access token.")
+        self.credentials.refresh(Request())
+        self._save()
+
+    def _save(self):
+        """Атомарно записывает токен: сначала во временный файл, затем переименование."""
+        directory = os.path.dirname(os.path.abspath(self.token_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.token-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as token:
+                pickle.dump(self.credentials, token)
+                token.flush()
+                os.fsync(token.fileno())
+            os.replace(tmp_path, self.token_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _seconds_until_refresh(self) -> Optional[float]:
+        expiry = getattr(self.credentials, 'expiry', None)
+        if expiry is None:
+            return None
+        return max((expiry - self.refresh_margin - datetime.utcnow()).total_seconds(), 0.0)
+
+    def refresh(self):
+        """Принудительно обновляет токен и сохраняет его на диск."""
+        with self._lock:
+            self._refresh()
+
+    async def _refresh_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            delay = self._seconds_until_refresh()
+            if delay is None:
+                logger.info("Google credentials have no expiry, background refresh stopped.")
+                return
+            await asyncio.sleep(delay)
+            try:
+                await loop.run_in_executor(None, self.refresh)
+            except Exception as e:
+                logger.error(f"Error refreshing Google credentials: {e}")
+                await asyncio.sleep(REFRESH_RETRY_DELAY)
+
+    async def start(self):
+        """Загружает учетные данные вне цикла событий и запускает фоновое обновление токена."""
+        if self._refresh_task:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self.get_credentials)
+        except Exception as e:
+            logger.error(f"Error loading Google credentials: {e}")
+            return
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    def stop(self):
+        """Останавливает фоновое обновление токена."""
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            self._refresh_task = None
@@ -0,0 +1,101 @@
+from typing import Dict
+import threading
+import time
+import httplib2
+from googleapiclient.model import JsonModel
+
+
+class PayloadStats:
+    """Потокобезопасные счетчики объема ответов Calendar API и стоимости их разбора."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.responses = 0
+            self.compressed_responses = 0
+            self.wire_bytes = 0  # байт получено по сети (после сжатия)
+            self.decoded_bytes = 0  # байт JSON после распаковки
+            self.parse_seconds = 0.0
+
+    def record_response(self, wire_bytes: int, decoded_bytes: int, compressed: bool):
+        with self._lock:
+            self.responses += 1
+            self.compressed_responses += int(compressed)
+            self.wire_bytes += wire_bytes
+            self.decoded_bytes += decoded_bytes
+
+    def record_parse(self, seconds: float):
+        with self._lock:
+            self.parse_seconds += seconds
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "responses": self.responses,
+                "compressed_responses": self.compressed_responses,
+                "wire_bytes": self.wire_bytes,
+                "decoded_bytes": self.decoded_bytes,
+                "parse_ms": self.parse_seconds * 1000,
+            }
+
+
+class MeteredHttp(httplib2.Http):
+    """httplib2.Http, который запрашивает gzip и считает байты ответа до распаковки."""
+
+    def __init__(self, stats: PayloadStats, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    def request(self, uri, method="GET", body=None, headers=None, *args, **kwargs):
+        headers = dict(headers or {})
+        # Google сжимает ответ, только если User-Agent тоже содержит "gzip"
+        user_agent = headers.get("user-agent", "")
+        if "gzip" not in user_agent:
+            headers["user-agent"] = f"{user_agent} (gzip)".strip()
+        headers["accept-encoding"] = "gzip"
+        return super().request(uri, method, body, headers, *args, **kwargs)
+
+    def _conn_request(self, conn, request_uri, method, body, headers):
+        # httplib2 распаковывает ответ внутри _conn_request, поэтому размер
+        # по сети снимается с чтения сырого ответа соединения
+        wire_bytes = 0
+        getresponse = conn.getresponse
+
+        def metered_getresponse():
+            raw = getresponse()
+            read = raw.read
+
+            def metered_read(*args):
+                nonlocal wire_bytes
+                data = read(*args)
+                wire_bytes += len(data)
+                return data
+
+            raw.read = metered_read
+            return raw
+
+        conn.getresponse = metered_getresponse
+        try:
+            response, content = super()._conn_request(conn, request_uri, method, body, headers)
+        finally:
+            del conn.getresponse
+        self.stats.record_response(wire_bytes, len(content), "-content-encoding" in response)
+        return response, content
+
+
+class MeteredJsonModel(JsonModel):
+    """JSON-модель googleapiclient, учитывающая время разбора ответов."""
+
+    def __init__(self, stats: PayloadStats):
+        super().__init__(data_wrapper=False)
+        self.stats = stats
+
+    def deserialize(self, content):
+        started = time.perf_counter()
+        try:
+            return super().deserialize(content)
+        finally:
+            self.stats.record_parse(time.perf_counter() - started)
@@ -6,4 +6,6 @@ class CalendarStates(StatesGroup):
     waiting_for_event_time = State()
     waiting_for_event_duration = State()
     waiting_for_event_description = State()
-    waiting_for_event_id_to_delete = State() 
\ No newline at end of file
+    waiting_for_event_id_to_delete = State()
+    waiting_for_bulk_events = State()
+    waiting_for_event_ids_to_bulk_delete = State()
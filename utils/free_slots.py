@@ -0,0 +1,82 @@
+# utils/free_slots.py
+
+from datetime import datetime, time, timedelta, timezone, tzinfo
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+from utils.recurrence import event_time_utc, parse_iso
+
+Interval = Tuple[datetime, datetime]
+
+
+def working_windows(
+    time_min: datetime,
+    time_max: datetime,
+    work_start: time,
+    work_end: time,
+    workdays: Sequence[int],
+) -> Iterator[Interval]:
+    """Рабочие интервалы дней из workdays (0 - понедельник), обрезанные по [time_min, time_max)."""
+    day = time_min.date()
+    while day <= time_max.date():
+        if day.weekday() in workdays:
+            start = max(datetime.combine(day, work_start), time_min)
+            end = min(datetime.combine(day, work_end), time_max)
+            if start < end:
+                yield start, end
+        day += timedelta(days=1)
+
+
+def find_free_slots(
+    busy: Sequence[Interval],
+    time_min: datetime,
+    time_max: datetime,
+    min_length: timedelta,
+    work_start: time,
+    work_end: time,
+    workdays: Sequence[int] = range(7),
+) -> List[Interval]:
+    """Свободные окна не короче min_length в рабочее время.
+
+    busy - занятые интервалы, отсортированные по началу (могут
+    пересекаться и вкладываться друг в друга). Занятые и рабочие
+    интервалы просматриваются одним совместным проходом, без сортировки:
+    каждый занятый интервал рассматривается один раз, а его влияние на
+    следующие окна переносится через наибольший конец просмотренных
+    интервалов. Время - O(len(busy) + число окон).
+    """
+    slots: List[Interval] = []
+    index = 0
+    # Наибольший конец уже просмотренных интервалов: до него время занято
+    covered_until = time_min
+    for window_start, window_end in working_windows(time_min, time_max, work_start, work_end, workdays):
+        cursor = max(window_start, covered_until)
+        while index < len(busy) and busy[index][0] < window_end:
+            start, end = busy[index]
+            if start - cursor >= min_length:
+                slots.append((cursor, start))
+            if end > cursor:
+                cursor = end
+            if end > covered_until:
+                covered_until = end
+            index += 1
+
+        if window_end - cursor >= min_length:
+            slots.append((cursor, window_end))
+    return slots
+
+
+def _local_time(value: Dict, zone: tzinfo) -> datetime:
+    if 'date' in value:
+        # События на весь день занимают сутки по местному времени
+        return parse_iso(value['date'])
+    parsed = parse_iso(value['dateTime'])
+    if parsed.tzinfo is None:
+        parsed = event_time_utc(value).replace(tzinfo=timezone.utc)
+    return parsed.astimezone(zone).replace(tzinfo=None)
+
+
+def busy_intervals(events: Iterable[Dict], zone: tzinfo) -> List[Interval]:
+    """Занятые интервалы событий в местном времени zone (naive), отсортированные по началу."""
+    busy = [(_local_time(event['start'], zone), _local_time(event['end'], zone)) for event in events]
+    # События приходят уже упорядоченными по началу, и сортировка лишь проверяет это за O(n)
+    busy.sort()
+    return busy
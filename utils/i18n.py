@@ -2,12 +2,13 @@
 
 from config.settings import DEFAULT_LANGUAGE, LANGUAGES
 import importlib
-from typing import Optional, Dict
+from contextvars import ContextVar, Token
+from typing import Optional, Dict, Tuple
 import logging # Импортируем модуль логирования
 
-# Импортируем зависимости для работы с базой данных и модель User
-from sqlalchemy.orm import Session
-from database.models import User
+# Импортируем зависимости для работы с базой данных и кэш пользователей
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.user_cache import user_cache
 
 logger = logging.getLogger(__name__) # Создаем логгер для этого модуля
 
@@ -25,15 +26,33 @@ for lang_code, lang_name in LANGUAGES.items(): # Перебираем по LANGU
         logger.error(f"Error loading locale for language '{lang_name}' ({lang_code}): {e}") # Лог ошибки при загрузке
 
 
-def get_text(key: str, user_id: Optional[int], db: Optional[Session] = None) -> str:
+# Язык пользователя текущего апдейта: (user_id, language_code).
+# Устанавливается UserMiddleware один раз на апдейт и виден всем хендлерам и клавиатурам
+_update_language: ContextVar[Optional[Tuple[int, str]]] = ContextVar("update_language", default=None)
+
+
+def set_user_language(user_id: int, language_code: str) -> Token:
+    """Запоминает язык пользователя для текущего апдейта. Возвращает токен для reset_user_language."""
+    return _update_language.set((user_id, language_code))
+
+
+def reset_user_language(token: Token) -> None:
+    """Восстанавливает язык, действовавший до set_user_language."""
+    _update_language.reset(token)
+
+
+def get_text(key: str, user_id: Optional[int], db: Optional[AsyncSession] = None) -> str:
     """Возвращает локализованный текст по ключу, user_id и сессии базы данных."""
     user_lang = DEFAULT_LANGUAGE # По умолчанию используем язык из настроек
 
-    if user_id is not None and db is not None:
-        # Пытаемся получить пользователя из базы данных
-        db_user = db.query(User).filter(User.id == user_id).first()
-        if db_user:
-            user_lang = db_user.language_code
+    context = _update_language.get()
+    if user_id is not None and context is not None and context[0] == user_id:
+        # Язык уже определен для этого апдейта
+        user_lang = context[1]
+    elif user_id is not None:
+        # Запасной путь для вызовов вне апдейта пользователя: язык из кэша пользователей,
+        # без запроса к базе данных (db оставлен для совместимости вызовов)
+        user_lang = user_cache.peek_language(user_id) or DEFAULT_LANGUAGE
 
     logger.debug(f"Getting text for key '{key}' for user {user_id}. Determined language: {user_lang}") # Лог определяемого языка
 
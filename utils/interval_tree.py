@@ -0,0 +1,130 @@
+# utils/interval_tree.py
+
+from datetime import datetime
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+import random
+
+
+class _Node:
+    __slots__ = ('start', 'end', 'key', 'value', 'priority', 'left', 'right', 'max_end')
+
+    def __init__(self, start: datetime, end: datetime, key: Hashable, value: Any, priority: float):
+        self.start = start
+        self.end = end
+        self.key = key
+        self.value = value
+        self.priority = priority
+        self.left: Optional['_Node'] = None
+        self.right: Optional['_Node'] = None
+        # Наибольший конец интервала в поддереве: позволяет отсекать поддеревья без пересечений
+        self.max_end = end
+
+    @property
+    def order(self) -> Tuple:
+        return (self.start, self.end, self.key)
+
+    def update(self):
+        self.max_end = self.end
+        if self.left and self.left.max_end > self.max_end:
+            self.max_end = self.left.max_end
+        if self.right and self.right.max_end > self.max_end:
+            self.max_end = self.right.max_end
+
+
+def _split(node: Optional[_Node], order: Tuple) -> Tuple[Optional[_Node], Optional[_Node]]:
+    """Делит дерево на узлы с ключом меньше order и остальные."""
+    if node is None:
+        return None, None
+    if node.order < order:
+        node.right, right = _split(node.right, order)
+        node.update()
+        return node, right
+    left, node.left = _split(node.left, order)
+    node.update()
+    return left, node
+
+
+def _merge(left: Optional[_Node], right: Optional[_Node]) -> Optional[_Node]:
+    """Объединяет деревья, в которых все ключи left меньше ключей right."""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        left.update()
+        return left
+    right.left = _merge(left, right.left)
+    right.update()
+    return right
+
+
+def _remove(node: Optional[_Node], order: Tuple) -> Optional[_Node]:
+    if node is None:
+        return None
+    if order == node.order:
+        return _merge(node.left, node.right)
+    if order < node.order:
+        node.left = _remove(node.left, order)
+    else:
+        node.right = _remove(node.right, order)
+    node.update()
+    return node
+
+
+class IntervalTree:
+    """Дерево полуоткрытых интервалов [start, end) с поиском пересечений.
+
+    Декартово дерево (treap) по началу интервала, дополненное наибольшим
+    концом в поддереве. Вставка и удаление по ключу - O(log n) в среднем,
+    поиск пересечений обходит только поддеревья, где они могут быть.
+    """
+
+    def __init__(self):
+        self._root: Optional[_Node] = None
+        # key -> (start, end): для удаления по ключу
+        self._intervals: Dict[Hashable, Tuple[datetime, datetime]] = {}
+        self._random = random.Random()
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._intervals
+
+    def insert(self, key: Hashable, start: datetime, end: datetime, value: Any = None) -> None:
+        """Добавляет интервал; интервал с тем же ключом заменяется."""
+        self.remove(key)
+        node = _Node(start, end, key, value, self._random.random())
+        left, right = _split(self._root, node.order)
+        self._root = _merge(_merge(left, node), right)
+        self._intervals[key] = (start, end)
+
+    def remove(self, key: Hashable) -> bool:
+        """Удаляет интервал по ключу. Возвращает False, если его не было."""
+        interval = self._intervals.pop(key, None)
+        if interval is None:
+            return False
+        self._root = _remove(self._root, (interval[0], interval[1], key))
+        return True
+
+    def overlap(self, start: datetime, end: datetime) -> List[Any]:
+        """Значения интервалов, пересекающихся с [start, end), упорядоченные по началу."""
+        result: List[Any] = []
+        stack: List[_Node] = []
+        node = self._root
+        # Симметричный обход без рекурсии: левые поддеревья без нужных концов
+        # и правые поддеревья, начинающиеся после end, не посещаются
+        while stack or node:
+            while node and node.max_end > start:
+                stack.append(node)
+                node = node.left
+            if not stack:
+                break
+            node = stack.pop()
+            if node.start >= end:
+                break
+            if node.end > start:
+                result.append(node.value)
+            node = node.right
+        return result
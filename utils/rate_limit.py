@@ -0,0 +1,57 @@
+# utils/rate_limit.py
+
+import asyncio
+import time
+from typing import Callable, Optional
+
+
+class TokenBucket:
+    """Ведро токенов: в среднем rate операций в секунду, всплеском не больше capacity."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        # До этого момента токены не выдаются (например, после flood control Telegram)
+        self._paused_until = 0.0
+        # Ожидающие получают токены по очереди, в порядке обращения
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Забирает токены, если они есть, без ожидания."""
+        now = self._clock()
+        if now < self._paused_until:
+            return False
+        self._refill(now)
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    async def acquire(self, tokens: float = 1) -> None:
+        """Ждет, пока токены появятся, и забирает их."""
+        async with self._lock:
+            while True:
+                now = self._clock()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Не выдает токены seconds секунд; накопленный запас сгорает."""
+        now = self._clock()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._tokens = 0
+        self._updated = self._paused_until
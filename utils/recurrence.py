@@ -0,0 +1,154 @@
+# utils/recurrence.py
+
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Tuple
+from dateutil import parser, tz
+from dateutil.rrule import rrulestr, rruleset
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Конец бесконечной серии в индексе локальной копии событий
+FAR_FUTURE = datetime(9999, 12, 31)
+
+
+def parse_iso(value: str) -> datetime:
+    """Разбор даты/времени ISO 8601 из ответов Calendar API."""
+    try:
+        # Встроенный разбор заметно быстрее dateutil, но понимает не все варианты ISO 8601
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return parser.isoparse(value)
+
+
+def event_time_utc(value: Dict) -> datetime:
+    """Переводит поле start/end события Google в naive UTC datetime."""
+    if 'dateTime' in value:
+        parsed = parse_iso(value['dateTime'])
+        if parsed.tzinfo is None and value.get('timeZone'):
+            # Время без смещения задано в часовом поясе timeZone
+            parsed = parsed.replace(tzinfo=tz.gettz(value['timeZone']))
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+    # События на весь день задаются только датой
+    return parse_iso(value['date'])
+
+
+def _local_time(value: Dict) -> datetime:
+    """Время в часовом поясе события (для корректных переходов на летнее время) или дата для событий на весь день."""
+    if 'date' in value:
+        return parser.isoparse(value['date'])
+    parsed = parser.isoparse(value['dateTime'])
+    zone = tz.gettz(value['timeZone']) if value.get('timeZone') else None
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=zone or timezone.utc)
+    return parsed.astimezone(zone) if zone else parsed
+
+
+def _build_ruleset(master: Dict) -> rruleset:
+    return rrulestr("\n".join(master['recurrence']), dtstart=_local_time(master['start']), forceset=True)
+
+
+def _format_time(value: datetime, template: Dict) -> Dict:
+    """Поле start/end экземпляра в том же виде, что у основного события."""
+    if 'date' in template:
+        return {'date': value.date().isoformat()}
+    result = {'dateTime': value.isoformat()}
+    if template.get('timeZone'):
+        result['timeZone'] = template['timeZone']
+    return result
+
+
+def _instance_id(master_id: str, original_start: datetime, all_day: bool) -> str:
+    """ID экземпляра в формате Google: <id серии>_<начало в UTC>."""
+    if all_day:
+        return f"{master_id}_{original_start.strftime('%Y%m%d')}"
+    return f"{master_id}_{original_start.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}"
+
+
+def _is_infinite(master: Dict) -> bool:
+    rules = [line for line in master['recurrence'] if line.upper().startswith('RRULE')]
+    return any('COUNT=' not in rule.upper() and 'UNTIL=' not in rule.upper() for rule in rules)
+
+
+def event_span(item: Dict) -> Tuple[datetime, datetime]:
+    """Интервал (naive UTC), который занимает событие; для серии - от первого до последнего экземпляра."""
+    start = event_time_utc(item['start'])
+    end = event_time_utc(item['end'])
+    if not item.get('recurrence'):
+        return start, end
+    if _is_infinite(item):
+        return start, FAR_FUTURE
+    occurrences = list(_build_ruleset(item))
+    if not occurrences:
+        return start, end
+    last_start = occurrences[-1]
+    if last_start.tzinfo is not None:
+        last_start = last_start.astimezone(timezone.utc).replace(tzinfo=None)
+    return start, max(end, last_start + (end - start))
+
+
+def _instances(master: Dict, time_min: datetime, time_max: datetime) -> Iterator[Dict]:
+    start = _local_time(master['start'])
+    duration = _local_time(master['end']) - start
+    all_day = 'date' in master['start']
+    # Экземпляр пересекается с интервалом, если начинается в (time_min - duration, time_max)
+    after, before = time_min - duration, time_max
+    if not all_day:
+        after, before = after.replace(tzinfo=timezone.utc), before.replace(tzinfo=timezone.utc)
+
+    template = {key: value for key, value in master.items() if key not in ('recurrence', 'id')}
+    for occurrence in _build_ruleset(master).between(after, before):
+        original_start = _format_time(occurrence, master['start'])
+        yield {
+            **template,
+            'id': _instance_id(master['id'], occurrence, all_day),
+            'recurringEventId': master['id'],
+            'originalStartTime': original_start,
+            'start': original_start,
+            'end': _format_time(occurrence + duration, master['end']),
+        }
+
+
+def expand_events(items: Iterable[Dict], time_min: datetime, time_max: datetime) -> List[Dict]:
+    """Разворачивает повторяющиеся события в экземпляры интервала, как это делает singleEvents=True.
+
+    items - ресурсы событий в том виде, в каком их отдает events.list с
+    singleEvents=False: обычные события, серии (с полем recurrence) и
+    исключения серий (с recurringEventId и originalStartTime). Интервал
+    задается в naive UTC. Результат отсортирован по началу события.
+    """
+    masters: List[Dict] = []
+    singles: List[Dict] = []
+    # (ID серии, исходное начало) -> измененный или отмененный экземпляр
+    exceptions: Dict[Tuple[str, datetime], Dict] = {}
+    for item in items:
+        if item.get('recurrence'):
+            masters.append(item)
+        elif item.get('recurringEventId') and 'originalStartTime' in item:
+            exceptions[(item['recurringEventId'], event_time_utc(item['originalStartTime']))] = item
+        else:
+            singles.append(item)
+
+    def overlaps(event: Dict) -> bool:
+        return (
+            event.get('status') != 'cancelled'
+            and event_time_utc(event['start']) < time_max
+            and event_time_utc(event['end']) > time_min
+        )
+
+    result = [event for event in singles if overlaps(event)]
+    result.extend(event for event in exceptions.values() if overlaps(event))
+    for master in masters:
+        if master.get('status') == 'cancelled':
+            continue
+        try:
+            for instance in _instances(master, time_min, time_max):
+                if (master['id'], event_time_utc(instance['originalStartTime'])) not in exceptions:
+                    result.append(instance)
+        except (ValueError, KeyError) as e:
+            logger.error(f"Error expanding recurring event {master.get('id')}: {e}")
+
+    result.sort(key=lambda event: event_time_utc(event['start']))
+    return result